@@ -199,6 +199,10 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
                    "use specialised tuples",
                    default=False),
 
+        BoolOption("withstrbuf",
+                   "use strings optimized for repeated addition",
+                   default=False),
+
         BoolOption("withliststrategies",
                    "enable optimized ways to store lists of primitives ",
                    default=True),
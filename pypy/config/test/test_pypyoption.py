@@ -41,6 +41,8 @@ def test_set_pypy_opt_level():
     conf = get_pypy_config()
     set_pypy_opt_level(conf, '2')
     assert conf.objspace.std.intshortcut
+    # opt-in only: its results don't get the bytes strategies
+    assert not conf.objspace.std.withstrbuf
     conf = get_pypy_config()
     set_pypy_opt_level(conf, '0')
     assert not conf.objspace.std.intshortcut
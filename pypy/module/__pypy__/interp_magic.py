@@ -97,12 +97,16 @@ def _internal_crash(space, w_crash=None):
     raise ValueError    # RPython-level, uncaught
 
 def strategy(space, w_obj):
-    """ strategy(dict or list or set or instance)
+    """ strategy(dict or list or set or sorted_dict or instance)
 
-    Return the underlying strategy currently used by a dict, list or set object
+    Return the underlying strategy currently used by a dict, list, set or
+    sorted_dict object
     """
+    from pypy.module.__pypy__.interp_sorteddict import W_SortedDict
     if isinstance(w_obj, W_DictMultiObject):
         name = w_obj.get_strategy().__class__.__name__
+    elif isinstance(w_obj, W_SortedDict):
+        name = w_obj.strategy.__class__.__name__
     elif isinstance(w_obj, W_ListObject):
         name = w_obj.strategy.__class__.__name__
     elif isinstance(w_obj, W_BaseSetObject):
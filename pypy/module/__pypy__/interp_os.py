@@ -1,9 +1,146 @@
+import errno
 import os
 
-from pypy.interpreter.gateway import unwrap_spec
+from rpython.rlib import rposix
+from rpython.rlib.rarithmetic import r_longlong
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import oefmt, wrap_oserror
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef
 
 
 @unwrap_spec(name='text0')
 def real_getenv(space, name):
     """Get an OS environment value skipping Python cache"""
     return space.newtext_or_none(os.environ.get(name))
+
+
+# the operations of a submit() are started in chunks of at most this many
+# operations, with at most this many bytes of buffers (unless a single
+# operation needs more)
+BATCH_MAX_OPS = 256
+BATCH_MAX_BUFFERS = 4 * 1024 * 1024
+
+
+class W_IOBatch(W_Root):
+    def __init__(self, space):
+        self.fds = []
+        self.datas = []
+        self.sizes = []
+        self.offsets = []
+
+    def descr_new(space, w_subtype):
+        self = space.allocate_instance(W_IOBatch, w_subtype)
+        W_IOBatch.__init__(self, space)
+        return self
+
+    def _queue(self, space, w_fd, data, size, offset):
+        self.fds.append(space.c_filedescriptor_w(w_fd))
+        self.datas.append(data)
+        self.sizes.append(size)
+        self.offsets.append(offset)
+        return space.newint(len(self.fds) - 1)
+
+    @unwrap_spec(size=int, offset=r_longlong)
+    def descr_read(self, space, w_fd, size, offset=-1):
+        if size < 0:
+            raise oefmt(space.w_ValueError, "negative size")
+        return self._queue(space, w_fd, None, size, offset)
+
+    @unwrap_spec(data='bufferstr', offset=r_longlong)
+    def descr_write(self, space, w_fd, data, offset=-1):
+        return self._queue(space, w_fd, data, 0, offset)
+
+    def descr_len(self, space):
+        return space.newint(len(self.fds))
+
+    def descr_submit(self, space):
+        fds = self.fds
+        datas = self.datas
+        sizes = self.sizes
+        offsets = self.offsets
+        self.fds = []
+        self.datas = []
+        self.sizes = []
+        self.offsets = []
+        results_w = []
+        n = len(fds)
+        if n == 0:
+            return space.newlist(results_w)
+        try:
+            batch = rposix.BatchIO(BATCH_MAX_OPS)
+        except OSError as e:
+            raise wrap_oserror(space, e)
+        try:
+            start = 0
+            while start < n:
+                stop = start
+                total = 0
+                while stop < n and stop - start < BATCH_MAX_OPS:
+                    data = datas[stop]
+                    size = len(data) if data is not None else sizes[stop]
+                    if stop > start and total + size > BATCH_MAX_BUFFERS:
+                        break
+                    total += size
+                    stop += 1
+                assert start >= 0 and stop >= 0
+                self._run_chunk(space, batch, fds[start:stop],
+                                datas[start:stop], sizes[start:stop],
+                                offsets[start:stop], results_w)
+                start = stop
+        finally:
+            batch.close()
+        return space.newlist(results_w)
+
+    def _run_chunk(self, space, batch, fds, datas, sizes, offsets,
+                   results_w):
+        try:
+            batch.start(fds, datas, sizes, offsets)
+            while True:
+                try:
+                    batch.wait()
+                    break
+                except OSError as e:
+                    if e.errno != errno.EINTR:
+                        raise
+                space.getexecutioncontext().checksignals()
+        except OSError as e:
+            batch.finish()
+            raise wrap_oserror(space, e)
+        for data, count, err in batch.results():
+            if err:
+                e = wrap_oserror(space, OSError(err, "batched I/O failed"))
+                results_w.append(e.get_w_value(space))
+            elif data is not None:
+                results_w.append(space.newbytes(data))
+            else:
+                results_w.append(space.newint(count))
+        batch.finish()
+
+W_IOBatch.typedef = TypeDef("IOBatch",
+    __doc__="""\
+Queues reads and writes of file descriptors, and does all of them
+concurrently when submit() is called: with io_uring where the kernel
+supports it, submitting them in a single system call, and with helper
+threads otherwise.  Operations on the same file descriptor are done in
+the order they were queued; operations on different file descriptors
+run concurrently, in no particular order.""",
+    __new__ = interp2app(W_IOBatch.descr_new.im_func),
+    __len__ = interp2app(W_IOBatch.descr_len),
+    read = interp2app(W_IOBatch.descr_read,
+        doc="read(fd, size, offset=-1) -> index\n\n"
+            "Queue a read of at most 'size' bytes at 'offset', or at the\n"
+            "current position if 'offset' is negative."),
+    write = interp2app(W_IOBatch.descr_write,
+        doc="write(fd, data, offset=-1) -> index\n\n"
+            "Queue a write of 'data' at 'offset', or at the current\n"
+            "position if 'offset' is negative."),
+    submit = interp2app(W_IOBatch.descr_submit,
+        doc="submit() -> list\n\n"
+            "Do the queued operations, wait until they are done, and\n"
+            "empty the queue.\n"
+            "Returns a list with, at the index of each operation, the bytes\n"
+            "read, the number of bytes written, or the OSError instance\n"
+            "if the operation failed."),
+)
+W_IOBatch.typedef.acceptable_as_base_class = False
@@ -0,0 +1,905 @@
+from rpython.rlib import rerased
+from rpython.rlib.objectmodel import specialize
+
+from pypy.interpreter import gateway
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef, make_weakref_descr
+
+
+# A `sorted_dict` stores its items in a B+-tree.  The items themselves are
+# only in the leaves, which are linked together in both directions, so that
+# iterating over a range of keys just walks from leaf to leaf.  Inner nodes
+# know the number of items below them, so that the position of a key and
+# the item at a given position are found in O(log n) too.
+#
+# For every inner node, keys[i] is a lower bound of the keys stored below
+# children[i]: all of them are >= keys[i] and < keys[i+1].  keys[0] is never
+# used to find a child.  The bounds are read by every lookup, but they don't
+# need to be updated when items are removed: they stay valid bounds even
+# when they are no longer the key of an item.  Nodes are not merged when
+# they become small; empty nodes are removed from the tree.
+#
+# With the object strategy, or when looking up a key of another type, the
+# comparisons call app-level code, which could change the sorted_dict.
+# Every operation compares first and only then changes the tree, so the
+# probes check after each comparison that the sorted_dict was not changed
+# in the meantime, and raise RuntimeError if it was.  A key is found only
+# if it is also equal to the probe: '<' alone is not enough with keys that
+# are not totally ordered, like NaNs.
+#
+# Like the dict strategies in dictmultiobject.py, the tree is specialized on
+# the type of its keys: if all keys are ints or all keys are str, they are
+# stored unwrapped; unicode keys are compared through their utf-8
+# representation, which sorts in the same order as the code points.  As soon
+# as a key of another type is added, the sorted_dict switches to the object
+# strategy, which compares the keys with '<'.  Looking up a key of another
+# type never changes the strategy: it is compared with the wrapped keys.
+
+NODE_SIZE = 32    # maximum number of items in a leaf, or children in a node
+
+KEYS, VALUES, ITEMS = range(3)
+
+
+class SortedDictStrategy(object):
+    def __init__(self, space):
+        self.space = space
+
+    def is_correct_type(self, w_key):
+        raise NotImplementedError("abstract base class")
+
+    def get_empty_storage(self):
+        raise NotImplementedError("abstract base class")
+
+    def length(self, w_sd):
+        raise NotImplementedError("abstract base class")
+
+    def getitem(self, w_sd, w_key):
+        """ Returns the value for w_key, or None """
+        raise NotImplementedError("abstract base class")
+
+    def setitem(self, w_sd, w_key, w_value):
+        """ Stores a key of the correct type.  Returns True if the key was
+        not present before. """
+        raise NotImplementedError("abstract base class")
+
+    def replace_value(self, w_sd, w_key, w_value):
+        """ Replaces the value of a key that may be of any type.  Returns
+        False if the key is not present. """
+        raise NotImplementedError("abstract base class")
+
+    def delitem(self, w_sd, w_key):
+        """ Removes w_key and returns its value, or returns None """
+        raise NotImplementedError("abstract base class")
+
+    def bisect(self, w_sd, w_key, right):
+        raise NotImplementedError("abstract base class")
+
+    def getitem_at(self, w_sd, index, kind):
+        raise NotImplementedError("abstract base class")
+
+    def popitem_at(self, w_sd, index):
+        """ Removes the item at the given position, which must be valid, and
+        returns it as a (key, value) tuple """
+        raise NotImplementedError("abstract base class")
+
+    def iter_range(self, w_sd, start, stop, reverse, kind):
+        raise NotImplementedError("abstract base class")
+
+
+def make_strategy_class(name, is_correct_type, wrap, unwrap, lt, eq):
+
+    class Probe(object):
+        """ The key being looked for, compared with the keys of the tree """
+        def __init__(self, w_sd):
+            self.space = w_sd.space
+            self.w_sd = w_sd
+            self.version = w_sd.version
+
+        def lt(self, key):
+            """ self < key """
+            raise NotImplementedError("abstract base class")
+
+        def gt(self, key):
+            """ key < self """
+            raise NotImplementedError("abstract base class")
+
+        def eq(self, key):
+            """ self == key """
+            raise NotImplementedError("abstract base class")
+
+        def check(self, result):
+            if self.w_sd.version != self.version:
+                raise oefmt(self.space.w_RuntimeError,
+                            "sorted_dict mutated during comparison")
+            return result
+
+    class KeyProbe(Probe):
+        def __init__(self, w_sd, key):
+            Probe.__init__(self, w_sd)
+            self.key = key
+
+        def lt(self, key):
+            return self.check(lt(self.space, self.key, key))
+
+        def gt(self, key):
+            return self.check(lt(self.space, key, self.key))
+
+        def eq(self, key):
+            return self.check(eq(self.space, self.key, key))
+
+    class WrappedProbe(Probe):
+        def __init__(self, w_sd, w_key):
+            Probe.__init__(self, w_sd)
+            self.w_key = w_key
+
+        def lt(self, key):
+            space = self.space
+            return self.check(
+                space.is_true(space.lt(self.w_key, wrap(space, key))))
+
+        def gt(self, key):
+            space = self.space
+            return self.check(
+                space.is_true(space.lt(wrap(space, key), self.w_key)))
+
+        def eq(self, key):
+            space = self.space
+            return self.check(space.eq_w(self.w_key, wrap(space, key)))
+
+    class Node(object):
+        def size(self):
+            raise NotImplementedError("abstract base class")
+
+    class Leaf(Node):
+        def __init__(self):
+            self.keys = []
+            self.values = []
+            self.prev = None
+            self.next = None
+
+        def size(self):
+            return len(self.keys)
+
+    class Inner(Node):
+        def __init__(self, keys, children, total):
+            self.keys = keys
+            self.children = children
+            self.total = total
+
+        def size(self):
+            return self.total
+
+    def leaf_bisect(leaf, probe, right):
+        keys = leaf.keys
+        lo = 0
+        hi = len(keys)
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if right:
+                below = not probe.lt(keys[mid])
+            else:
+                below = probe.gt(keys[mid])
+            if below:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def child_index(node, probe):
+        # the last child whose lower bound is <= probe
+        keys = node.keys
+        lo = 1
+        hi = len(keys)
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if probe.lt(keys[mid]):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo - 1
+
+    def split_leaf(leaf):
+        half = len(leaf.keys) >> 1
+        new_leaf = Leaf()
+        new_leaf.keys = leaf.keys[half:]
+        new_leaf.values = leaf.values[half:]
+        del leaf.keys[half:]
+        del leaf.values[half:]
+        new_leaf.prev = leaf
+        new_leaf.next = leaf.next
+        if leaf.next is not None:
+            leaf.next.prev = new_leaf
+        leaf.next = new_leaf
+        return new_leaf
+
+    def split_inner(node):
+        half = len(node.children) >> 1
+        children = node.children[half:]
+        total = 0
+        for child in children:
+            total += child.size()
+        new_node = Inner(node.keys[half:], children, total)
+        del node.keys[half:]
+        del node.children[half:]
+        node.total -= total
+        return new_node
+
+    class Tree(object):
+        def __init__(self, space):
+            self.space = space
+            leaf = Leaf()
+            self.root = leaf
+            self.first = leaf
+            self.last = leaf
+            self.added = False
+            self.w_removed = None
+
+        def length(self):
+            return self.root.size()
+
+        def find(self, probe):
+            node = self.root
+            while isinstance(node, Inner):
+                node = node.children[child_index(node, probe)]
+            assert isinstance(node, Leaf)
+            i = leaf_bisect(node, probe, False)
+            if i < len(node.keys) and probe.eq(node.keys[i]):
+                return node, i
+            return node, -1
+
+        def bisect(self, probe, right):
+            node = self.root
+            index = 0
+            while isinstance(node, Inner):
+                i = child_index(node, probe)
+                for j in range(i):
+                    index += node.children[j].size()
+                node = node.children[i]
+            assert isinstance(node, Leaf)
+            return index + leaf_bisect(node, probe, right)
+
+        def leaf_at(self, index):
+            node = self.root
+            while isinstance(node, Inner):
+                i = 0
+                while True:
+                    child = node.children[i]
+                    size = child.size()
+                    if index < size:
+                        break
+                    index -= size
+                    i += 1
+                node = child
+            assert isinstance(node, Leaf)
+            return node, index
+
+        def insert(self, w_sd, key, w_value):
+            probe = KeyProbe(w_sd, key)
+            new_node = self._insert(self.root, probe, key, w_value)
+            if new_node is not None:
+                old_root = self.root
+                self.root = Inner([old_root.keys[0], new_node.keys[0]],
+                                  [old_root, new_node],
+                                  old_root.size() + new_node.size())
+            return self.added
+
+        def _insert(self, node, probe, key, w_value):
+            # returns the node split off on the right of 'node', or None
+            if isinstance(node, Leaf):
+                i = leaf_bisect(node, probe, False)
+                if i < len(node.keys) and probe.eq(node.keys[i]):
+                    node.values[i] = w_value
+                    self.added = False
+                    return None
+                assert i >= 0
+                node.keys.insert(i, key)
+                node.values.insert(i, w_value)
+                self.added = True
+                if len(node.keys) > NODE_SIZE:
+                    new_leaf = split_leaf(node)
+                    if self.last is node:
+                        self.last = new_leaf
+                    return new_leaf
+                return None
+            assert isinstance(node, Inner)
+            i = child_index(node, probe)
+            assert i >= 0
+            new_child = self._insert(node.children[i], probe, key, w_value)
+            if self.added:
+                node.total += 1
+            if new_child is None:
+                return None
+            node.children.insert(i + 1, new_child)
+            node.keys.insert(i + 1, new_child.keys[0])
+            if len(node.children) > NODE_SIZE:
+                return split_inner(node)
+            return None
+
+        def delete(self, probe):
+            self.w_removed = None
+            self._delete(self.root, probe)
+            self._shrink_root()
+            w_removed = self.w_removed
+            self.w_removed = None
+            return w_removed
+
+        def delete_at(self, index):
+            key, w_value = self._delete_at(self.root, index)
+            self._shrink_root()
+            return key, w_value
+
+        def _shrink_root(self):
+            root = self.root
+            while isinstance(root, Inner) and len(root.children) == 1:
+                root = root.children[0]
+            self.root = root
+
+        def _delete(self, node, probe):
+            if isinstance(node, Leaf):
+                i = leaf_bisect(node, probe, False)
+                if i < len(node.keys) and probe.eq(node.keys[i]):
+                    self.w_removed = node.values[i]
+                    del node.keys[i]
+                    del node.values[i]
+                return
+            assert isinstance(node, Inner)
+            i = child_index(node, probe)
+            child = node.children[i]
+            self._delete(child, probe)
+            if self.w_removed is None:
+                return
+            node.total -= 1
+            if child.size() == 0 and len(node.children) > 1:
+                self._unlink_leaf(child)
+                del node.children[i]
+                del node.keys[i]
+
+        def _delete_at(self, node, index):
+            if isinstance(node, Leaf):
+                key = node.keys[index]
+                w_value = node.values[index]
+                del node.keys[index]
+                del node.values[index]
+                return key, w_value
+            assert isinstance(node, Inner)
+            i = 0
+            while True:
+                child = node.children[i]
+                size = child.size()
+                if index < size:
+                    break
+                index -= size
+                i += 1
+            result = self._delete_at(child, index)
+            node.total -= 1
+            if child.size() == 0 and len(node.children) > 1:
+                self._unlink_leaf(child)
+                del node.children[i]
+                del node.keys[i]
+            return result
+
+        def _unlink_leaf(self, node):
+            # 'node' is empty, so there is a single leaf below it
+            while isinstance(node, Inner):
+                node = node.children[0]
+            assert isinstance(node, Leaf)
+            if node.prev is None:
+                self.first = node.next
+            else:
+                node.prev.next = node.next
+            if node.next is None:
+                self.last = node.prev
+            else:
+                node.next.prev = node.prev
+
+    class W_Iterator(W_SortedDictIterator):
+        def __init__(self, w_sd, tree, start, stop, reverse, kind):
+            W_SortedDictIterator.__init__(self, w_sd, stop - start, kind)
+            self.reverse = reverse
+            if stop <= start:
+                self.leaf = tree.first
+                self.index = 0
+            elif reverse:
+                self.leaf, self.index = tree.leaf_at(stop - 1)
+            else:
+                self.leaf, self.index = tree.leaf_at(start)
+
+        def next_entry(self):
+            space = self.space
+            leaf = self.leaf
+            i = self.index
+            if self.reverse:
+                while i < 0:
+                    leaf = leaf.prev
+                    i = len(leaf.keys) - 1
+                self.index = i - 1
+            else:
+                while i >= len(leaf.keys):
+                    leaf = leaf.next
+                    i = 0
+                self.index = i + 1
+            self.leaf = leaf
+            return make_entry(space, leaf, i, self.kind)
+
+    def make_entry(space, leaf, i, kind):
+        if kind == KEYS:
+            return wrap(space, leaf.keys[i])
+        elif kind == VALUES:
+            return leaf.values[i]
+        else:
+            return space.newtuple2(wrap(space, leaf.keys[i]), leaf.values[i])
+
+    class cls(SortedDictStrategy):
+        erase, unerase = rerased.new_erasing_pair(name)
+        erase = staticmethod(erase)
+        unerase = staticmethod(unerase)
+
+        def is_correct_type(self, w_key):
+            return is_correct_type(self.space, w_key)
+
+        def get_empty_storage(self):
+            return self.erase(Tree(self.space))
+
+        def _probe(self, w_sd, w_key):
+            space = self.space
+            if is_correct_type(space, w_key):
+                return KeyProbe(w_sd, unwrap(space, w_key))
+            return WrappedProbe(w_sd, w_key)
+
+        def length(self, w_sd):
+            return self.unerase(w_sd.storage).length()
+
+        def getitem(self, w_sd, w_key):
+            tree = self.unerase(w_sd.storage)
+            leaf, i = tree.find(self._probe(w_sd, w_key))
+            if i < 0:
+                return None
+            return leaf.values[i]
+
+        def setitem(self, w_sd, w_key, w_value):
+            tree = self.unerase(w_sd.storage)
+            return tree.insert(w_sd, unwrap(self.space, w_key), w_value)
+
+        def replace_value(self, w_sd, w_key, w_value):
+            tree = self.unerase(w_sd.storage)
+            leaf, i = tree.find(self._probe(w_sd, w_key))
+            if i < 0:
+                return False
+            leaf.values[i] = w_value
+            return True
+
+        def delitem(self, w_sd, w_key):
+            tree = self.unerase(w_sd.storage)
+            return tree.delete(self._probe(w_sd, w_key))
+
+        def bisect(self, w_sd, w_key, right):
+            tree = self.unerase(w_sd.storage)
+            return tree.bisect(self._probe(w_sd, w_key), right)
+
+        def getitem_at(self, w_sd, index, kind):
+            tree = self.unerase(w_sd.storage)
+            leaf, i = tree.leaf_at(index)
+            return make_entry(self.space, leaf, i, kind)
+
+        def popitem_at(self, w_sd, index):
+            tree = self.unerase(w_sd.storage)
+            key, w_value = tree.delete_at(index)
+            return self.space.newtuple2(wrap(self.space, key), w_value)
+
+        def iter_range(self, w_sd, start, stop, reverse, kind):
+            tree = self.unerase(w_sd.storage)
+            return W_Iterator(w_sd, tree, start, stop, reverse, kind)
+
+    cls.__name__ = name
+    W_Iterator.__name__ = 'W_SortedDictIterator_' + name
+    return cls
+
+
+def _is_int(space, w_key):
+    return space.is_w(space.type(w_key), space.w_int)
+
+def _is_bytes(space, w_key):
+    return space.is_w(space.type(w_key), space.w_bytes)
+
+def _is_unicode(space, w_key):
+    return space.is_w(space.type(w_key), space.w_unicode)
+
+def _is_object(space, w_key):
+    return True
+
+def _wrap_int(space, key):
+    return space.newint(key)
+
+def _wrap_bytes(space, key):
+    return space.newbytes(key)
+
+def _wrap_object(space, w_key):
+    return w_key
+
+def _unwrap_object(space, w_key):
+    return w_key
+
+@specialize.argtype(1)
+def _lt_native(space, key1, key2):
+    return key1 < key2
+
+def _lt_unicode(space, w_key1, w_key2):
+    return space.utf8_w(w_key1) < space.utf8_w(w_key2)
+
+def _lt_object(space, w_key1, w_key2):
+    return space.is_true(space.lt(w_key1, w_key2))
+
+@specialize.argtype(1)
+def _eq_native(space, key1, key2):
+    return key1 == key2
+
+def _eq_unicode(space, w_key1, w_key2):
+    return space.utf8_w(w_key1) == space.utf8_w(w_key2)
+
+def _eq_object(space, w_key1, w_key2):
+    return space.eq_w(w_key1, w_key2)
+
+
+class W_SortedDictIterator(W_Root):
+    def __init__(self, w_sd, count, kind):
+        self.space = w_sd.space
+        self.w_sd = w_sd
+        self.version = w_sd.version
+        self.count = count
+        self.kind = kind
+
+    def next_entry(self):
+        raise NotImplementedError("abstract base class")
+
+    def descr_iter(self, space):
+        return self
+
+    def descr_length_hint(self, space):
+        return space.newint(self.count)
+
+    def descr_next(self, space):
+        if self.count <= 0:
+            raise OperationError(space.w_StopIteration, space.w_None)
+        if self.version != self.w_sd.version:
+            self.count = 0
+            raise oefmt(space.w_RuntimeError,
+                        "sorted_dict changed size during iteration")
+        self.count -= 1
+        return self.next_entry()
+
+W_SortedDictIterator.typedef = TypeDef("sorted_dict_iterator",
+    __iter__ = interp2app(W_SortedDictIterator.descr_iter),
+    __length_hint__ = interp2app(W_SortedDictIterator.descr_length_hint),
+    next = interp2app(W_SortedDictIterator.descr_next),
+)
+W_SortedDictIterator.typedef.acceptable_as_base_class = False
+
+
+IntSortedDictStrategy = make_strategy_class(
+    "IntSortedDictStrategy", _is_int, _wrap_int,
+    lambda space, w_key: space.int_w(w_key), _lt_native, _eq_native)
+BytesSortedDictStrategy = make_strategy_class(
+    "BytesSortedDictStrategy", _is_bytes, _wrap_bytes,
+    lambda space, w_key: space.bytes_w(w_key), _lt_native, _eq_native)
+UnicodeSortedDictStrategy = make_strategy_class(
+    "UnicodeSortedDictStrategy", _is_unicode, _wrap_object,
+    _unwrap_object, _lt_unicode, _eq_unicode)
+ObjectSortedDictStrategy = make_strategy_class(
+    "ObjectSortedDictStrategy", _is_object, _wrap_object,
+    _unwrap_object, _lt_object, _eq_object)
+
+
+def _strategy_for_key(space, w_key):
+    if _is_int(space, w_key):
+        return space.fromcache(IntSortedDictStrategy)
+    elif _is_bytes(space, w_key):
+        return space.fromcache(BytesSortedDictStrategy)
+    elif _is_unicode(space, w_key):
+        return space.fromcache(UnicodeSortedDictStrategy)
+    return space.fromcache(ObjectSortedDictStrategy)
+
+
+class W_SortedDict(W_Root):
+    def __init__(self, space):
+        self.space = space
+        self.strategy = space.fromcache(ObjectSortedDictStrategy)
+        self.storage = self.strategy.get_empty_storage()
+        # incremented whenever keys are added or removed
+        self.version = 0
+
+    def _set_strategy(self, strategy):
+        self.strategy = strategy
+        self.storage = strategy.get_empty_storage()
+        self.version += 1
+
+    def _switch_to_object_strategy(self):
+        w_keys_iter = self._iter(KEYS)
+        w_values_iter = self._iter(VALUES)
+        keys_w = [None] * w_keys_iter.count
+        values_w = [None] * w_keys_iter.count
+        for i in range(len(keys_w)):
+            keys_w[i] = w_keys_iter.next_entry()
+            values_w[i] = w_values_iter.next_entry()
+        self._set_strategy(self.space.fromcache(ObjectSortedDictStrategy))
+        for i in range(len(keys_w)):
+            self.strategy.setitem(self, keys_w[i], values_w[i])
+
+    def length(self):
+        return self.strategy.length(self)
+
+    def getitem(self, w_key):
+        return self.strategy.getitem(self, w_key)
+
+    def setitem(self, w_key, w_value):
+        strategy = self.strategy
+        if strategy.length(self) == 0:
+            # the first key decides the strategy
+            new_strategy = _strategy_for_key(self.space, w_key)
+            if new_strategy is not strategy:
+                self._set_strategy(new_strategy)
+        elif not strategy.is_correct_type(w_key):
+            if strategy.replace_value(self, w_key, w_value):
+                return
+            else:
+                self._switch_to_object_strategy()
+        if self.strategy.setitem(self, w_key, w_value):
+            self.version += 1
+
+    def delitem(self, w_key):
+        w_value = self.strategy.delitem(self, w_key)
+        if w_value is not None:
+            self.version += 1
+        return w_value
+
+    def _check_index(self, space, index, length, opname):
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            if length == 0:
+                raise oefmt(space.w_IndexError, "%s from empty sorted_dict",
+                            opname)
+            raise oefmt(space.w_IndexError, "sorted_dict index out of range")
+        return index
+
+    def _iter(self, kind, reverse=False):
+        return self.strategy.iter_range(self, 0, self.length(), reverse, kind)
+
+    def _list(self, kind):
+        w_iter = self._iter(kind)
+        result_w = [None] * w_iter.count
+        for i in range(len(result_w)):
+            result_w[i] = w_iter.next_entry()
+        return self.space.newlist(result_w)
+
+    @staticmethod
+    def descr_new(space, w_subtype, __args__):
+        w_sd = space.allocate_instance(W_SortedDict, w_subtype)
+        W_SortedDict.__init__(w_sd, space)
+        return w_sd
+
+    def descr_init(self, space, w_other=None):
+        if w_other is not None:
+            self.descr_update(space, w_other)
+
+    def descr_update(self, space, w_other):
+        if isinstance(w_other, W_SortedDict):
+            # take a copy first: the comparisons could change w_other
+            items_w = space.listview(w_other._list(ITEMS))
+            for w_item in items_w:
+                w_key, w_value = space.fixedview(w_item, 2)
+                self.setitem(w_key, w_value)
+        elif space.findattr(w_other, space.newtext("keys")) is not None:
+            w_keys = space.call_method(w_other, "keys")
+            for w_key in space.listview(w_keys):
+                self.setitem(w_key, space.getitem(w_other, w_key))
+        else:
+            for w_pair in space.listview(w_other):
+                w_key, w_value = space.fixedview(w_pair, 2)
+                self.setitem(w_key, w_value)
+
+    def descr_repr(self, space):
+        return sorteddictrepr(space, space.type(self), self)
+
+    def descr_len(self, space):
+        return space.newint(self.length())
+
+    def descr_contains(self, space, w_key):
+        return space.newbool(self.getitem(w_key) is not None)
+
+    def descr_getitem(self, space, w_key):
+        w_value = self.getitem(w_key)
+        if w_value is None:
+            space.raise_key_error(w_key)
+        return w_value
+
+    def descr_setitem(self, space, w_key, w_value):
+        self.setitem(w_key, w_value)
+
+    def descr_delitem(self, space, w_key):
+        if self.delitem(w_key) is None:
+            space.raise_key_error(w_key)
+
+    def descr_iter(self, space):
+        return self._iter(KEYS)
+
+    def descr_reversed(self, space):
+        return self._iter(KEYS, reverse=True)
+
+    def descr_get(self, space, w_key, w_default=None):
+        w_value = self.getitem(w_key)
+        if w_value is None:
+            if w_default is None:
+                return space.w_None
+            return w_default
+        return w_value
+
+    def descr_setdefault(self, space, w_key, w_default=None):
+        w_value = self.getitem(w_key)
+        if w_value is None:
+            if w_default is None:
+                w_default = space.w_None
+            self.setitem(w_key, w_default)
+            return w_default
+        return w_value
+
+    def descr_pop(self, space, w_key, w_default=None):
+        w_value = self.delitem(w_key)
+        if w_value is None:
+            if w_default is None:
+                space.raise_key_error(w_key)
+            return w_default
+        return w_value
+
+    def descr_clear(self, space):
+        self._set_strategy(space.fromcache(ObjectSortedDictStrategy))
+
+    def descr_copy(self, space):
+        w_sd = W_SortedDict(space)
+        w_sd.descr_update(space, self)
+        return w_sd
+
+    def descr_keys(self, space):
+        return self._list(KEYS)
+
+    def descr_values(self, space):
+        return self._list(VALUES)
+
+    def descr_items(self, space):
+        return self._list(ITEMS)
+
+    def descr_iterkeys(self, space):
+        return self._iter(KEYS)
+
+    def descr_itervalues(self, space):
+        return self._iter(VALUES)
+
+    def descr_iteritems(self, space):
+        return self._iter(ITEMS)
+
+    def descr_bisect_left(self, space, w_key):
+        return space.newint(self.strategy.bisect(self, w_key, False))
+
+    def descr_bisect_right(self, space, w_key):
+        return space.newint(self.strategy.bisect(self, w_key, True))
+
+    def descr_index(self, space, w_key):
+        index = self.strategy.bisect(self, w_key, False)
+        if (index == self.length() or
+                not space.eq_w(self.strategy.getitem_at(self, index, KEYS),
+                               w_key)):
+            raise oefmt(space.w_ValueError, "key not in sorted_dict")
+        return space.newint(index)
+
+    @unwrap_spec(index=int)
+    def descr_peekitem(self, space, index=-1):
+        index = self._check_index(space, index, self.length(), "peekitem")
+        return self.strategy.getitem_at(self, index, ITEMS)
+
+    @unwrap_spec(index=int)
+    def descr_popitem(self, space, index=-1):
+        index = self._check_index(space, index, self.length(), "popitem")
+        # remove the item by position: looking up its key again could find
+        # another key that compares equal, or call a mutating __eq__
+        w_item = self.strategy.popitem_at(self, index)
+        self.version += 1
+        return w_item
+
+    def _irange(self, space, w_minimum, w_maximum, w_inclusive, reverse,
+                kind):
+        inclusive_min_w, inclusive_max_w = space.fixedview(w_inclusive, 2)
+        inclusive_min = space.is_true(inclusive_min_w)
+        inclusive_max = space.is_true(inclusive_max_w)
+        if space.is_none(w_minimum):
+            start = 0
+        else:
+            start = self.strategy.bisect(self, w_minimum, not inclusive_min)
+        if space.is_none(w_maximum):
+            stop = self.length()
+        else:
+            stop = self.strategy.bisect(self, w_maximum, inclusive_max)
+        if stop < start:
+            stop = start
+        return self.strategy.iter_range(self, start, stop, reverse, kind)
+
+    @unwrap_spec(reverse=bool)
+    def descr_irange(self, space, w_minimum=None, w_maximum=None,
+                     w_inclusive=None, reverse=False):
+        """irange(minimum=None, maximum=None, inclusive=(True, True),
+               reverse=False)
+
+        Iterate over the keys between minimum and maximum, in sorted order.
+        A bound of None means that the range is not bounded on that side.
+        """
+        if w_inclusive is None:
+            w_inclusive = space.newtuple2(space.w_True, space.w_True)
+        return self._irange(space, w_minimum, w_maximum, w_inclusive,
+                            reverse, KEYS)
+
+    @unwrap_spec(reverse=bool)
+    def descr_irange_items(self, space, w_minimum=None, w_maximum=None,
+                           w_inclusive=None, reverse=False):
+        """irange_items(minimum=None, maximum=None, inclusive=(True, True),
+                     reverse=False)
+
+        Like irange(), but iterate over the (key, value) pairs.
+        """
+        if w_inclusive is None:
+            w_inclusive = space.newtuple2(space.w_True, space.w_True)
+        return self._irange(space, w_minimum, w_maximum, w_inclusive,
+                            reverse, ITEMS)
+
+
+app = gateway.applevel("""
+    def sorteddictrepr(tp, d):
+        items = ['%r: %r' % (key, value) for key, value in d.iteritems()]
+        return '%s({%s})' % (tp.__name__, ', '.join(items))
+""", filename=__file__)
+
+sorteddictrepr = app.interphook("sorteddictrepr")
+
+
+W_SortedDict.typedef = TypeDef("sorted_dict",
+    __doc__="""\
+sorted_dict([mapping or iterable of pairs]) -> a dictionary whose keys are
+kept in sorted order.
+
+Iterating over it yields the keys in order.  Inserting and removing keys
+and looking up a key or a position take O(log n) time.  irange() and
+irange_items() iterate over a range of keys without building a list.
+The keys must be comparable with each other; they don't need to be
+hashable.
+""",
+    __new__ = interp2app(W_SortedDict.descr_new),
+    __init__ = interp2app(W_SortedDict.descr_init),
+    __repr__ = interp2app(W_SortedDict.descr_repr),
+    __len__ = interp2app(W_SortedDict.descr_len),
+    __contains__ = interp2app(W_SortedDict.descr_contains),
+    __getitem__ = interp2app(W_SortedDict.descr_getitem),
+    __setitem__ = interp2app(W_SortedDict.descr_setitem),
+    __delitem__ = interp2app(W_SortedDict.descr_delitem),
+    __iter__ = interp2app(W_SortedDict.descr_iter),
+    __reversed__ = interp2app(W_SortedDict.descr_reversed),
+    __weakref__ = make_weakref_descr(W_SortedDict),
+    __hash__ = None,
+    get = interp2app(W_SortedDict.descr_get),
+    setdefault = interp2app(W_SortedDict.descr_setdefault),
+    pop = interp2app(W_SortedDict.descr_pop),
+    clear = interp2app(W_SortedDict.descr_clear),
+    copy = interp2app(W_SortedDict.descr_copy),
+    update = interp2app(W_SortedDict.descr_update),
+    keys = interp2app(W_SortedDict.descr_keys),
+    values = interp2app(W_SortedDict.descr_values),
+    items = interp2app(W_SortedDict.descr_items),
+    iterkeys = interp2app(W_SortedDict.descr_iterkeys),
+    itervalues = interp2app(W_SortedDict.descr_itervalues),
+    iteritems = interp2app(W_SortedDict.descr_iteritems),
+    bisect_left = interp2app(W_SortedDict.descr_bisect_left),
+    bisect_right = interp2app(W_SortedDict.descr_bisect_right),
+    index = interp2app(W_SortedDict.descr_index),
+    peekitem = interp2app(W_SortedDict.descr_peekitem),
+    popitem = interp2app(W_SortedDict.descr_popitem),
+    irange = interp2app(W_SortedDict.descr_irange),
+    irange_items = interp2app(W_SortedDict.descr_irange_items),
+)
@@ -58,6 +58,8 @@ class OsModule(MixedModule):
     interpleveldefs = {
         'real_getenv': 'interp_os.real_getenv'
     }
+    if sys.platform != 'win32':
+        interpleveldefs['IOBatch'] = 'interp_os.W_IOBatch'
 
 
 class PyPyDateTime(MixedModule):
@@ -87,6 +89,7 @@ class Module(MixedModule):
         'internal_repr'             : 'interp_magic.internal_repr',
         'bytebuffer'                : 'bytebuffer.bytebuffer',
         'identity_dict'             : 'interp_identitydict.W_IdentityDict',
+        'sorted_dict'               : 'interp_sorteddict.W_SortedDict',
         'debug_start'               : 'interp_debug.debug_start',
         'debug_print'               : 'interp_debug.debug_print',
         'debug_stop'                : 'interp_debug.debug_stop',
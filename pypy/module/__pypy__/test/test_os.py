@@ -1,5 +1,9 @@
 class AppTestOs:
-    spaceconfig = dict(usemodules=['__pypy__'])
+    spaceconfig = dict(usemodules=['__pypy__', 'signal'])
+
+    def setup_class(cls):
+        from rpython.tool.udir import udir
+        cls.w_tmpfile = cls.space.wrap(str(udir.join('test_iobatch')))
 
     def test_real_getenv(self):
         import __pypy__.os
@@ -14,3 +18,84 @@ class AppTestOs:
         assert os.getenv(key) is None
         os.unsetenv(key)
         assert __pypy__.os.real_getenv(key) is None
+
+    def test_iobatch(self):
+        import __pypy__.os
+        import os, errno
+        if not hasattr(__pypy__.os, 'IOBatch'):
+            skip("no IOBatch on this platform")
+        fd = os.open(self.tmpfile, os.O_RDWR | os.O_CREAT | os.O_TRUNC)
+        try:
+            b = __pypy__.os.IOBatch()
+            assert b.write(fd, 'Hello world') == 0
+            assert b.read(fd, 5, 0) == 1
+            assert b.write(fd, buffer('ea'), 1) == 2
+            assert b.read(fd, 100, 0) == 3
+            assert b.read(9999, 1) == 4      # not an open fd
+            raises(ValueError, b.read, -1, 1)
+            raises(ValueError, b.read, fd, -1)
+            assert len(b) == 5
+            res = b.submit()
+            assert len(b) == 0
+            assert res[:4] == [11, 'Hello', 2, 'Healo world']
+            assert isinstance(res[4], OSError)
+            assert res[4].errno == errno.EBADF
+            assert b.submit() == []
+            with open(self.tmpfile) as f:
+                b.read(f, 4, 7)
+                assert b.submit() == ['orld']
+        finally:
+            os.close(fd)
+
+    def test_iobatch_concurrent(self):
+        import __pypy__.os
+        import os
+        if not hasattr(__pypy__.os, 'IOBatch'):
+            skip("no IOBatch on this platform")
+        r, w = os.pipe()
+        try:
+            b = __pypy__.os.IOBatch()
+            # the read is only done after the write queued after it
+            b.read(r, 10)
+            b.write(w, 'abc')
+            assert b.submit() == ['abc', 3]
+            # more operations than fit in one chunk
+            for i in range(300):
+                b.write(w, str(i % 10))
+            assert b.submit() == [1] * 300
+            b.read(r, 1000)
+            assert b.submit() == [''.join([str(i % 10) for i in range(300)])]
+        finally:
+            os.close(r)
+            os.close(w)
+
+    def test_iobatch_signal(self):
+        import __pypy__.os
+        import os
+        if not hasattr(__pypy__.os, 'IOBatch'):
+            skip("no IOBatch on this platform")
+        try:
+            from signal import alarm, signal, SIG_DFL, SIGALRM
+        except ImportError:
+            skip("no SIGALRM on this platform")
+        class Alarm(Exception):
+            pass
+        def handler(*a):
+            raise Alarm()
+        r, w = os.pipe()
+        try:
+            b = __pypy__.os.IOBatch()
+            b.read(r, 10)
+            signal(SIGALRM, handler)
+            alarm(1)
+            try:
+                raises(Alarm, b.submit)
+            finally:
+                alarm(0)
+                signal(SIGALRM, SIG_DFL)
+            # the read was cancelled
+            os.write(w, 'abc')
+            assert os.read(r, 10) == 'abc'
+        finally:
+            os.close(r)
+            os.close(w)
@@ -0,0 +1,270 @@
+class AppTestSortedDict:
+    spaceconfig = dict(usemodules=['__pypy__'])
+
+    def test_basic(self):
+        from __pypy__ import sorted_dict
+        d = sorted_dict()
+        assert len(d) == 0
+        assert not d
+        d[3] = 'c'
+        d[1] = 'a'
+        d[2] = 'b'
+        assert len(d) == 3
+        assert list(d) == [1, 2, 3]
+        assert d.keys() == [1, 2, 3]
+        assert d.values() == ['a', 'b', 'c']
+        assert d.items() == [(1, 'a'), (2, 'b'), (3, 'c')]
+        assert d[2] == 'b'
+        assert 2 in d
+        assert 4 not in d
+        raises(KeyError, "d[4]")
+        d[2] = 'B'
+        assert len(d) == 3
+        assert d[2] == 'B'
+        del d[2]
+        assert list(d) == [1, 3]
+        raises(KeyError, "del d[2]")
+        assert d.get(1) == 'a'
+        assert d.get(2) is None
+        assert d.get(2, 42) == 42
+        assert d.pop(1) == 'a'
+        assert d.pop(1, 42) == 42
+        raises(KeyError, d.pop, 1)
+        assert d.setdefault(3, 'x') == 'c'
+        assert d.setdefault(5, 'x') == 'x'
+        assert d.items() == [(3, 'c'), (5, 'x')]
+        d.clear()
+        assert len(d) == 0 and d.keys() == []
+
+    def test_init_update(self):
+        from __pypy__ import sorted_dict
+        d = sorted_dict({'b': 2, 'a': 1})
+        assert d.items() == [('a', 1), ('b', 2)]
+        d.update([('c', 3), ('a', 0)])
+        assert d.items() == [('a', 0), ('b', 2), ('c', 3)]
+        d2 = sorted_dict(d)
+        assert d2.items() == d.items()
+        d3 = d.copy()
+        d3['d'] = 4
+        assert len(d) == 3 and len(d3) == 4
+        assert repr(d) == "sorted_dict({'a': 0, 'b': 2, 'c': 3})"
+        raises(TypeError, hash, d)
+
+    def test_many_items(self):
+        from __pypy__ import sorted_dict
+        state = [42]
+        def randrange(n):
+            state[0] = (state[0] * 1103515245 + 12345) & 0x7fffffff
+            return state[0] % n
+        d = sorted_dict()
+        ref = {}
+        for i in range(3000):
+            key = randrange(2000)
+            d[key] = i
+            ref[key] = i
+        assert len(d) == len(ref)
+        assert d.items() == sorted(ref.items())
+        for i in range(2000):
+            key = randrange(2000)
+            assert d.pop(key, None) == ref.pop(key, None)
+        assert len(d) == len(ref)
+        assert d.items() == sorted(ref.items())
+        assert list(reversed(d)) == sorted(ref, reverse=True)
+        for key in list(ref):
+            del d[key]
+        assert len(d) == 0
+        assert list(d) == []
+        d[5] = 6
+        assert d.items() == [(5, 6)]
+
+    def test_bisect_index(self):
+        from __pypy__ import sorted_dict
+        d = sorted_dict()
+        for i in range(0, 200, 2):
+            d[i] = str(i)
+        assert d.bisect_left(10) == 5
+        assert d.bisect_right(10) == 6
+        assert d.bisect_left(11) == d.bisect_right(11) == 6
+        assert d.bisect_left(-5) == 0
+        assert d.bisect_right(500) == 100
+        assert d.index(10) == 5
+        raises(ValueError, d.index, 11)
+        assert d.peekitem() == (198, '198')
+        assert d.peekitem(0) == (0, '0')
+        assert d.peekitem(50) == (100, '100')
+        assert d.peekitem(-2) == (196, '196')
+        raises(IndexError, d.peekitem, 100)
+        assert d.popitem() == (198, '198')
+        assert d.popitem(0) == (0, '0')
+        assert len(d) == 98
+        raises(IndexError, sorted_dict().popitem)
+
+    def test_popitem_by_position(self):
+        from __pypy__ import sorted_dict
+        d = sorted_dict()
+        ref = []
+        for i in range(1000):
+            d[i] = str(i)
+            ref.append((i, str(i)))
+        state = [42]
+        while ref:
+            state[0] = (state[0] * 1103515245 + 12345) & 0x7fffffff
+            index = state[0] % len(ref)
+            assert d.popitem(index) == ref.pop(index)
+            assert len(d) == len(ref)
+        assert d.items() == []
+        #
+        # the key is not looked up again: a NaN key can be popped, and
+        # __eq__ is not called
+        nan = float('nan')
+        d[1.0] = 'a'
+        d[nan] = 'nan'
+        d[2.0] = 'b'
+        index = d.values().index('nan')
+        assert d.popitem(index)[1] == 'nan'
+        assert d.items() == [(1.0, 'a'), (2.0, 'b')]
+        class Key(object):
+            def __init__(self, n):
+                self.n = n
+            def __lt__(self, other):
+                return self.n < other.n
+            def __eq__(self, other):
+                raise AssertionError("__eq__ called")
+        d = sorted_dict()
+        d[Key(1)] = 1
+        d[Key(2)] = 2
+        key, value = d.popitem(0)
+        assert (key.n, value) == (1, 1)
+        assert len(d) == 1
+
+    def test_irange(self):
+        from __pypy__ import sorted_dict
+        d = sorted_dict()
+        for i in range(100):
+            d[i] = i * 10
+        assert list(d.irange(10, 15)) == [10, 11, 12, 13, 14, 15]
+        assert list(d.irange(10, 15, (False, False))) == [11, 12, 13, 14]
+        assert list(d.irange(10, 15, (True, False))) == [10, 11, 12, 13, 14]
+        assert list(d.irange(10, 13, reverse=True)) == [13, 12, 11, 10]
+        assert list(d.irange(maximum=2)) == [0, 1, 2]
+        assert list(d.irange(minimum=97)) == [97, 98, 99]
+        assert list(d.irange(15, 10)) == []
+        assert list(d.irange(5.5, 7.5)) == [6, 7]
+        assert list(d.irange_items(3, 4)) == [(3, 30), (4, 40)]
+        assert list(d.irange_items(3, 4, reverse=True)) == [(4, 40), (3, 30)]
+        it = d.irange(0, 50)
+        assert it.__length_hint__() == 51
+
+    def test_changed_during_iteration(self):
+        from __pypy__ import sorted_dict
+        d = sorted_dict({1: 1, 2: 2})
+        it = iter(d)
+        next(it)
+        d[3] = 3
+        raises(RuntimeError, next, it)
+        it = d.iteritems()
+        d[1] = 5     # replacing a value is fine
+        assert list(it) == [(1, 5), (2, 2), (3, 3)]
+
+    def test_changed_during_comparison(self):
+        from __pypy__ import sorted_dict
+        class Key(object):
+            def __init__(self, n, action=None):
+                self.n = n
+                self.action = action
+            def act(self):
+                if self.action is not None:
+                    action = self.action
+                    self.action = None
+                    action()
+            def __lt__(self, other):
+                self.act()
+                other.act()
+                return self.n < other.n
+            def __eq__(self, other):
+                self.act()
+                other.act()
+                return self.n == other.n
+        d = sorted_dict()
+        for i in range(100):
+            d[Key(i)] = i
+        def delete():
+            for key in list(d)[::2]:
+                del d[key]
+        raises(RuntimeError, d.__setitem__, Key(50, delete), 'x')
+        assert len(d) == 50
+        assert [key.n for key in d] == range(1, 100, 2)
+        raises(RuntimeError, d.__setitem__, Key(51, d.clear), 'x')
+        assert len(d) == 0
+        d[Key(1)] = 1
+        raises(RuntimeError, d.get, Key(1, lambda: d.pop(Key(1))))
+        d[Key(1)] = 1
+        raises(RuntimeError, d.bisect_left, Key(2, d.clear))
+        assert len(d) == 0
+
+    def test_not_totally_ordered(self):
+        from __pypy__ import sorted_dict
+        nan = float('nan')
+        d = sorted_dict()
+        d[1.0] = 'a'
+        d[2.0] = 'b'
+        d[nan] = 'nan'
+        # the NaN is not equal to any key, so it doesn't replace one
+        assert len(d) == 3
+        assert sorted(d.values()) == ['a', 'b', 'nan']
+        assert d[nan] == 'nan'
+        del d[nan]
+        assert d.items() == [(1.0, 'a'), (2.0, 'b')]
+
+    def test_strategies(self):
+        from __pypy__ import sorted_dict, strategy
+        d = sorted_dict()
+        d[1] = 1
+        assert strategy(d) == "IntSortedDictStrategy"
+        assert d.get(1.0) == 1
+        assert 1L in d
+        d[1.0] = 2
+        assert d.items() == [(1, 2)]
+        assert strategy(d) == "IntSortedDictStrategy"
+        assert d.get('a') is None
+        assert strategy(d) == "IntSortedDictStrategy"
+        d[0.5] = 3
+        assert strategy(d) == "ObjectSortedDictStrategy"
+        assert d.items() == [(0.5, 3), (1, 2)]
+        #
+        d = sorted_dict()
+        d['b'] = 1
+        d['a'] = 2
+        assert strategy(d) == "BytesSortedDictStrategy"
+        assert d.keys() == ['a', 'b']
+        assert d[u'a'] == 2
+        assert strategy(d) == "BytesSortedDictStrategy"
+        #
+        d = sorted_dict()
+        keys = [u'\u1234', u'a', u'\xe9', u'\U00012345', u'ab']
+        for key in keys:
+            d[key] = key
+        assert strategy(d) == "UnicodeSortedDictStrategy"
+        assert d.keys() == sorted(keys)
+        d[5] = 5
+        assert strategy(d) == "ObjectSortedDictStrategy"
+        assert d.keys() == sorted(keys + [5])
+        d.clear()
+        d['x'] = 1
+        assert strategy(d) == "BytesSortedDictStrategy"
+
+    def test_unhashable_keys(self):
+        from __pypy__ import sorted_dict
+        d = sorted_dict()
+        d[[2]] = 'b'
+        d[[1]] = 'a'
+        assert d.items() == [([1], 'a'), ([2], 'b')]
+        assert d[[2]] == 'b'
+
+    def test_subclass(self):
+        from __pypy__ import sorted_dict
+        class D(sorted_dict):
+            pass
+        d = D([(2, 2), (1, 1)])
+        assert d.keys() == [1, 2]
+        assert repr(d) == "D({1: 1, 2: 2})"
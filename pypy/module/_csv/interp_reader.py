@@ -17,11 +17,18 @@ from pypy.objspace.std.util import wrap_parsestringerror
 
 class W_Reader(W_Root):
 
+    # fields up to this length are interned in 'self.fields_cache_w', so that
+    # the values that are repeated over many rows (categories, flags, empty
+    # strings...) are stored only once
+    INTERN_MAX_LENGTH = 24
+    INTERN_MAX_ENTRIES = 4096
+
     def __init__(self, space, dialect, w_iter):
         self.space = space
         self.dialect = dialect
         self.w_iter = w_iter
         self.line_num = 0
+        self.fields_cache_w = {}
 
     def iter_w(self):
         return self
@@ -52,9 +59,19 @@ class W_Reader(W_Root):
                 raise wrap_parsestringerror(space, e, space.newtext(field))
             w_obj = space.newfloat(ff)
         else:
-            w_obj = space.newtext(field)
+            w_obj = self.newfield(field)
         self.fields_w.append(w_obj)
 
+    def newfield(self, field):
+        if len(field) > self.INTERN_MAX_LENGTH:
+            return self.space.newtext(field)
+        w_obj = self.fields_cache_w.get(field, None)
+        if w_obj is None:
+            w_obj = self.space.newtext(field)
+            if len(self.fields_cache_w) < self.INTERN_MAX_ENTRIES:
+                self.fields_cache_w[field] = w_obj
+        return w_obj
+
     def next_w(self):
         space = self.space
         dialect = self.dialect
@@ -104,3 +104,14 @@ class AppTestReader(object):
         self._read_test(['a,"'], 'Error', strict=True)
         self._read_test(['"a'], 'Error', strict=True)
         self._read_test(['^'], 'Error', escapechar='^', strict=True)
+
+    def test_repeated_fields_are_shared(self):
+        import _csv
+        long = 'x' * 100
+        rows = list(_csv.reader(['red,1,%s\n' % long, 'red,2,%s\n' % long,
+                                 '"red",1,\n']))
+        assert rows == [['red', '1', long], ['red', '2', long],
+                        ['red', '1', '']]
+        assert rows[0][0] is rows[1][0] is rows[2][0]
+        assert rows[0][1] is rows[2][1]
+        assert rows[0][2] == rows[1][2]
@@ -617,6 +617,65 @@ class BufferedMixin:
 
         return result_buffer[0:written]
 
+    def readinto_w(self, space, w_buffer):
+        self._check_init(space)
+        self._check_closed(space, "readinto of closed file")
+        rwbuffer = space.writebuf_w(w_buffer)
+        length = rwbuffer.getlength()
+        with self.lock:
+            written = self._readinto_generic(space, rwbuffer, length)
+        if written < 0:
+            return space.w_None
+        return space.newint(written)
+
+    def _readinto_generic(self, space, rwbuffer, length):
+        """Read up to 'length' bytes into 'rwbuffer'.  Large reads don't go
+           through the internal buffer: the raw stream reads directly into
+           'rwbuffer', which for FileIO means no copy at all if 'rwbuffer'
+           has a raw address (bytearray, mmap, array...).  Returns -1 if
+           nothing could be read because read() would block."""
+        # Must run with the lock held!
+        current_size = self._readahead()
+        if current_size >= length:
+            self.output_slice(space, rwbuffer, 0,
+                              self.buffer[self.pos:self.pos + length])
+            self.pos += length
+            return length
+        written = 0
+        if current_size > 0:
+            self.output_slice(space, rwbuffer, 0,
+                              self.buffer[self.pos:self.pos + current_size])
+            self.pos += current_size
+            written = current_size
+
+        if self.writable:
+            self._flush_and_rewind_unlocked(space)
+        self._reader_reset_buf()
+        self.pos = 0
+
+        remaining = length - written
+        while remaining > 0:
+            try:
+                if remaining > self.buffer_size:
+                    size = self._raw_read(space, rwbuffer, written, remaining)
+                else:
+                    size = self._fill_buffer(space)
+                    if size > 0:
+                        if size > remaining:
+                            size = remaining
+                        self.output_slice(space, rwbuffer, written,
+                                          self.buffer[self.pos:self.pos + size])
+                        self.pos += size
+            except BlockingIOError:
+                if written == 0:
+                    return -1
+                break
+            if size == 0:
+                break
+            written += size
+            remaining -= size
+        return written
+
     def _read_fast(self, n):
         """Read n bytes from the buffer if it can, otherwise return None.
            This function is simple enough that it can run unlocked."""
@@ -850,6 +909,7 @@ W_BufferedReader.typedef = TypeDef(
     read = interp2app(W_BufferedReader.read_w),
     peek = interp2app(W_BufferedReader.peek_w),
     read1 = interp2app(W_BufferedReader.read1_w),
+    readinto = interp2app(W_BufferedReader.readinto_w),
     raw = interp_attrproperty_w("w_raw", cls=W_BufferedReader),
     readline = interp2app(W_BufferedReader.readline_w),
 
@@ -1047,6 +1107,7 @@ W_BufferedRandom.typedef = TypeDef(
     read = interp2app(W_BufferedRandom.read_w),
     peek = interp2app(W_BufferedRandom.peek_w),
     read1 = interp2app(W_BufferedRandom.read1_w),
+    readinto = interp2app(W_BufferedRandom.readinto_w),
     readline = interp2app(W_BufferedRandom.readline_w),
 
     write = interp2app(W_BufferedRandom.write_w),
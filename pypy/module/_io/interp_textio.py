@@ -11,7 +11,7 @@ from pypy.module._io.interp_iobase import W_IOBase, convert_size, trap_eintr
 from rpython.rlib.rarithmetic import intmask, r_uint, r_ulonglong
 from rpython.rlib.rbigint import rbigint
 from rpython.rlib.rstring import StringBuilder
-from rpython.rlib.rutf8 import (check_utf8, next_codepoint_pos,
+from rpython.rlib.rutf8 import (CheckError, check_utf8, next_codepoint_pos,
                                 codepoints_in_utf8, codepoints_in_utf8,
                                 Utf8StringBuilder)
 
@@ -81,12 +81,20 @@ class W_IncrementalNewlineDecoder(W_Root):
             raise oefmt(space.w_TypeError,
                         "decoder should return a string result")
 
-        output, output_len = space.utf8_len_w(w_output)
+        output, lgt = space.utf8_len_w(w_output)
+        output, lgt = self.translate_newlines(output, lgt, bool(final))
+        return space.newutf8(output, lgt)
+
+    def translate_newlines(self, output, lgt, final):
+        """ Process the decoded utf-8 'output', of 'lgt' codepoints:
+        returns the pair (output, lgt) after handling the pending \\r and
+        recording and translating the newlines. """
         output_len = len(output)
         if self.pendingcr and (final or output_len):
             output = '\r' + output
             self.pendingcr = False
             output_len += 1
+            lgt += 1
 
         # retain last \r even when not translating data:
         # then readline() is sure to get \r\n in one pass
@@ -97,9 +105,10 @@ class W_IncrementalNewlineDecoder(W_Root):
                 output = output[:last]
                 self.pendingcr = True
                 output_len -= 1
+                lgt -= 1
 
         if output_len == 0:
-            return space.newutf8("", 0)
+            return "", 0
 
         # Record which newlines are read and do newline translation if
         # desired, all in one pass.
@@ -140,6 +149,7 @@ class W_IncrementalNewlineDecoder(W_Root):
                     if i < len(output) and output[i] == '\n':
                         seennl |= SEEN_CRLF
                         i += 1
+                        lgt -= 1
                     else:
                         seennl |= SEEN_CR
                     builder.append('\n')
@@ -148,8 +158,7 @@ class W_IncrementalNewlineDecoder(W_Root):
             output = builder.build()
 
         self.seennl |= seennl
-        lgt = check_utf8(output, True)
-        return space.newutf8(output, lgt)
+        return output, lgt
 
     def reset_w(self, space):
         self.seennl = 0
@@ -231,6 +240,32 @@ W_TextIOBase.typedef = TypeDef(
 )
 
 
+def _is_utf8_encoding(encoding):
+    encoding = encoding.lower().replace('-', '_')
+    return encoding == 'utf_8' or encoding == 'utf8' or encoding == 'u8'
+
+def _utf8_complete_prefix(input):
+    """Return the length of 'input' without the start of a utf-8 char
+    that would be cut at the end."""
+    end = len(input)
+    i = end - 1
+    while i >= 0 and i >= end - 3:
+        ordch = ord(input[i])
+        if ordch < 0x80:
+            break
+        if ordch >= 0xC0:
+            if ordch >= 0xF0:
+                length = 4
+            elif ordch >= 0xE0:
+                length = 3
+            else:
+                length = 2
+            if i + length > end:
+                return i
+            break
+        i -= 1
+    return end
+
 def _determine_encoding(space, encoding):
     if encoding is not None:
         return space.newtext(encoding)
@@ -443,9 +478,17 @@ class DecodeBuffer(object):
                 return False
 
         if limit < 0:
-            limit = sys.maxint
-        # XXX it might be better to search for the marker quickly, then compute
-        # the new upos afterwards.
+            # search for the marker in the utf-8 bytes, it cannot be part of
+            # a larger char; then count the chars we skipped
+            start = self.pos
+            pos = self.text.find(marker, start)
+            if pos >= 0:
+                end = pos + 1
+            else:
+                end = len(self.text)
+            self.upos += codepoints_in_utf8(self.text, start, end)
+            self.pos = end
+            return pos >= 0
         scanned = 0
         while scanned < limit:
             # don't use next_char here, since that computes a slice etc
@@ -488,6 +531,11 @@ class W_TextIOWrapper(W_TextIOBase):
         self.readtranslate = False
         self.readnl = None
 
+        self.decode_utf8 = False    # Whether _read_chunk() may decode
+                                    # utf-8 itself instead of calling
+                                    # the decoder (see _decode_utf8)
+        self.decoder_clean = True   # False if the decoder may have some
+                                    # input buffered
         self.encodefunc = None # Specialized encoding func (see below)
         self.encoding_start_of_stream = False # Whether or not it's the start
                                               # of the stream
@@ -538,6 +586,11 @@ class W_TextIOWrapper(W_TextIOBase):
                 self.w_decoder = space.call_function(
                     space.gettypeobject(W_IncrementalNewlineDecoder.typedef),
                     self.w_decoder, space.newbool(self.readtranslate))
+            self.decode_utf8 = (
+                _is_utf8_encoding(space.text_w(self.w_encoding)) and
+                space.isinstance_w(w_errors, space.w_text) and
+                space.text_w(w_errors) == 'strict')
+            self.decoder_clean = True
 
         # build the encoder object
         if space.is_true(space.call_method(w_buffer, "writable")):
@@ -682,9 +735,27 @@ class W_TextIOWrapper(W_TextIOBase):
                   "object not '%T'"
             raise oefmt(space.w_TypeError, msg, w_input)
 
-        eof = space.len_w(w_input) == 0
-        w_decoded = space.call_method(self.w_decoder, "decode",
-                                      w_input, space.newbool(eof))
+        input = space.bytes_w(w_input)
+        eof = len(input) == 0
+        w_decoded = None
+        if self.decode_utf8 and self._decoder_is_clean(space, dec_buffer):
+            # a char split between two chunks is left to the decoder: it
+            # keeps the start of it, and decodes the next chunk
+            split = _utf8_complete_prefix(input)
+            assert split >= 0
+            w_decoded = self._decode_utf8(space, input[:split], eof)
+            if w_decoded is not None and split < len(input):
+                w_rest = space.call_method(self.w_decoder, "decode",
+                                           space.newbytes(input[split:]),
+                                           space.w_False)
+                if space.len_w(w_rest) > 0:
+                    w_decoded = space.add(w_decoded, w_rest)
+                self.decoder_clean = False
+        if w_decoded is None:
+            w_decoded = space.call_method(self.w_decoder, "decode",
+                                          space.newbytes(input),
+                                          space.newbool(eof))
+            self.decoder_clean = False
         self.decoded.set(space, w_decoded)
         if space.len_w(w_decoded) > 0:
             eof = False
@@ -692,11 +763,36 @@ class W_TextIOWrapper(W_TextIOBase):
         if self.telling:
             # At the snapshot point, len(dec_buffer) bytes before the read,
             # the next input to be decoded is dec_buffer + input_chunk.
-            next_input = dec_buffer + space.bytes_w(w_input)
+            next_input = dec_buffer + input
             self.snapshot = PositionSnapshot(dec_flags, next_input)
 
         return not eof
 
+    def _decoder_is_clean(self, space, dec_buffer):
+        # 'dec_buffer' is the buffer of the decoder's state, if _read_chunk()
+        # already got it, or None
+        if not self.decoder_clean:
+            if dec_buffer is None:
+                w_state = space.call_method(self.w_decoder, "getstate")
+                w_dec_buffer = space.getitem(w_state, space.newint(0))
+                dec_buffer = space.bytes_w(w_dec_buffer)
+            self.decoder_clean = len(dec_buffer) == 0
+        return self.decoder_clean
+
+    def _decode_utf8(self, space, input, final):
+        """Decode 'input' without calling the decoder, which must have
+        nothing buffered.  Returns None if 'input' is not valid utf-8:
+        then the decoder must be used."""
+        try:
+            lgt = check_utf8(input, True)
+        except CheckError:
+            return None
+        if self.readuniversal:
+            decoder = space.interp_w(W_IncrementalNewlineDecoder,
+                                     self.w_decoder)
+            input, lgt = decoder.translate_newlines(input, lgt, final)
+        return space.newutf8(input, lgt)
+
     def _ensure_data(self, space):
         while not self.decoded.has_data():
             try:
@@ -713,6 +809,16 @@ class W_TextIOWrapper(W_TextIOBase):
     def next_w(self, space):
         self._check_attached(space)
         self.telling = False
+        if space.is_w(space.type(self),
+                      space.gettypeobject(W_TextIOWrapper.typedef)):
+            # readline() cannot be overridden, don't look it up
+            self._check_closed(space)
+            self._writeflush(space)
+            text, lgt = self._readline(space, -1)
+            if lgt == 0:
+                self.telling = self.seekable
+                raise OperationError(space.w_StopIteration, space.w_None)
+            return space.newutf8(text, lgt)
         try:
             return W_TextIOBase.next_w(self, space)
         except OperationError as e:
@@ -755,15 +861,14 @@ class W_TextIOWrapper(W_TextIOBase):
         return space.newutf8(builder.build(), builder.getlength())
 
     def _scan_line_ending(self, limit):
-        if self.readuniversal:
+        if self.readtranslate:
+            # Newlines are already translated, only search for \n
+            return self.decoded.find_char('\n', limit)
+        elif self.readuniversal:
             return self.decoded.find_newline_universal(limit)
         else:
-            if self.readtranslate:
-                # Newlines are already translated, only search for \n
-                newline = '\n'
-            else:
-                # Non-universal mode.
-                newline = self.readnl
+            # Non-universal mode.
+            newline = self.readnl
             if newline == '\r\n':
                 return self.decoded.find_crlf(limit)
             else:
@@ -1021,6 +1126,7 @@ class W_TextIOWrapper(W_TextIOBase):
             w_decoded = space.call_method(self.w_decoder, "decode",
                                           w_chunk, space.newbool(bool(cookie.need_eof)))
             w_decoded = check_decoded(space, w_decoded)
+            self.decoder_clean = False
 
             # Skip chars_to_skip of the decoded characters
             if space.len_w(w_decoded) < cookie.chars_to_skip:
@@ -200,6 +200,55 @@ def test_readline():
     reads += txt.readline()
     assert reads == r
 
+def test_iterate_utf8():
+    data = u"h\xe9llo\r\nw\u1234rld\n\U0001f600\rend".encode("utf-8")
+    for chunk_size in range(1, 12):
+        t = _io.TextIOWrapper(_io.BytesIO(data), encoding="utf-8")
+        t._CHUNK_SIZE = chunk_size
+        assert list(t) == [u"h\xe9llo\n", u"w\u1234rld\n",
+                           u"\U0001f600\n", u"end"]
+        assert t.newlines == (u"\r", u"\n", u"\r\n")
+        t = _io.TextIOWrapper(_io.BytesIO(data), encoding="utf-8",
+                              newline="")
+        t._CHUNK_SIZE = chunk_size
+        assert t.readline() == u"h\xe9llo\r\n"
+        pos = t.tell()
+        assert t.readline() == u"w\u1234rld\n"
+        t.seek(pos)
+        assert list(t) == [u"w\u1234rld\n", u"\U0001f600\r", u"end"]
+
+def test_iterate_utf8_invalid():
+    data = b"abc\n\xe9\n"
+    t = _io.TextIOWrapper(_io.BytesIO(data), encoding="utf-8")
+    assert t.readline() == u"abc\n"
+    raises(UnicodeDecodeError, t.readline)
+    t = _io.TextIOWrapper(_io.BytesIO(b"abc\n\xc3"), encoding="utf-8")
+    t._CHUNK_SIZE = 2
+    assert t.readline() == u"abc\n"
+    raises(UnicodeDecodeError, t.readline)
+    t = _io.TextIOWrapper(_io.BytesIO(data), encoding="utf-8",
+                          errors="replace")
+    assert list(t) == [u"abc\n", u"\ufffd\n"]
+
+def test_readline_utf8_split_char():
+    # a char split between two reads must not make readline() wait for
+    # the next read, e.g. on a pipe
+    class Raw(_io._RawIOBase):
+        def __init__(self, pieces):
+            self.pieces = pieces
+        def readable(self):
+            return True
+        def readinto(self, b):
+            piece = self.pieces.pop(0)
+            b[:len(piece)] = piece
+            return len(piece)
+    raw = Raw([b"abc\n\xc3", b"\xa9\n", b""])
+    t = _io.TextIOWrapper(_io.BufferedReader(raw), encoding="utf-8")
+    assert t.readline() == u"abc\n"
+    assert len(raw.pieces) == 2
+    assert t.readline() == u"\xe9\n"
+    assert t.readline() == u""
+
 def test_name():
     t = _io.TextIOWrapper(_io.BytesIO(""))
     # CPython raises an AttributeError, we raise a TypeError.
@@ -0,0 +1,55 @@
+""" throughput of BufferedReader.readinto() into bytearray, array and mmap
+targets, compared to read().  Run it with a translated pypy:
+
+    pypy bench_readinto.py [size-in-MB]
+"""
+
+import array, io, mmap, os, sys, tempfile, time
+
+CHUNK = 1024 * 1024
+
+def make_file(size):
+    fd, name = tempfile.mkstemp()
+    block = os.urandom(CHUNK)
+    with os.fdopen(fd, 'wb') as f:
+        for i in xrange(size // CHUNK):
+            f.write(block)
+    return name
+
+def count_throughput(name, size, function):
+    t0 = time.time()
+    function()
+    tk = time.time()
+    print "%-20s %6.2f GB/s" % (name, size / (tk - t0) / 1e9)
+
+def bench_readinto(size=1024 * CHUNK):
+    filename = make_file(size)
+    try:
+        def read_loop(target):
+            def loop():
+                with io.open(filename, 'rb') as f:
+                    while f.readinto(target):
+                        pass
+            return loop
+
+        def read():
+            with io.open(filename, 'rb') as f:
+                while f.read(CHUNK):
+                    pass
+
+        count_throughput("read", size, read)
+        count_throughput("readinto bytearray", size,
+                         read_loop(bytearray(CHUNK)))
+        count_throughput("readinto array", size,
+                         read_loop(array.array('c', '\0' * CHUNK)))
+        m = mmap.mmap(-1, CHUNK)
+        count_throughput("readinto mmap", size, read_loop(m))
+        m.close()
+    finally:
+        os.unlink(filename)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        bench_readinto(int(sys.argv[1]) * CHUNK)
+    else:
+        bench_readinto()
@@ -169,6 +169,36 @@ class AppTestBufferedReader:
         assert f.readinto(a) == 99
         assert a == '\nb\nc' + 'a\nb\nc' * 19 + 'x' * 100
 
+    def test_readinto_direct(self):
+        import _io
+        class RecordingFileIO(_io.FileIO):
+            def readinto(self, buf):
+                self.sizes.append(len(buf))
+                return _io.FileIO.readinto(self, buf)
+        raw = RecordingFileIO(self.bigtmpfile)
+        raw.sizes = []
+        f = _io.BufferedReader(raw, buffer_size=8)
+        assert f.read(1) == 'a'
+        assert raw.sizes == [8]
+        # the 7 buffered bytes are copied, the rest is read directly
+        a = bytearray(50)
+        assert f.readinto(a) == 50
+        assert a == ('a\nb\nc' * 11)[1:51]
+        assert raw.sizes == [8, 43]
+        assert f.tell() == 51
+        # small reads go through the buffer again
+        a = bytearray(4)
+        assert f.readinto(a) == 4
+        assert a == ('a\nb\nc' * 11)[51:55]
+        assert raw.sizes == [8, 43, 8]
+        assert f.tell() == 55
+        a = bytearray(100)
+        assert f.readinto(memoryview(a)) == 45
+        assert a[:45] == ('a\nb\nc' * 20)[55:]
+        assert f.tell() == 100
+        assert f.readinto(a) == 0
+        f.close()
+
     def test_seek(self):
         import _io
         raw = _io.FileIO(self.tmpfile)
@@ -299,6 +329,37 @@ class AppTestBufferedReaderOnRevDB(AppTestBufferedReader):
     spaceconfig = {'usemodules': ['_io'], 'translation.reverse_debugger': True}
 
 
+class AppTestBufferedReaderReadintoTargets:
+    spaceconfig = dict(usemodules=['_io', 'array', 'mmap'])
+
+    def setup_class(cls):
+        tmpfile = udir.join('readintotmpfile')
+        tmpfile.write("0123456789" * 100, mode='wb')
+        cls.w_tmpfile = cls.space.wrap(str(tmpfile))
+
+    def test_readinto_array(self):
+        import _io, array
+        f = _io.BufferedReader(_io.FileIO(self.tmpfile), buffer_size=16)
+        a = array.array('c', 'x' * 300)
+        assert f.readinto(a) == 300
+        assert a.tostring() == "0123456789" * 30
+        a = array.array('i', [0] * 100)
+        assert f.readinto(a) == 100 * a.itemsize
+        assert a.tostring() == ("0123456789" * 100)[300:300 + 100 * a.itemsize]
+        f.close()
+
+    def test_readinto_mmap(self):
+        import _io, mmap
+        f = _io.BufferedReader(_io.FileIO(self.tmpfile), buffer_size=16)
+        assert f.read(5) == "01234"
+        m = mmap.mmap(-1, 2000)
+        assert f.readinto(m) == 995
+        assert m[:995] == ("0123456789" * 100)[5:]
+        assert m[995:1000] == "\0" * 5
+        m.close()
+        f.close()
+
+
 class AppTestBufferedWriter:
     spaceconfig = dict(usemodules=['_io', 'thread'])
 
@@ -720,6 +781,20 @@ class AppTestBufferedRandom:
         f.seek(0)
         assert f.read() == 'a\nbxxxx'
 
+    def test_readinto_after_write(self):
+        import _io
+        raw = _io.FileIO(self.tmpfile, 'wb+')
+        raw.write("a\nb\nc" * 10)
+        raw.seek(0)
+        f = _io.BufferedRandom(raw, buffer_size=8)
+        f.write('XY')
+        a = bytearray(20)
+        assert f.readinto(a) == 20
+        assert a == ('a\nb\nc' * 5)[2:22]
+        assert f.tell() == 22
+        f.seek(0)
+        assert f.read(5) == 'XYb\nc'
+
     def test_simple_read_after_write(self):
         import _io
         raw = _io.FileIO(self.tmpfile, 'wb+')
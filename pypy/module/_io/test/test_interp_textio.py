@@ -88,3 +88,48 @@ def test_next_char(text):
         ch = buf.next_char()
         assert ch == text[i].encode('utf-8')
     assert buf.exhausted()
+
+@given(text=st.text(), chunk_size=st.integers(min_value=1, max_value=20),
+       mode=st.sampled_from([None, '\n', '']))
+@settings(deadline=None, database=None)
+@example(text=u'a\xe9\r\nb\u1234\r', chunk_size=3, mode=None)
+def test_iterate_lines_utf8(space, text, chunk_size, mode):
+    # goes through _decode_utf8(), which splits chunks of arbitrary sizes
+    w_stream = W_BytesIO(space)
+    w_stream.descr_init(space, space.newbytes(text.encode('utf-8')))
+    w_textio = W_TextIOWrapper(space)
+    if mode is None:
+        w_newline = None
+        expected = text.replace(u'\r\n', u'\n').replace(u'\r', u'\n')
+    else:
+        w_newline = space.newtext(mode)
+        expected = text
+    w_textio.descr_init(space, w_stream, encoding='utf-8',
+                        w_newline=w_newline)
+    w_textio.chunk_size = chunk_size
+    assert w_textio.decode_utf8
+    lines = []
+    while True:
+        w_line = w_textio.readline_w(space)
+        line = space.utf8_w(w_line).decode('utf-8')
+        assert space.len_w(w_line) == len(line)
+        if not line:
+            break
+        lines.append(line)
+    assert u''.join(lines) == expected
+    assert w_textio.decoder_clean
+
+@given(st.text(), st.characters())
+def test_find_char(text, marker):
+    if ord(marker) >= 128:
+        marker = u'\n'
+    buf = DecodeBuffer(text.encode('utf8'), len(text))
+    found = buf.find_char(marker.encode('ascii'), -1)
+    index = text.find(marker)
+    assert found == (index >= 0)
+    if found:
+        assert buf.upos == index + 1
+        assert buf.pos == len(text[:index + 1].encode('utf8'))
+    else:
+        assert buf.exhausted()
+        assert buf.upos == len(text)
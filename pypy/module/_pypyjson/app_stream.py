@@ -0,0 +1,15 @@
+def iterload(f, array_items=False, chunk_size=65536):
+    """Decode the JSON values read from the file-like object 'f' (anything
+    with a read(size) method, like files or mmaps), yielding each of them
+    as soon as it is complete.  With 'array_items', the file must contain
+    an array, whose items are yielded one by one."""
+    from _pypyjson import JSONStreamDecoder
+    decoder = JSONStreamDecoder(array_items)
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        for value in decoder.feed(chunk):
+            yield value
+    for value in decoder.close():
+        yield value
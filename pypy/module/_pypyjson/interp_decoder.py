@@ -5,6 +5,7 @@ from rpython.rlib import rfloat, jit, objectmodel, rutf8
 from rpython.rtyper.lltypesystem import lltype, rffi
 from rpython.rlib.rarithmetic import r_uint
 from pypy.interpreter.error import oefmt
+from pypy.interpreter.gateway import unwrap_spec
 from pypy.interpreter import unicodehelper
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.module._pypyjson import simd
@@ -48,6 +49,26 @@ class IntCache(object):
         return self.space.newint(intval)
 
 
+class StringCacheSettings(object):
+    """ The limits of the string caches of the decoders, which can be changed
+    with _pypyjson.string_cache_limits(), and the statistics about them
+    returned by _pypyjson.string_cache_stats(). """
+
+    # string caching is only used if the total size of the message is larger
+    # than a megabyte. Below that, there can't be that many repeated big
+    # strings anyway (some experiments showed this to be a reasonable cutoff
+    # size)
+    MIN_SIZE = 1024 * 1024
+    # the maximum number of entries in each of the two caches of a decoder
+    MAX_ENTRIES = 64 * 1024
+
+    def __init__(self, space):
+        self.min_size = self.MIN_SIZE
+        self.max_entries = self.MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+
+
 class JSONDecoder(W_Root):
 
     LRU_SIZE = 16
@@ -55,12 +76,6 @@ class JSONDecoder(W_Root):
 
     DEFAULT_SIZE_SCRATCH = 20
 
-    # string caching is only used if the total size of the message is larger
-    # than a megabyte. Below that, there can't be that many repeated big
-    # strings anyway (some experiments showed this to be a reasonable cutoff
-    # size)
-    MIN_SIZE_FOR_STRING_CACHE = 1024 * 1024
-
     # evaluate the string cache for 200 strings, before looking at the hit rate
     # and deciding whether to keep doing it
     STRING_CACHE_EVALUATION_SIZE = 200
@@ -94,6 +109,11 @@ class JSONDecoder(W_Root):
         # and we ignore collisions.
         self.cache_keys = {}
         self.cache_values = {}
+        self.string_cache = space.fromcache(StringCacheSettings)
+        self.min_size_for_string_cache = self.string_cache.min_size
+        self.max_cache_entries = self.string_cache.max_entries
+        self.cache_hits = 0
+        self.cache_misses = 0
 
         # we don't cache *all* non-key strings, that would be too expensive.
         # instead, keep a cache of the last 16 strings hashes around and add a
@@ -112,10 +132,16 @@ class JSONDecoder(W_Root):
         # object, before they get copied into the eventual dict
         self.scratch = [[None] * self.DEFAULT_SIZE_SCRATCH]
 
+        # if not None, objects are decoded into instances of this class
+        # instead of into dicts (see loads(s, object_class))
+        self.w_object_class = None
+
 
     def close(self):
         rffi.free_nonmovingbuffer_ll(self.ll_chars, self.llobj, self.flag)
         lltype.free(self.end_ptr, flavor='raw')
+        self.string_cache.hits += self.cache_hits
+        self.string_cache.misses += self.cache_misses
         # clean up objects that are instances of now blocked maps
         for w_obj in self.unclear_objects:
             jsonmap = self._get_jsonmap_from_dict(w_obj)
@@ -332,6 +358,8 @@ class JSONDecoder(W_Root):
         i = self.skip_whitespace(i)
         if self.ll_chars[i] == '}':
             self.pos = i+1
+            if self.w_object_class is not None:
+                return self._new_instance()
             return self.space.newdict()
 
         if self.scratch:
@@ -368,6 +396,9 @@ class JSONDecoder(W_Root):
             if ch == '}':
                 self.pos = i
                 self.scratch.append(values_w)  # can reuse next time
+                if self.w_object_class is not None:
+                    return self._create_instance_map(values_w, currmap,
+                                                     nextindex)
                 if currmap.is_state_blocked():
                     dict_w = self._switch_to_dict(currmap, values_w, nextindex)
                     return self._create_dict(dict_w)
@@ -453,9 +484,44 @@ class JSONDecoder(W_Root):
         return self.space.newutf8(content, lgt)
 
     def _create_dict(self, d):
+        if self.w_object_class is not None:
+            return self._create_instance_dict(d)
         from pypy.objspace.std.dictmultiobject import from_unicode_key_dict
         return from_unicode_key_dict(self.space, d)
 
+    def _new_instance(self):
+        from pypy.objspace.std.objectobject import W_ObjectObject
+        return self.space.allocate_instance(W_ObjectObject,
+                                            self.w_object_class)
+
+    def _create_instance_map(self, values_w, jsonmap, length):
+        """ Make an instance of the object class whose attributes are the
+        keys of 'jsonmap'.  The attribute names are computed only once per
+        map, and setting them in the same order every time makes all these
+        instances share the same mapdict map. """
+        space = self.space
+        w_obj = self._new_instance()
+        names = jsonmap.get_attr_names_in_order()
+        for index in range(length):
+            name = names[index]
+            if name is None:
+                w_key = jsonmap.get_keys_in_order()[index]
+                space.setitem(w_obj.getdict(space), w_key, values_w[index])
+            else:
+                w_obj.setdictvalue(space, name, values_w[index])
+        return w_obj
+
+    def _create_instance_dict(self, d):
+        space = self.space
+        w_obj = self._new_instance()
+        for w_key, w_value in d.iteritems():
+            name = _attr_name(space, w_key)
+            if name is None:
+                space.setitem(w_obj.getdict(space), w_key, w_value)
+            else:
+                w_obj.setdictvalue(space, name, w_value)
+        return w_obj
+
     def _create_empty_dict(self):
         from pypy.objspace.std.dictmultiobject import create_empty_unicode_key_dict
         return create_empty_unicode_key_dict(self.space)
@@ -569,7 +635,7 @@ class JSONDecoder(W_Root):
             contextmap.decoded_strings += 1
             if not contextmap.should_cache_strings():
                 cache = False
-        if len(self.s) < self.MIN_SIZE_FOR_STRING_CACHE:
+        if len(self.s) < self.min_size_for_string_cache:
             cache = False
 
         if not cache:
@@ -594,24 +660,29 @@ class JSONDecoder(W_Root):
         try:
             entry = self.cache_values[strhash]
         except KeyError:
+            self.cache_misses += 1
             w_res = self._create_string_wrapped(start, i, nonascii)
             # only add *some* strings to the cache, because keeping them all is
             # way too expensive. first we check if the contextmap has caching
             # disabled completely. if not, we check whether we have recently
             # seen the same hash already, if yes, we cache the string.
-            if ((contextmap is not None and
-                        contextmap.decoded_strings < self.STRING_CACHE_EVALUATION_SIZE) or
-                    strhash in self.lru_cache):
-                entry = StringCacheEntry(
-                        self.getslice(start, start + length), w_res)
-                self.cache_values[strhash] = entry
-            else:
-                self.lru_cache[self.lru_index] = strhash
-                self.lru_index = (self.lru_index + 1) & self.LRU_MASK
+            # a full cache gets no new entries
+            if len(self.cache_values) < self.max_cache_entries:
+                if ((contextmap is not None and
+                            contextmap.decoded_strings < self.STRING_CACHE_EVALUATION_SIZE) or
+                        strhash in self.lru_cache):
+                    entry = StringCacheEntry(
+                            self.getslice(start, start + length), w_res)
+                    self.cache_values[strhash] = entry
+                else:
+                    self.lru_cache[self.lru_index] = strhash
+                    self.lru_index = (self.lru_index + 1) & self.LRU_MASK
             return w_res
         if not entry.compare(ll_chars, start, length):
             # collision! hopefully rare
+            self.cache_misses += 1
             return self._create_string_wrapped(start, i, nonascii)
+        self.cache_hits += 1
         if contextmap is not None:
             contextmap.cache_hits += 1
         return entry.w_uni
@@ -662,15 +733,19 @@ class JSONDecoder(W_Root):
         try:
             entry = self.cache_keys[strhash]
         except KeyError:
+            self.cache_misses += 1
             w_res = self._create_string_wrapped(start, i, nonascii)
-            entry = StringCacheEntry(
-                    self.getslice(start, start + length), w_res)
-            self.cache_keys[strhash] = entry
+            if len(self.cache_keys) < self.max_cache_entries:
+                entry = StringCacheEntry(
+                        self.getslice(start, start + length), w_res)
+                self.cache_keys[strhash] = entry
             return w_res
         if not entry.compare(ll_chars, start, length):
             # collision! hopefully rare
+            self.cache_misses += 1
             w_res = self._create_string_wrapped(start, i, nonascii)
         else:
+            self.cache_hits += 1
             w_res = entry.w_uni
         return w_res
 
@@ -997,6 +1072,9 @@ class JSONMap(MapBase):
         self.keys_in_order = None
         self.strategy_instance = None
 
+        # for loads(s, object_class)
+        self.attr_names = None
+
     def __repr__(self):
         return "<JSONMap key_repr=%s #instantiation=%s #leaves=%s prev=%r>" % (
                 self.key_repr, self.instantiation_count, self.number_of_leaves, self.prev)
@@ -1157,6 +1235,17 @@ class JSONMap(MapBase):
                 keys_in_order[index] = w_key
         return keys_in_order
 
+    def get_attr_names_in_order(self):
+        """ the keys as attribute names, with None for the keys that
+        aren't ascii """
+        attr_names = self.attr_names
+        if attr_names is None:
+            keys_in_order = self.get_keys_in_order()
+            attr_names = self.attr_names = [None] * len(keys_in_order)
+            for index, w_key in enumerate(keys_in_order):
+                attr_names[index] = _attr_name(self.space, w_key)
+        return attr_names
+
     # _____________________________________________________
 
     def _get_dot_text(self):
@@ -1176,13 +1265,48 @@ class JSONMap(MapBase):
             res += ", fillcolor=lightslategray"
         return res
 
+def _attr_name(space, w_key):
+    """ Return the key as an attribute name, or None if it isn't ascii. """
+    name = space.utf8_w(w_key)
+    if space.len_w(w_key) != len(name):
+        return None
+    return name
+
+def _check_object_class(space, w_cls):
+    from pypy.objspace.std.objectobject import W_ObjectObject
+    from pypy.objspace.std.typeobject import W_TypeObject
+    if (not isinstance(w_cls, W_TypeObject) or not w_cls.is_heaptype() or
+            not w_cls.hasdict or
+            w_cls.layout.typedef is not W_ObjectObject.typedef):
+        raise oefmt(space.w_TypeError,
+                    "object_class must be a class deriving only from "
+                    "object and with a __dict__, not %R", w_cls)
+    if w_cls.is_abstract():
+        raise oefmt(space.w_TypeError,
+                    "cannot use the abstract class %N as object_class", w_cls)
+
 @jit.dont_look_inside
-def loads(space, w_s):
+def loads(space, w_s, w_object_class=None):
+    """loads(s, object_class=None) -> object
+
+    Decode the utf-8 encoded JSON document 's'.  If 'object_class' is
+    given, every JSON object is decoded into a new instance of that class
+    instead of into a dict: the instance is made without calling
+    __new__ or __init__, and the keys and values are stored into its
+    __dict__ directly, like pickle does.  Objects with the same keys in the
+    same order make instances that share their layout."""
     if space.isinstance_w(w_s, space.w_unicode):
         raise oefmt(space.w_TypeError,
                     "Expected utf8-encoded str, got unicode")
-    s = space.bytes_w(w_s)
+    if space.is_none(w_object_class):
+        w_object_class = None
+    else:
+        _check_object_class(space, w_object_class)
+    return _loads(space, space.bytes_w(w_s), w_object_class)
+
+def _loads(space, s, w_object_class=None):
     decoder = JSONDecoder(space, s)
+    decoder.w_object_class = w_object_class
     try:
         w_res = decoder.decode_any(0)
         i = decoder.skip_whitespace(decoder.pos)
@@ -1195,3 +1319,36 @@ def loads(space, w_s):
     finally:
         decoder.close()
 
+
+@unwrap_spec(min_size=int, max_entries=int)
+def string_cache_limits(space, min_size=-1, max_entries=-1):
+    """string_cache_limits([min_size[, max_entries]]) -> (min_size, max_entries)
+
+    Set the limits of the string caches used by loads(): strings are only
+    cached in documents of at least 'min_size' bytes, and each cache of a
+    call to loads() holds at most 'max_entries' strings.  Negative
+    arguments leave the corresponding limit unchanged.  Returns the
+    previous limits."""
+    string_cache = space.fromcache(StringCacheSettings)
+    w_result = space.newtuple([space.newint(string_cache.min_size),
+                               space.newint(string_cache.max_entries)])
+    if min_size >= 0:
+        string_cache.min_size = min_size
+    if max_entries >= 0:
+        string_cache.max_entries = max_entries
+    return w_result
+
+@unwrap_spec(reset=bool)
+def string_cache_stats(space, reset=False):
+    """string_cache_stats(reset=False) -> (hits, misses)
+
+    Return the number of strings that loads() found, respectively did not
+    find, in its caches so far.  If 'reset' is true, the counters are set
+    back to zero."""
+    string_cache = space.fromcache(StringCacheSettings)
+    w_result = space.newtuple([space.newint(string_cache.hits),
+                               space.newint(string_cache.misses)])
+    if reset:
+        string_cache.hits = 0
+        string_cache.misses = 0
+    return w_result
@@ -1,6 +1,13 @@
+import math
+
+from rpython.rlib.listsort import make_timsort_class
 from rpython.rlib.rstring import StringBuilder
-from rpython.rlib import rutf8
+from rpython.rlib import jit, rutf8
 from pypy.interpreter import unicodehelper
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.objspace.std.dictmultiobject import W_DictMultiObject
+from pypy.objspace.std.floatobject import float_repr
 
 
 HEX = '0123456789abcdef'
@@ -16,17 +23,22 @@ ESCAPE_BEFORE_SPACE = [ESCAPE_DICT.get(chr(_i), '\\u%04x' % _i)
                        for _i in range(32)]
 
 
+def _is_safe_ascii(s):
+    """ Returns the index of the first character of 's' that needs to be
+    escaped, or -1 if there is none. """
+    for i in range(len(s)):
+        c = s[i]
+        if c >= ' ' and c <= '~' and c != '"' and c != '\\':
+            pass
+        else:
+            return i
+    return -1
+
 def raw_encode_basestring_ascii(space, w_string):
     if space.isinstance_w(w_string, space.w_bytes):
         s = space.bytes_w(w_string)
-        for i in range(len(s)):
-            c = s[i]
-            if c >= ' ' and c <= '~' and c != '"' and c != '\\':
-                pass
-            else:
-                first = i
-                break
-        else:
+        first = _is_safe_ascii(s)
+        if first < 0:
             # the input is a string with only non-special ascii chars
             return w_string
 
@@ -45,6 +57,14 @@ def raw_encode_basestring_ascii(space, w_string):
         sb = StringBuilder(len(s))
         first = 0
 
+    _append_escaped(sb, s, first)
+    res = sb.build()
+    return space.newtext(res)
+
+
+def _append_escaped(sb, s, first):
+    """ Append to 'sb' the utf-8 string 's', starting at codepoint 'first',
+    with the special and non-ascii characters escaped. """
     it = rutf8.Utf8StringIterator(s)
     for i in range(first):
         it.next()
@@ -77,5 +97,257 @@ def raw_encode_basestring_ascii(space, w_string):
                 sb.append(HEX[(s2 >> 4) & 0x0f])
                 sb.append(HEX[s2 & 0x0f])
 
-    res = sb.build()
-    return space.newtext(res)
+
+ItemBaseTimSort = make_timsort_class()
+class ItemKeySort(ItemBaseTimSort):
+    def __init__(self, space, items):
+        ItemBaseTimSort.__init__(self, items)
+        self.space = space
+
+    def lt(self, a, b):
+        return self.space.is_true(self.space.lt(a[0], b[0]))
+
+
+class Encoder(object):
+    """ Encodes a tree of dicts, lists, tuples, strings, numbers, booleans
+    and None directly into a StringBuilder, like json.JSONEncoder.encode()
+    does with ensure_ascii=True and encoding='utf-8'.  Other objects are
+    passed to the 'default' function, whose result is encoded instead. """
+
+    def __init__(self, space, w_default, skipkeys, check_circular, allow_nan,
+                 sort_keys, indent, item_separator, key_separator):
+        self.space = space
+        self.w_default = w_default
+        self.skipkeys = skipkeys
+        self.allow_nan = allow_nan
+        self.sort_keys = sort_keys
+        self.indent = indent      # -1 means no indentation at all
+        self.item_separator = item_separator
+        self.key_separator = key_separator
+        # the containers being encoded, if check_circular is true
+        if check_circular:
+            self.markers_w = []
+        else:
+            self.markers_w = None
+        self.builder = StringBuilder()
+
+    def mark(self, w_obj):
+        markers_w = self.markers_w
+        if markers_w is not None:
+            for w_marker in markers_w:
+                if w_marker is w_obj:
+                    raise oefmt(self.space.w_ValueError,
+                                "Circular reference detected")
+            markers_w.append(w_obj)
+
+    def unmark(self, w_obj):
+        markers_w = self.markers_w
+        if markers_w is not None:
+            w_last = markers_w.pop()
+            assert w_last is w_obj
+
+    def emit_indent(self, level):
+        if self.indent < 0:
+            return self.item_separator, level
+        level += 1
+        newline_indent = '\n' + ' ' * (self.indent * level)
+        self.builder.append(newline_indent)
+        return self.item_separator + newline_indent, level
+
+    def emit_unindent(self, level):
+        if self.indent >= 0:
+            self.builder.append('\n')
+            self.builder.append(' ' * (self.indent * (level - 1)))
+
+    def floatstr(self, x):
+        if math.isnan(x):
+            text = 'NaN'
+        elif math.isinf(x):
+            if x > 0.0:
+                text = 'Infinity'
+            else:
+                text = '-Infinity'
+        else:
+            return float_repr(x)
+        if not self.allow_nan:
+            raise oefmt(self.space.w_ValueError,
+                        "Out of range float values are not JSON compliant: "
+                        "%s", float_repr(x))
+        return text
+
+    def encode_string(self, w_string):
+        space = self.space
+        sb = self.builder
+        sb.append('"')
+        if space.isinstance_w(w_string, space.w_bytes):
+            s = space.bytes_w(w_string)
+            first = _is_safe_ascii(s)
+            if first < 0:
+                sb.append(s)
+            else:
+                unicodehelper.check_utf8_or_raise(space, s)
+                sb.append_slice(s, 0, first)
+                _append_escaped(sb, s, first)
+        else:
+            _append_escaped(sb, space.utf8_w(w_string), 0)
+        sb.append('"')
+
+    def encode(self, w_obj, level):
+        space = self.space
+        if (space.isinstance_w(w_obj, space.w_bytes) or
+                space.isinstance_w(w_obj, space.w_unicode)):
+            self.encode_string(w_obj)
+        elif space.is_w(w_obj, space.w_None):
+            self.builder.append('null')
+        elif space.is_w(w_obj, space.w_True):
+            self.builder.append('true')
+        elif space.is_w(w_obj, space.w_False):
+            self.builder.append('false')
+        elif space.is_w(space.type(w_obj), space.w_int):
+            self.builder.append(str(space.int_w(w_obj)))
+        elif (space.isinstance_w(w_obj, space.w_int) or
+                space.isinstance_w(w_obj, space.w_long)):
+            self.builder.append(space.text_w(space.str(w_obj)))
+        elif space.isinstance_w(w_obj, space.w_float):
+            self.builder.append(self.floatstr(space.float_w(w_obj)))
+        elif space.isinstance_w(w_obj, space.w_list):
+            self.encode_list(w_obj, space.listview(w_obj), level)
+        elif space.isinstance_w(w_obj, space.w_tuple):
+            self.encode_list(w_obj, space.fixedview(w_obj), level)
+        elif space.isinstance_w(w_obj, space.w_dict):
+            self.encode_dict(w_obj, level)
+        else:
+            self.mark(w_obj)
+            w_res = space.call_function(self.w_default, w_obj)
+            self.encode(w_res, level)
+            self.unmark(w_obj)
+
+    def _is_empty(self, w_obj, length):
+        space = self.space
+        if (space.is_w(space.type(w_obj), space.w_list) or
+                space.is_w(space.type(w_obj), space.w_tuple) or
+                space.is_w(space.type(w_obj), space.w_dict)):
+            return length == 0
+        # subclasses may define __len__ or __nonzero__
+        return not space.is_true(w_obj)
+
+    def encode_list(self, w_list, items_w, level):
+        if self._is_empty(w_list, len(items_w)):
+            self.builder.append('[]')
+            return
+        self.mark(w_list)
+        self.builder.append('[')
+        separator, level = self.emit_indent(level)
+        first = True
+        for w_item in items_w:
+            if first:
+                first = False
+            else:
+                self.builder.append(separator)
+            self.encode(w_item, level)
+        self.emit_unindent(level)
+        self.builder.append(']')
+        self.unmark(w_list)
+
+    def encode_dict(self, w_dict, level):
+        space = self.space
+        exact = space.is_w(space.type(w_dict), space.w_dict)
+        if exact:
+            assert isinstance(w_dict, W_DictMultiObject)
+            length = w_dict.length()
+        else:
+            length = -1
+        if self._is_empty(w_dict, length):
+            self.builder.append('{}')
+            return
+        self.mark(w_dict)
+        self.builder.append('{')
+        separator, level = self.emit_indent(level)
+        first = True
+        if self.sort_keys:
+            # sorted by key only, like the pure Python encoder: the values
+            # of equal keys are not compared
+            items = []
+            w_items = space.call_method(w_dict, 'items')
+            for w_item in space.listview(w_items):
+                w_key, w_value = space.fixedview(w_item, 2)
+                items.append((w_key, w_value))
+            ItemKeySort(space, items).sort()
+            for w_key, w_value in items:
+                first = self.encode_item(w_key, w_value, first, separator,
+                                         level)
+        elif exact:
+            # uses the iterator of the dict strategy, which doesn't need to
+            # build the items of mapdict or json dicts, for example
+            assert isinstance(w_dict, W_DictMultiObject)
+            iteritems = w_dict.iteritems()
+            while True:
+                w_key, w_value = iteritems.next_item()
+                if w_key is None:
+                    break
+                first = self.encode_item(w_key, w_value, first, separator,
+                                         level)
+        else:
+            w_iter = space.call_method(w_dict, 'iteritems')
+            while True:
+                try:
+                    w_item = space.next(w_iter)
+                except OperationError as e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    break
+                w_key, w_value = space.fixedview(w_item, 2)
+                first = self.encode_item(w_key, w_value, first, separator,
+                                         level)
+        self.emit_unindent(level)
+        self.builder.append('}')
+        self.unmark(w_dict)
+
+    def encode_item(self, w_key, w_value, first, separator, level):
+        """ Encode one item of a dict, preceded by 'separator' unless it is
+        the first one.  Returns the new value of 'first'. """
+        space = self.space
+        if (space.isinstance_w(w_key, space.w_bytes) or
+                space.isinstance_w(w_key, space.w_unicode)):
+            w_strkey = w_key
+        elif space.isinstance_w(w_key, space.w_float):
+            w_strkey = space.newtext(self.floatstr(space.float_w(w_key)))
+        elif space.is_w(w_key, space.w_True):
+            w_strkey = space.newtext('true')
+        elif space.is_w(w_key, space.w_False):
+            w_strkey = space.newtext('false')
+        elif space.is_w(w_key, space.w_None):
+            w_strkey = space.newtext('null')
+        elif (space.isinstance_w(w_key, space.w_int) or
+                space.isinstance_w(w_key, space.w_long)):
+            w_strkey = space.str(w_key)
+        elif self.skipkeys:
+            return first
+        else:
+            raise oefmt(space.w_TypeError, "key %R is not a string", w_key)
+        if not first:
+            self.builder.append(separator)
+        self.encode_string(w_strkey)
+        self.builder.append(self.key_separator)
+        self.encode(w_value, level)
+        return False
+
+
+@jit.dont_look_inside
+@unwrap_spec(skipkeys=bool, check_circular=bool, allow_nan=bool,
+             sort_keys=bool, item_separator='text', key_separator='text')
+def encode(space, w_obj, w_default, skipkeys, check_circular, allow_nan,
+           sort_keys, w_indent, item_separator, key_separator):
+    """encode(obj, default, skipkeys, check_circular, allow_nan, sort_keys,
+              indent, item_separator, key_separator) -> str
+
+    Fast path of json.JSONEncoder.encode() for ensure_ascii=True and
+    encoding='utf-8'.  'indent' is None or an int."""
+    if space.is_none(w_indent):
+        indent = -1
+    else:
+        indent = max(space.int_w(w_indent), 0)
+    encoder = Encoder(space, w_default, skipkeys, check_circular, allow_nan,
+                      sort_keys, indent, item_separator, key_separator)
+    encoder.encode(w_obj, 0)
+    return space.newbytes(encoder.builder.build())
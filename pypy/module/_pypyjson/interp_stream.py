@@ -0,0 +1,176 @@
+from rpython.rlib import jit
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import oefmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef
+from pypy.module._pypyjson.interp_decoder import _loads, is_whitespace
+
+# states of the outer array, if the decoder returns its items
+(BEFORE_ARRAY, FIRST_ITEM, AFTER_ITEM, NEXT_ITEM, AFTER_ARRAY) = range(5)
+
+def is_scalar_end(ch):
+    return (is_whitespace(ch) or ch == ',' or ch == ']' or ch == '}' or
+            ch == '[' or ch == '{' or ch == '"')
+
+
+class W_JSONStreamDecoder(W_Root):
+    """ Incremental decoder: the document is fed in chunks, which are only
+    scanned to find where each value ends.  Every complete value is then
+    decoded by a regular JSONDecoder, so the maps and key caching work like
+    in loads(). Only the chunks of the value being scanned are kept. """
+
+    def __init__(self, space, array_items):
+        self.space = space
+        self.array_items = array_items
+        self.array_state = BEFORE_ARRAY
+        # the parts of the current value that come from the previous chunks
+        self.pending = []
+        self.in_value = False
+        self.in_string = False
+        self.in_scalar = False
+        self.escaped = False
+        self.depth = 0
+        self.closed = False
+
+    @unwrap_spec(array_items=bool)
+    def descr_new(space, w_subtype, array_items=False):
+        self = space.allocate_instance(W_JSONStreamDecoder, w_subtype)
+        W_JSONStreamDecoder.__init__(self, space, array_items)
+        return self
+
+    def _check_not_closed(self):
+        if self.closed:
+            raise oefmt(self.space.w_ValueError, "decoder is closed")
+
+    @jit.dont_look_inside
+    def descr_feed(self, space, w_chunk):
+        self._check_not_closed()
+        if space.isinstance_w(w_chunk, space.w_unicode):
+            raise oefmt(space.w_TypeError,
+                        "Expected utf8-encoded str, got unicode")
+        values_w = []
+        self._scan(space.bytes_w(w_chunk), values_w)
+        return space.newlist(values_w)
+
+    @jit.dont_look_inside
+    def descr_close(self, space):
+        self._check_not_closed()
+        self.closed = True
+        values_w = []
+        if self.in_scalar:
+            self._emit('', 0, 0, values_w)
+        if self.in_value:
+            raise oefmt(space.w_ValueError, "Unterminated JSON value")
+        if self.array_items and self.array_state != AFTER_ARRAY:
+            raise oefmt(space.w_ValueError, "Unterminated JSON array")
+        return space.newlist(values_w)
+
+    def _scan(self, chunk, values_w):
+        start = 0    # start of the current value in 'chunk'
+        i = 0
+        n = len(chunk)
+        while i < n:
+            ch = chunk[i]
+            if not self.in_value:
+                if is_whitespace(ch):
+                    i += 1
+                    continue
+                if self.array_items and self._array_punctuation(ch):
+                    i += 1
+                    continue
+                if ch == ']' or ch == '}' or ch == ',':
+                    raise oefmt(self.space.w_ValueError,
+                                "Unexpected '%s' between JSON values", ch)
+                start = i
+                self.in_value = True
+                self.depth = 0
+                if ch == '[' or ch == '{':
+                    self.depth = 1
+                elif ch == '"':
+                    self.in_string = True
+                else:
+                    self.in_scalar = True
+                i += 1
+            elif self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 0:
+                        self._emit(chunk, start, i + 1, values_w)
+                i += 1
+            elif self.in_scalar:
+                if is_scalar_end(ch):
+                    # the delimiter is scanned again, outside of the value
+                    self._emit(chunk, start, i, values_w)
+                else:
+                    i += 1
+            else:
+                if ch == '"':
+                    self.in_string = True
+                elif ch == '[' or ch == '{':
+                    self.depth += 1
+                elif ch == ']' or ch == '}':
+                    self.depth -= 1
+                    if self.depth == 0:
+                        self._emit(chunk, start, i + 1, values_w)
+                i += 1
+        if self.in_value:
+            self.pending.append(chunk[start:])
+
+    def _array_punctuation(self, ch):
+        """ Handle the character 'ch' of the outer array, found outside of
+        its items. Returns False if 'ch' starts an item. """
+        space = self.space
+        state = self.array_state
+        if state == BEFORE_ARRAY:
+            if ch != '[':
+                raise oefmt(space.w_ValueError, "Expected a JSON array")
+            self.array_state = FIRST_ITEM
+        elif state == FIRST_ITEM:
+            if ch != ']':
+                return False
+            self.array_state = AFTER_ARRAY
+        elif state == AFTER_ITEM:
+            if ch == ',':
+                self.array_state = NEXT_ITEM
+            elif ch == ']':
+                self.array_state = AFTER_ARRAY
+            else:
+                raise oefmt(space.w_ValueError,
+                            "Expected ',' or ']' after an array item")
+        elif state == NEXT_ITEM:
+            return False
+        else:
+            raise oefmt(space.w_ValueError, "Extra data after the JSON array")
+        return True
+
+    def _emit(self, chunk, start, end, values_w):
+        assert 0 <= start <= end
+        s = chunk[start:end]
+        if self.pending:
+            self.pending.append(s)
+            s = ''.join(self.pending)
+            self.pending = []
+        self.in_value = False
+        self.in_scalar = False
+        if self.array_items:
+            self.array_state = AFTER_ITEM
+        values_w.append(_loads(self.space, s))
+
+
+W_JSONStreamDecoder.typedef = TypeDef("_pypyjson.JSONStreamDecoder",
+    __doc__ = """JSONStreamDecoder(array_items=False)
+
+Decodes a JSON document that is given in chunks.  feed(chunk) returns
+the list of the values completed by the chunk, and close() the values
+completed by the end of the input.  If 'array_items' is true, the
+document must be an array, and its items are returned one by one;
+otherwise the document is a sequence of values separated by whitespace,
+like JSON lines.""",
+    __new__ = interp2app(W_JSONStreamDecoder.descr_new.im_func),
+    feed = interp2app(W_JSONStreamDecoder.descr_feed),
+    close = interp2app(W_JSONStreamDecoder.descr_close),
+)
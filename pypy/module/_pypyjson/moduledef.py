@@ -3,10 +3,16 @@ from pypy.interpreter.mixedmodule import MixedModule
 class Module(MixedModule):
     """fast json implementation"""
 
-    appleveldefs = {}
+    appleveldefs = {
+        'iterload' : 'app_stream.iterload',
+        }
 
     interpleveldefs = {
         'loads' : 'interp_decoder.loads',
+        'string_cache_limits' : 'interp_decoder.string_cache_limits',
+        'string_cache_stats' : 'interp_decoder.string_cache_stats',
+        'JSONStreamDecoder' : 'interp_stream.W_JSONStreamDecoder',
+        'encode' : 'interp_encoder.encode',
         'raw_encode_basestring_ascii':
             'interp_encoder.raw_encode_basestring_ascii',
         }
@@ -110,7 +110,7 @@ class TestJson(object):
         for s1 in ["abc", u"ä".encode("utf-8")]:
             s = '"%s"   "%s"    "%s"' % (s1, s1, s1)
             dec = JSONDecoder(self.space, s)
-            dec.MIN_SIZE_FOR_STRING_CACHE = 0
+            dec.min_size_for_string_cache = 0
             assert dec.pos == 0
             w_x = dec.decode_string(1)
             w_y = dec.decode_string(dec.skip_whitespace(dec.pos) + 1)
@@ -274,7 +274,8 @@ class TestJson(object):
 
 
 class AppTest(object):
-    spaceconfig = {"objspace.usemodules._pypyjson": True}
+    spaceconfig = {"objspace.usemodules._pypyjson": True,
+                   "objspace.usemodules.struct": True}
 
     def test_raise_on_unicode(self):
         import _pypyjson
@@ -480,6 +481,77 @@ class AppTest(object):
         res = _pypyjson.loads(json)
         assert res == [{u'a': 1}, {u'a': 2}]
 
+    def test_string_cache_limits_and_stats(self):
+        import _pypyjson
+        old = _pypyjson.string_cache_limits(0)
+        try:
+            assert old == (1024 * 1024, 64 * 1024)
+            assert _pypyjson.string_cache_limits() == (0, 64 * 1024)
+            _pypyjson.string_cache_stats(reset=True)
+            res = _pypyjson.loads('[{"a": "x"}, {"a": "x"}, {"a": "x"}]')
+            assert res == [{u'a': u'x'}] * 3
+            assert res[0][u'a'] is res[2][u'a']
+            hits, misses = _pypyjson.string_cache_stats()
+            assert hits >= 2 and misses >= 1
+            assert _pypyjson.string_cache_stats(True) == (hits, misses)
+            assert _pypyjson.string_cache_stats() == (0, 0)
+            # with empty caches, nothing is ever found
+            _pypyjson.string_cache_limits(max_entries=0)
+            res = _pypyjson.loads('[{"a": "x"}, {"a": "x"}, {"a": "x"}]')
+            assert res == [{u'a': u'x'}] * 3
+            assert _pypyjson.string_cache_stats()[0] == 0
+        finally:
+            _pypyjson.string_cache_limits(*old)
+
+    def test_stream_decoder(self):
+        import _pypyjson
+        doc = '{"a": [1, 2.5, "x\\"y"]}\n"s t"  42 true\n[]{"b":null}-1'
+        for size in [1, 2, 3, 7, len(doc)]:
+            dec = _pypyjson.JSONStreamDecoder()
+            res = []
+            for i in range(0, len(doc), size):
+                res.extend(dec.feed(doc[i:i + size]))
+            res.extend(dec.close())
+            assert res == [{u'a': [1, 2.5, u'x"y']}, u's t', 42, True, [],
+                           {u'b': None}, -1]
+        dec = _pypyjson.JSONStreamDecoder()
+        assert dec.feed('[1, 2') == []
+        raises(ValueError, dec.close)
+        raises(ValueError, dec.feed, '3]')
+        dec = _pypyjson.JSONStreamDecoder()
+        raises(ValueError, dec.feed, '[1, 2]]')
+        raises(TypeError, dec.feed, u'[]')
+
+    def test_stream_decoder_array_items(self):
+        import _pypyjson
+        doc = ' [ {"a": 1}, "x,]", [2, [3]] ,4 , null]  '
+        for size in [1, 2, 5, len(doc)]:
+            dec = _pypyjson.JSONStreamDecoder(array_items=True)
+            res = []
+            for i in range(0, len(doc), size):
+                res.extend(dec.feed(doc[i:i + size]))
+            res.extend(dec.close())
+            assert res == [{u'a': 1}, u'x,]', [2, [3]], 4, None]
+        dec = _pypyjson.JSONStreamDecoder(True)
+        assert dec.feed('[]') == []
+        assert dec.close() == []
+        for doc in ['{}', '[1 2]', '[1,]', '[,1]', '[1] 2']:
+            dec = _pypyjson.JSONStreamDecoder(True)
+            raises(ValueError, "dec.feed(doc); dec.close()")
+        dec = _pypyjson.JSONStreamDecoder(True)
+        assert dec.feed('[1, 2') == [1]
+        raises(ValueError, dec.close)
+
+    def test_iterload(self):
+        import _pypyjson, StringIO
+        f = StringIO.StringIO('[' + ', '.join(['{"a": %d}' % i
+                                               for i in range(100)]) + ']')
+        it = _pypyjson.iterload(f, array_items=True, chunk_size=16)
+        assert next(it) == {u'a': 0}
+        assert list(it) == [{u'a': i} for i in range(1, 100)]
+        f = StringIO.StringIO('1\n2\n[3]\n')
+        assert list(_pypyjson.iterload(f, chunk_size=1)) == [1, 2, [3]]
+
     def test_huge_map(self):
         import _pypyjson
         import __pypy__
@@ -488,6 +560,37 @@ class AppTest(object):
         assert len(res) == 200
         assert __pypy__.strategy(res) == "UnicodeDictStrategy"
 
+    def test_loads_object_class(self):
+        import _pypyjson
+        import __pypy__
+        class Point(object):
+            def __init__(self):
+                raise AssertionError("should not be called")
+        s = '[' + ', '.join(['{"x": %d, "y": [%d, {}]}' % (i, -i)
+                             for i in range(20)]) + ']'
+        res = _pypyjson.loads(s, Point)
+        assert len(res) == 20
+        for i, p in enumerate(res):
+            assert type(p) is Point
+            assert p.x == i
+            assert p.y[0] == -i
+            assert type(p.y[1]) is Point
+            assert p.y[1].__dict__ == {}
+            assert __pypy__.strategy(p.__dict__) == "MapDictStrategy"
+        p = _pypyjson.loads('{"a": 1, "a": 2, "\\u20ac": 3}', Point)
+        assert p.a == 2
+        assert p.__dict__[u"\u20ac"] == 3
+        s = '{' + ",".join('"k%s": %s' % (i, i) for i in range(200)) + '}'
+        p = _pypyjson.loads(s, Point)
+        assert p.k0 == 0
+        assert p.k199 == 199
+        assert _pypyjson.loads('{"a": 1}', None) == {u"a": 1}
+        class Slots(object):
+            __slots__ = ['a']
+        raises(TypeError, _pypyjson.loads, '{}', Slots)
+        raises(TypeError, _pypyjson.loads, '{}', int)
+        raises(TypeError, _pypyjson.loads, '{}', 42)
+
     def test_tab_in_string_should_fail(self):
         import _pypyjson
         # http://json.org/JSON_checker/test/fail25.json
@@ -513,6 +616,95 @@ class AppTest(object):
         assert check("\\\"\b\f\n\r\t") == '\\\\\\"\\b\\f\\n\\r\\t'
         assert check("\x07") == "\\u0007"
 
+    def test_encode(self):
+        import _pypyjson
+        def default(o):
+            if isinstance(o, set):
+                return sorted(o)
+            raise TypeError(repr(o) + " is not JSON serializable")
+        def encode(o, skipkeys=False, check_circular=True, allow_nan=True,
+                   sort_keys=False, indent=None, separators=(', ', ': ')):
+            return _pypyjson.encode(o, default, skipkeys, check_circular,
+                                    allow_nan, sort_keys, indent,
+                                    separators[0], separators[1])
+        assert encode([]) == '[]'
+        assert encode({}) == '{}'
+        assert encode([1, -2L, 1.5, True, False, None, "a\"b", u"\xe9"]) == (
+            '[1, -2, 1.5, true, false, null, "a\\"b", "\\u00e9"]')
+        assert encode((1, [2, (3,)])) == '[1, [2, [3]]]'
+        assert encode({"a": {"b": []}}) == '{"a": {"b": []}}'
+        assert encode({1: 2, 1.5: 3, None: 4, False: 5}, sort_keys=True) == (
+            '{"null": 4, "false": 5, "1": 2, "1.5": 3}')
+        assert encode({"b": 1, "a": [1, 2]}, sort_keys=True, indent=2,
+                      separators=(',', ':')) == (
+            '{\n  "a":[\n    1,\n    2\n  ],\n  "b":1\n}')
+        class AlwaysEqual(str):
+            def __eq__(self, other):
+                return True
+            __hash__ = str.__hash__
+        # sorted by key only: comparing the items would compare the values
+        d = {AlwaysEqual("b"): set([1]), AlwaysEqual("a"): set([2])}
+        assert encode(d, sort_keys=True) == '{"a": [2], "b": [1]}'
+        class Uncomparable(set):
+            def __eq__(self, other):
+                raise TypeError
+            __lt__ = __gt__ = __le__ = __ge__ = __ne__ = __eq__
+            __hash__ = None
+        d = {AlwaysEqual("b"): Uncomparable([1]),
+             AlwaysEqual("a"): Uncomparable([2])}
+        assert encode(d, sort_keys=True) == '{"a": [2], "b": [1]}'
+        assert encode(float('inf')) == 'Infinity'
+        raises(ValueError, encode, [float('nan')], allow_nan=False)
+        assert encode(set([2, 1])) == '[1, 2]'
+        raises(TypeError, encode, object())
+        raises(TypeError, encode, {(1,): 2})
+        assert encode({(1,): 2, "a": 1}, skipkeys=True) == '{"a": 1}'
+        raises(UnicodeDecodeError, encode, "\xc0")
+        l = [1]
+        l.append(l)
+        raises(ValueError, encode, l)
+        d = {}
+        d["x"] = [d]
+        raises(ValueError, encode, d)
+        x = [1]
+        assert encode([x, x]) == '[[1], [1]]'
+
+    def test_encode_subclasses_and_instance_dicts(self):
+        import _pypyjson
+        class A(object):
+            pass
+        a = A()
+        a.x = 1
+        a.y = "z"
+        def encode(o):
+            return _pypyjson.encode(o, None, False, True, True, False, None,
+                                    ', ', ': ')
+        assert encode(a.__dict__) in ('{"x": 1, "y": "z"}',
+                                      '{"y": "z", "x": 1}')
+        class I(int):
+            def __str__(self):
+                return "seven"
+        class D(dict):
+            def iteritems(self):
+                return iter([("k", "v")])
+        class L(list):
+            def __iter__(self):
+                return iter([42])
+        assert encode([I(7), D(a=1), L([1, 2])]) == (
+            '[seven, {"k": "v"}, [42]]')
+
+    def test_json_dumps(self):
+        import json
+        assert json.dumps({"a": [1, 2.0, None]}) == '{"a": [1, 2.0, null]}'
+        assert json.dumps([u"\u1234"]) == '["\\u1234"]'
+        assert json.dumps([u"\u1234"], ensure_ascii=False) == u'["\u1234"]'
+        assert json.dumps({"b": 1, "a": 2}, sort_keys=True,
+                          separators=(',', ':')) == '{"a":2,"b":1}'
+        class E(json.JSONEncoder):
+            def default(self, o):
+                return "<%s>" % (type(o).__name__,)
+        assert json.dumps([object()], cls=E) == '["<object>"]'
+
     def test_error_position(self):
         import _pypyjson
         test_cases = [
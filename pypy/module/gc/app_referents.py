@@ -57,6 +57,7 @@ class GcStats(object):
                      'total_allocated_memory', 'jit_backend_allocated',
                      'peak_memory', 'peak_allocated_memory', 'total_arena_memory',
                      'total_rawmalloced_memory', 'nursery_size',
+                     'nursery_surviving_size', 'arena_free_pages_memory',
                      'peak_arena_memory', 'peak_rawmalloced_memory',
                      ):
             setattr(self, item, self._format(getattr(self._s, item)))
@@ -68,6 +69,10 @@ class GcStats(object):
         self.memory_allocated_sum = self._format(self._s.total_allocated_memory + memory_pressure +
                                             self._s.jit_backend_allocated)
         self.total_gc_time = self._s.total_gc_time
+        self.nursery_resizes = self._s.nursery_resizes
+        # list of (block_size, pages, used_memory, capacity) for the
+        # small objects in the arenas, one entry per size class in use
+        self.size_classes = self._s.size_classes
 
     def _format(self, v):
         if v < 1000000:
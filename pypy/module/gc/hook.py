@@ -54,6 +54,12 @@ class LowLevelGcHooks(GcHooks):
         action.newstate = newstate
         action.fire()
 
+    def on_gc_pause_miss(self, duration, target, state):
+        # reported together with the following on_gc_collect_step()
+        action = self.w_hooks.gc_collect_step
+        action.pause_misses += 1
+        action.duration_target = target
+
     def on_gc_collect(self, num_major_collects,
                       arenas_count_before, arenas_count_after,
                       arenas_bytes, rawmalloc_bytes_before,
@@ -185,6 +191,8 @@ class GcCollectStepHookAction(NoRecursiveAction):
         self.duration = 0.0
         self.duration_min = inf
         self.duration_max = 0.0
+        self.pause_misses = 0
+        self.duration_target = 0.0
 
     def fix_annotation(self):
         # the annotation of the class and its attributes must be completed
@@ -197,6 +205,8 @@ class GcCollectStepHookAction(NoRecursiveAction):
             self.duration_max = NonConstant(-53.2)
             self.oldstate = NonConstant(-42)
             self.newstate = NonConstant(-42)
+            self.pause_misses = NonConstant(-42)
+            self.duration_target = NonConstant(-53.2)
             self.fire()
 
     def _do_perform(self, ec, frame):
@@ -207,7 +217,9 @@ class GcCollectStepHookAction(NoRecursiveAction):
             self.duration_max,
             self.oldstate,
             self.newstate,
-            rgc.is_done__states(self.oldstate, self.newstate))
+            rgc.is_done__states(self.oldstate, self.newstate),
+            self.pause_misses,
+            self.duration_target)
         self.reset()
         self.space.call_function(self.w_callable, w_stats)
 
@@ -289,7 +301,8 @@ class W_GcCollectStepStats(W_Root):
     GC_STATES = tuple(incminimark.GC_STATES + ['USERDEL'])
 
     def __init__(self, count, duration, duration_min, duration_max,
-                 oldstate, newstate, major_is_done):
+                 oldstate, newstate, major_is_done, pause_misses=0,
+                 duration_target=0.0):
         self.count = count
         self.duration = duration
         self.duration_min = duration_min
@@ -297,6 +310,8 @@ class W_GcCollectStepStats(W_Root):
         self.oldstate = oldstate
         self.newstate = newstate
         self.major_is_done = major_is_done
+        self.pause_misses = pause_misses
+        self.duration_target = duration_target
 
 
 class W_GcCollectStats(W_Root):
@@ -372,8 +387,10 @@ W_GcCollectStepStats.typedef = TypeDef(
         "duration",
         "duration_min",
         "duration_max",
+        "duration_target",
         "oldstate",
-        "newstate"))
+        "newstate",
+        "pause_misses"))
     )
 
 W_GcCollectStats.typedef = TypeDef(
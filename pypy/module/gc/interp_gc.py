@@ -135,6 +135,24 @@ def collect_step(space):
     w_stats = sc.do()
     return w_stats
 
+def freeze(space):
+    """Run a full collection, then move all the surviving objects to a
+    permanent generation that is ignored by all future collections.
+    Call this in the parent process just before forking the workers of a
+    preforking server: the memory pages holding these objects are then
+    not written to by the GC any more, and stay shared between the
+    processes.  The frozen objects are never freed.
+    """
+    from pypy.objspace.std.typeobject import MethodCache
+    from pypy.objspace.std.mapdict import MapAttrCache
+    space.fromcache(MethodCache).clear()
+    space.fromcache(MapAttrCache).clear()
+    # run the pending finalizers first, so that the objects they release
+    # are not frozen forever
+    rgc.collect()
+    _run_finalizers(space)
+    rgc.freeze()
+
 # ____________________________________________________________
 
 @unwrap_spec(filename='fsencode')
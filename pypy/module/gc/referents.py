@@ -1,6 +1,7 @@
 from rpython.rlib import rgc, jit_hooks
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.typedef import TypeDef, interp_attrproperty
+from pypy.interpreter.typedef import GetSetProperty
 from pypy.interpreter.gateway import unwrap_spec, interp2app
 from pypy.interpreter.error import oefmt, wrap_oserror
 from rpython.rlib.objectmodel import we_are_translated
@@ -191,7 +192,37 @@ class W_GcStats(W_Root):
         self.peak_arena_memory = rgc.get_stats(rgc.PEAK_ARENA_MEMORY)
         self.peak_rawmalloced_memory = rgc.get_stats(rgc.PEAK_RAWMALLOCED_MEMORY)
         self.nursery_size = rgc.get_stats(rgc.NURSERY_SIZE)
+        self.nursery_surviving_size = rgc.get_stats(
+            rgc.NURSERY_SURVIVING_SIZE)
+        self.nursery_resizes = rgc.get_stats(rgc.NURSERY_RESIZES)
         self.total_gc_time = rgc.get_stats(rgc.TOTAL_GC_TIME)
+        self.arena_free_pages_memory = rgc.get_stats(
+            rgc.ARENA_FREE_PAGES_MEMORY)
+        # a flat list of (block_size, pages, used_memory, capacity) for
+        # every size class that has pages in the arenas
+        self.size_classes = []
+        for size_class in range(1, rgc.get_stats(rgc.NUM_SIZE_CLASSES)):
+            pages = rgc.get_stats(rgc.size_class_stat(rgc.SIZE_CLASS_PAGES,
+                                                      size_class))
+            if pages == 0:
+                continue
+            self.size_classes.append(rgc.get_stats(rgc.size_class_stat(
+                rgc.SIZE_CLASS_BLOCK_SIZE, size_class)))
+            self.size_classes.append(pages)
+            self.size_classes.append(rgc.get_stats(rgc.size_class_stat(
+                rgc.SIZE_CLASS_USED_MEMORY, size_class)))
+            self.size_classes.append(rgc.get_stats(rgc.size_class_stat(
+                rgc.SIZE_CLASS_CAPACITY, size_class)))
+
+    def descr_get_size_classes(self, space):
+        items_w = []
+        for i in range(0, len(self.size_classes), 4):
+            items_w.append(space.newtuple([
+                space.newint(self.size_classes[i]),
+                space.newint(self.size_classes[i + 1]),
+                space.newint(self.size_classes[i + 2]),
+                space.newint(self.size_classes[i + 3])]))
+        return space.newlist(items_w)
 
 W_GcStats.typedef = TypeDef("GcStats",
     total_memory_pressure=interp_attrproperty("total_memory_pressure",
@@ -218,8 +249,15 @@ W_GcStats.typedef = TypeDef("GcStats",
         cls=W_GcStats, wrapfn="newint"),
     nursery_size=interp_attrproperty("nursery_size",
         cls=W_GcStats, wrapfn="newint"),
+    nursery_surviving_size=interp_attrproperty("nursery_surviving_size",
+        cls=W_GcStats, wrapfn="newint"),
+    nursery_resizes=interp_attrproperty("nursery_resizes",
+        cls=W_GcStats, wrapfn="newint"),
     total_gc_time=interp_attrproperty("total_gc_time",
         cls=W_GcStats, wrapfn="newint"),
+    arena_free_pages_memory=interp_attrproperty("arena_free_pages_memory",
+        cls=W_GcStats, wrapfn="newint"),
+    size_classes=GetSetProperty(W_GcStats.descr_get_size_classes),
 )
 
 @unwrap_spec(memory_pressure=bool)
@@ -119,6 +119,21 @@ class AppTestGC(object):
         assert n >= 2 # at least one step + 1 finalizing
         assert X.deleted == 3
 
+    def test_gc_freeze(self):
+        import gc
+
+        class X(object):
+            deleted = 0
+            def __del__(self):
+                X.deleted += 1
+
+        X()
+        keep = [X(), X()]
+        gc.freeze()
+        assert X.deleted == 1
+        keep.append(X())
+        assert len(keep) == 3
+
 class AppTestGcDumpHeap(object):
     pytestmark = py.test.mark.xfail(run=False)
 
@@ -153,6 +168,48 @@ class AppTestGcDumpHeap(object):
         gc.dump_heap_stats(self.fname)
 
 
+class AppTestGcStats(object):
+
+    def setup_class(cls):
+        if cls.runappdirect:
+            pytest.skip("fakes the statistics of the GC")
+        from rpython.rlib import jit_hooks
+
+        def fake_get_stats(stat_no):
+            size_class = stat_no >> rgc.SIZE_CLASS_SHIFT
+            if size_class > 0:
+                if size_class != 2:
+                    return 0
+                stat_no &= (1 << rgc.SIZE_CLASS_SHIFT) - 1
+                return {rgc.SIZE_CLASS_BLOCK_SIZE: 16,
+                        rgc.SIZE_CLASS_PAGES: 3,
+                        rgc.SIZE_CLASS_USED_MEMORY: 480,
+                        rgc.SIZE_CLASS_CAPACITY: 12000}[stat_no]
+            if stat_no == rgc.NUM_SIZE_CLASSES:
+                return 5
+            if stat_no == rgc.ARENA_FREE_PAGES_MEMORY:
+                return 8192
+            return 0
+
+        cls._backup = [rgc.get_stats, jit_hooks.stats_asmmemmgr_allocated,
+                       jit_hooks.stats_asmmemmgr_used]
+        rgc.get_stats = fake_get_stats
+        jit_hooks.stats_asmmemmgr_allocated = lambda warmrunnerdesc: 0
+        jit_hooks.stats_asmmemmgr_used = lambda warmrunnerdesc: 0
+
+    def teardown_class(cls):
+        from rpython.rlib import jit_hooks
+        (rgc.get_stats, jit_hooks.stats_asmmemmgr_allocated,
+         jit_hooks.stats_asmmemmgr_used) = cls._backup
+
+    def test_size_classes(self):
+        import gc
+        stats = gc.get_stats()
+        assert stats.size_classes == [(16, 3, 480, 12000)]
+        assert stats.arena_free_pages_memory == "8.0kB"
+        assert stats._s.arena_free_pages_memory == 8192
+
+
 class AppTestGcMethodCache(object):
 
     def test_clear_method_cache(self):
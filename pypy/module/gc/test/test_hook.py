@@ -20,6 +20,10 @@ class AppTestGcHooks(object):
         def fire_gc_collect_step(space, duration, oldstate, newstate):
             gchooks.fire_gc_collect_step(duration, oldstate, newstate)
 
+        @unwrap_spec(ObjSpace, float, float, int)
+        def fire_gc_pause_miss(space, duration, target, state):
+            gchooks.fire_gc_pause_miss(duration, target, state)
+
         @unwrap_spec(ObjSpace, int, int, int, r_uint, r_uint, r_uint, r_uint)
         def fire_gc_collect(space, a, b, c, d, e, f, g):
             gchooks.fire_gc_collect(a, b, c, d, e, f, g)
@@ -35,6 +39,7 @@ class AppTestGcHooks(object):
 
         cls.w_fire_gc_minor = space.wrap(interp2app(fire_gc_minor))
         cls.w_fire_gc_collect_step = space.wrap(interp2app(fire_gc_collect_step))
+        cls.w_fire_gc_pause_miss = space.wrap(interp2app(fire_gc_pause_miss))
         cls.w_fire_gc_collect = space.wrap(interp2app(fire_gc_collect))
         cls.w_fire_many = space.wrap(interp2app(fire_many))
 
@@ -93,6 +98,27 @@ class AppTestGcHooks(object):
         self.fire_gc_collect_step(70, SCANNING, MARKING)  # won't fire
         assert lst == oldlst
 
+    def test_on_gc_collect_step_pause_miss(self):
+        import gc
+        lst = []
+        def on_gc_collect_step(stats):
+            lst.append((stats.count,
+                        stats.pause_misses,
+                        stats.duration_target))
+        gc.hooks.on_gc_collect_step = on_gc_collect_step
+        self.fire_gc_collect_step(1, 0, 1)
+        self.fire_gc_pause_miss(0.25, 0.125, 1)
+        self.fire_gc_collect_step(1, 1, 2)
+        assert lst == [
+            (1, 0, 0.0),
+            (1, 1, 0.125),
+            ]
+        gc.hooks.on_gc_collect_step = None
+        self.fire_gc_pause_miss(0.25, 0.125, 1)  # won't be recorded
+        gc.hooks.on_gc_collect_step = on_gc_collect_step
+        self.fire_gc_collect_step(1, 2, 3)
+        assert lst[-1] == (1, 0, 0.0)
+
     def test_on_gc_collect(self):
         import gc
         lst = []
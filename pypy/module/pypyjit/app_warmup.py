@@ -0,0 +1,136 @@
+class WarmupProfile(object):
+    """Remembers where the JIT compiled loops, so that a freshly started
+    process can be told to trace the same places immediately instead of
+    waiting for the counters to reach the threshold.
+
+    Only the location of each loop is stored: the code object is
+    identified by (co_filename, co_firstlineno, co_name, hash(co_code))
+    together with the bytecode offset of the loop header.  The machine
+    code itself is never stored; when a profile is applied, the loops are
+    traced again from scratch, so all the guards and quasi-immutable
+    fields are checked against the state of the new process.
+
+    Typical usage:
+
+        profile = pypyjit.WarmupProfile()
+        profile.start()              # record compiled loops
+        ...
+        profile.save(filename)
+
+    and, in a newly started process, after the application is imported:
+
+        profile = pypyjit.WarmupProfile.load(filename)
+        profile.apply()
+
+    Note that start() replaces the hook installed with set_compile_hook().
+    """
+
+    def __init__(self):
+        self.locations = {}
+
+    def start(self):
+        """Start recording the loops compiled by the JIT."""
+        import pypyjit
+        pypyjit.set_compile_hook(self.on_compile, operations=False)
+
+    def stop(self):
+        """Stop recording."""
+        import pypyjit
+        pypyjit.set_compile_hook(None)
+
+    def on_compile(self, info):
+        if info.type != 'loop' or info.jitdriver_name != 'pypyjit':
+            return
+        code, next_instr, is_being_profiled = info.greenkey
+        key = _code_key(code) + (next_instr, bool(is_being_profiled))
+        self.locations[key] = None
+
+    def save(self, filename):
+        """Write the recorded locations to 'filename'."""
+        lines = []
+        for (filename_, firstlineno, name, codehash, next_instr,
+                is_being_profiled) in sorted(self.locations):
+            lines.append('%s\t%d\t%s\t%d\t%d\t%d\n' % (
+                filename_, firstlineno, name, codehash, next_instr,
+                is_being_profiled))
+        f = open(filename, 'w')
+        try:
+            f.writelines(lines)
+        finally:
+            f.close()
+
+    @classmethod
+    def load(cls, filename):
+        """Read a profile written by save().  Malformed lines are ignored."""
+        profile = cls()
+        f = open(filename, 'r')
+        try:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) != 6:
+                    continue
+                try:
+                    key = (parts[0], int(parts[1]), parts[2], int(parts[3]),
+                           int(parts[4]), bool(int(parts[5])))
+                except ValueError:
+                    continue
+                profile.locations[key] = None
+        finally:
+            f.close()
+        return profile
+
+    def apply(self, modules=None):
+        """Ask the JIT to trace, the next time they are reached, all the
+        loops of this profile whose code can be found in 'modules' (by
+        default, all of sys.modules).  Returns the number of loops found.
+        """
+        import pypyjit
+        if modules is None:
+            import sys
+            modules = sys.modules.values()
+        pending = {}
+        for key in self.locations:
+            pending.setdefault(key[:4], []).append(key[4:])
+        count = 0
+        for code in _iter_codes(modules):
+            positions = pending.pop(_code_key(code), None)
+            if positions is None:
+                continue
+            for next_instr, is_being_profiled in positions:
+                pypyjit.trace_next_iteration(next_instr, is_being_profiled,
+                                             code)
+                count += 1
+        return count
+
+
+def _code_key(code):
+    return (code.co_filename, code.co_firstlineno, code.co_name,
+            hash(code.co_code))
+
+def _iter_codes(modules):
+    import types
+    seen = {}
+    todo = []
+    for module in modules:
+        if module is None:
+            continue
+        todo.extend(getattr(module, '__dict__', {}).values())
+    while todo:
+        obj = todo.pop()
+        if isinstance(obj, (staticmethod, classmethod)):
+            obj = obj.__func__
+        if isinstance(obj, types.MethodType):
+            obj = obj.im_func
+        if isinstance(obj, types.FunctionType):
+            obj = obj.func_code
+        if id(obj) in seen:
+            continue
+        if isinstance(obj, (type, types.ClassType)):
+            seen[id(obj)] = obj
+            todo.extend(obj.__dict__.values())
+        elif isinstance(obj, types.CodeType):
+            seen[id(obj)] = obj
+            yield obj
+            for const in obj.co_consts:
+                if isinstance(const, types.CodeType):
+                    todo.append(const)
@@ -397,6 +397,14 @@ def get_stats_asmmemmgr(space):
     m2 = jit_hooks.stats_asmmemmgr_used(None)
     return space.newtuple2(space.newint(m1), space.newint(m2))
 
+def get_stats_memmgr(space):
+    """Returns a pair (alive_loops, evicted_loops): the number of loops
+    whose machine code is currently kept alive, and the total number of
+    loops that were freed so far because of the 'max_code_size' limit."""
+    alive = jit_hooks.stats_memmgr_alive_loops(None)
+    evicted = jit_hooks.stats_memmgr_evicted_loops(None)
+    return space.newtuple2(space.newint(alive), space.newint(evicted))
+
 def enable_debug(space):
     """ Set the jit debugging - completely necessary for some stats to work,
     most notably assembler counters.
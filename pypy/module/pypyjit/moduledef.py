@@ -2,6 +2,7 @@ from pypy.interpreter.mixedmodule import MixedModule
 
 class Module(MixedModule):
     appleveldefs = {
+        'WarmupProfile': 'app_warmup.WarmupProfile',
     }
 
     interpleveldefs = {
@@ -19,6 +20,7 @@ class Module(MixedModule):
         'set_trace_too_long_hook': 'interp_resop.set_trace_too_long_hook',
         'get_stats_snapshot': 'interp_resop.get_stats_snapshot',
         'get_stats_asmmemmgr': 'interp_resop.get_stats_asmmemmgr',
+        'get_stats_memmgr': 'interp_resop.get_stats_memmgr',
         # those things are disabled because they have bugs, but if
         # they're found to be useful, fix test_ztranslation_jit_stats
         # in the backend first. get_stats_snapshot still produces
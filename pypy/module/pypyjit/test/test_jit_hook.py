@@ -14,6 +14,7 @@ from pypy.module.pypyjit.interp_jit import pypyjitdriver
 from pypy.module.pypyjit.hooks import pypy_hooks
 from rpython.jit.tool.oparser import parse
 from rpython.rlib.jit import JitDebugInfo, AsmInfo, Counters
+from rpython.tool.udir import udir
 
 
 class MockJitDriverSD(object):
@@ -124,6 +125,7 @@ class AppTestJitHook(object):
         cls.orig_oplist = oplist
         cls.orig_oplist_no_descrs = oplist_no_descrs
         cls.w_sorted_keys = space.wrap(sorted(Counters.counter_names))
+        cls.w_tmpfile = space.wrap(str(udir.join('warmup_profile')))
 
     def setup_method(self, meth):
         self.__class__.oplist = self.orig_oplist[:]
@@ -269,6 +271,33 @@ class AppTestJitHook(object):
         raises(AttributeError, 'op.pycode')
         assert op.call_depth == 5
 
+    def test_warmup_profile(self):
+        import pypyjit, types
+
+        profile = pypyjit.WarmupProfile()
+        profile.start()
+        try:
+            self.on_compile()
+            self.on_compile_bridge()
+        finally:
+            profile.stop()
+        assert len(profile.locations) == 1
+        profile.save(self.tmpfile)
+
+        loaded = pypyjit.WarmupProfile.load(self.tmpfile)
+        assert loaded.locations == profile.locations
+        mod = types.ModuleType('fakemod')
+        mod.function = self.f
+        calls = []
+        orig = pypyjit.trace_next_iteration
+        pypyjit.trace_next_iteration = lambda *args: calls.append(args)
+        try:
+            assert loaded.apply([types.ModuleType('empty')]) == 0
+            assert loaded.apply([mod]) == 1
+        finally:
+            pypyjit.trace_next_iteration = orig
+        assert calls == [(0, False, self.f.func_code)]
+
     def test_get_stats_snapshot(self):
         skip("a bit no idea how to test it")
         from pypyjit import get_stats_snapshot
@@ -24,6 +24,15 @@ class AppTestPyPyJIT:
         finally:
             pypyjit.set_param('default')
 
+    def test_compile_duty_out_of_range(self):
+        import pypyjit
+        try:
+            # clamped to 0..100, not an error
+            pypyjit.set_param(compile_duty=101)
+            pypyjit.set_param("compile_duty=-1")
+        finally:
+            pypyjit.set_param('default')
+
     def test_no_jit(self):
         import pypyjit
         was_called = []
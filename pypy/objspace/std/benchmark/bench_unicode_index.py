@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+""" indexing, slicing, iteration and searching in non-ascii unicode strings
+"""
+
+import random, time
+
+CHARS = u'abcdefghijklmnopqrstuvwxyz \xe9\xe8\xe0\xfcабв中文\U0001f600'
+
+def get_random_unicode(l):
+    return u''.join([random.choice(CHARS) for i in xrange(l)])
+
+def count_operation(name, function):
+    print name
+    t0 = time.time()
+    retval = function()
+    tk = time.time()
+    print name, " takes: %f" % (tk - t0)
+    return retval
+
+def bench_unicode_index(SIZE=100000, N=100000):
+    u = get_random_unicode(SIZE)
+    indices = [random.randrange(SIZE) for i in xrange(N)]
+    needles = [u[i:i + 5] for i in indices[:1000]]
+
+    def index():
+        for i in indices:
+            u[i]
+
+    def slice():
+        for i in indices:
+            u[i:i + 10]
+
+    def iterate():
+        for c in u:
+            pass
+
+    def find_fresh():
+        # the first search on each string, before any index is built
+        for needle in needles:
+            (u + u'x').find(needle)
+
+    def find():
+        for needle in needles:
+            u.find(needle)
+            u.rfind(needle)
+
+    count_operation("Find in fresh strings", find_fresh)
+    count_operation("Indexing", index)
+    count_operation("Slicing", slice)
+    count_operation("Iteration", iterate)
+    count_operation("Find", find)
+
+if __name__ == '__main__':
+    bench_unicode_index()
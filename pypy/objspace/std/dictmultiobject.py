@@ -109,8 +109,14 @@ class W_DictMultiObject(W_Root):
             self.setitem(w_k, w_v)
 
     def setitem_str(self, key, w_value):
+        self._unshare()
         self.get_strategy().setitem_str(self, key, w_value)
 
+    def _unshare(self):
+        """Make sure that the storage is not shared with another dict,
+        copying it if necessary.  Must be called before mutating it.
+        Only W_DictObject can share its storage."""
+
     @staticmethod
     def descr_new(space, w_dicttype, __args__):
         w_obj = W_DictMultiObject.allocate_and_init_instance(space, w_dicttype)
@@ -264,6 +270,7 @@ class W_DictMultiObject(W_Root):
         _weakref._remove_dead_weakref and via __pypy__.delitem_if_value_is().
         """
         strategy = self.ensure_object_strategy()
+        self._unshare()
         d = strategy.unerase(self.dstorage)
         objectmodel.delitem_if_value_is(d, w_key, w_value)
 
@@ -286,6 +293,7 @@ class W_DictMultiObject(W_Root):
     def nondescr_move_to_end(self, space, w_key, last_flag):
         """Not exposed directly to app-level, but via __pypy__.move_to_end().
         """
+        self._unshare()
         strategy = self.get_strategy()
         strategy.move_to_end(self, w_key, last_flag)
 
@@ -313,6 +321,7 @@ class W_DictMultiObject(W_Root):
         corresponding value\nIf key is not found, d is returned if given,
         otherwise KeyError is raised
         """
+        self._unshare()
         strategy = self.get_strategy()
         try:
             return strategy.pop(self, w_key, w_default)
@@ -353,17 +362,36 @@ class W_DictMultiObject(W_Root):
 
 class W_DictObject(W_DictMultiObject):
     """ a regular dict object """
-    __slots__ = ['dstrategy']
+    __slots__ = ['dstrategy', 'dshared']
 
-    def __init__(self, space, strategy, storage):
+    def __init__(self, space, strategy, storage, shared=False):
         W_DictMultiObject.__init__(self, space, storage)
         self.dstrategy = strategy
+        # True if 'dstorage' may be shared with other dicts (see
+        # AbstractTypedStrategy.copy())
+        self.dshared = shared
 
     def get_strategy(self):
         return self.dstrategy
 
     def set_strategy(self, strategy):
+        # the caller installs a new storage too
         self.dstrategy = strategy
+        self.dshared = False
+
+    def _unshare(self):
+        if self.dshared:
+            self.dshared = False
+            self.dstorage = self.dstrategy.copy_storage(self)
+
+    def clear(self):
+        if self.dshared:
+            # don't copy a storage that is going to be emptied anyway
+            strategy = self.space.fromcache(EmptyDictStrategy)
+            self.set_strategy(strategy)
+            self.dstorage = strategy.get_empty_storage()
+        else:
+            self.dstrategy.clear(self)
 
 
 class W_ModuleDictObject(W_DictMultiObject):
@@ -400,10 +428,17 @@ def _add_indirections():
                     iterkeys itervalues iteritems \
                     listview_bytes listview_ascii listview_int \
                     view_as_kwargs".split()
+    # these mutate the storage, which must not be shared with another dict
+    unsharing_methods = "setitem setdefault popitem delitem".split()
 
     def make_method(method):
-        def f(self, *args):
-            return getattr(self.get_strategy(), method)(self, *args)
+        if method in unsharing_methods:
+            def f(self, *args):
+                self._unshare()
+                return getattr(self.get_strategy(), method)(self, *args)
+        else:
+            def f(self, *args):
+                return getattr(self.get_strategy(), method)(self, *args)
         f.func_name = method
         return f
 
@@ -638,6 +673,10 @@ class DictStrategy(object):
     def prepare_update(self, w_dict, num_extra):
         pass
 
+    def copy_storage(self, w_dict):
+        # only needed by the strategies whose copy() shares the storage
+        raise NotImplementedError
+
     def move_to_end(self, w_dict, w_key, last_flag):
         # fall-back
         w_value = w_dict.getitem(w_key)
@@ -729,23 +768,31 @@ class EmptyDictStrategy(DictStrategy):
     def get_empty_storage(self):
         return self.erase(None)
 
-    def switch_to_correct_strategy(self, w_dict, w_key):
+    def switch_to_correct_strategy(self, w_dict, w_key, w_value):
         if type(w_key) is self.space.StringObjectCls:
-            self.switch_to_bytes_strategy(w_dict)
+            self.switch_to_bytes_strategy(w_dict, w_value)
             return
         elif type(w_key) is self.space.UnicodeObjectCls:
             self.switch_to_unicode_strategy(w_dict)
             return
         w_type = self.space.type(w_key)
         if self.space.is_w(w_type, self.space.w_int):
-            self.switch_to_int_strategy(w_dict)
+            self.switch_to_int_strategy(w_dict, w_value)
         elif w_type.compares_by_identity():
             self.switch_to_identity_strategy(w_dict)
         else:
             self.switch_to_object_strategy(w_dict)
 
-    def switch_to_bytes_strategy(self, w_dict):
-        strategy = self.space.fromcache(BytesDictStrategy)
+    def switch_to_bytes_strategy(self, w_dict, w_value=None):
+        from pypy.objspace.std.unboxeddict import (
+            BytesIntDictStrategy, BytesFloatDictStrategy)
+        w_type = self._unboxed_value_type(w_value)
+        if w_type is self.space.w_int:
+            strategy = self.space.fromcache(BytesIntDictStrategy)
+        elif w_type is self.space.w_float:
+            strategy = self.space.fromcache(BytesFloatDictStrategy)
+        else:
+            strategy = self.space.fromcache(BytesDictStrategy)
         storage = strategy.get_empty_storage()
         w_dict.set_strategy(strategy)
         w_dict.dstorage = storage
@@ -756,12 +803,32 @@ class EmptyDictStrategy(DictStrategy):
         w_dict.set_strategy(strategy)
         w_dict.dstorage = storage
 
-    def switch_to_int_strategy(self, w_dict):
-        strategy = self.space.fromcache(IntDictStrategy)
+    def switch_to_int_strategy(self, w_dict, w_value=None):
+        from pypy.objspace.std.unboxeddict import (
+            IntIntDictStrategy, IntFloatDictStrategy)
+        w_type = self._unboxed_value_type(w_value)
+        if w_type is self.space.w_int:
+            strategy = self.space.fromcache(IntIntDictStrategy)
+        elif w_type is self.space.w_float:
+            strategy = self.space.fromcache(IntFloatDictStrategy)
+        else:
+            strategy = self.space.fromcache(IntDictStrategy)
         storage = strategy.get_empty_storage()
         w_dict.set_strategy(strategy)
         w_dict.dstorage = storage
 
+    def _unboxed_value_type(self, w_value):
+        # the values of the dict are stored unboxed if the first one is
+        # exactly an int or a float, see unboxeddict.py
+        if w_value is None:
+            return None
+        w_type = self.space.type(w_value)
+        if self.space.is_w(w_type, self.space.w_int):
+            return self.space.w_int
+        if self.space.is_w(w_type, self.space.w_float):
+            return self.space.w_float
+        return None
+
     def switch_to_identity_strategy(self, w_dict):
         from pypy.objspace.std.identitydict import IdentityDictStrategy
         strategy = self.space.fromcache(IdentityDictStrategy)
@@ -788,16 +855,16 @@ class EmptyDictStrategy(DictStrategy):
 
     def setdefault(self, w_dict, w_key, w_default):
         # here the dict is always empty
-        self.switch_to_correct_strategy(w_dict, w_key)
+        self.switch_to_correct_strategy(w_dict, w_key, w_default)
         w_dict.setitem(w_key, w_default)
         return w_default
 
     def setitem(self, w_dict, w_key, w_value):
-        self.switch_to_correct_strategy(w_dict, w_key)
+        self.switch_to_correct_strategy(w_dict, w_key, w_value)
         w_dict.setitem(w_key, w_value)
 
     def setitem_str(self, w_dict, key, w_value):
-        self.switch_to_bytes_strategy(w_dict)
+        self.switch_to_bytes_strategy(w_dict, w_value)
         w_dict.setitem_str(key, w_value)
 
     def delitem(self, w_dict, w_key):
@@ -892,9 +959,23 @@ class BaseIteratorImplementation(object):
         self.space = space
         self.strategy = strategy
         self.w_dict = w_dict
+        self.dstorage = w_dict.dstorage
         self.len = w_dict.length()
         self.pos = 0
 
+    def storage_replaced(self):
+        """Check if the dict got a new storage with the same strategy
+        since the iterator was created.  This occurs when a dict whose
+        storage was shared with a copy is modified (see
+        AbstractTypedStrategy.copy()): the iterator must then continue
+        with the new storage, at the same position."""
+        w_dict = self.w_dict
+        if (w_dict.dstorage is self.dstorage or
+                self.strategy is not w_dict.get_strategy()):
+            return False
+        self.dstorage = w_dict.dstorage
+        return True
+
     def length(self):
         if self.w_dict is not None and self.len != -1:
             return self.len - self.pos
@@ -936,6 +1017,11 @@ def create_iterator_classes(dictimpl):
             BaseIteratorImplementation.__init__(self, space, strategy, w_dict)
 
         def next_key_entry(self):
+            if self.storage_replaced():
+                self.iterator = self.strategy.getiterkeys(self.w_dict)
+                for i in range(self.pos):
+                    for key in self.iterator:
+                        break
             for key in self.iterator:
                 return wrapkey(self.space, key)
             else:
@@ -947,6 +1033,11 @@ def create_iterator_classes(dictimpl):
             BaseIteratorImplementation.__init__(self, space, strategy, w_dict)
 
         def next_value_entry(self):
+            if self.storage_replaced():
+                self.iterator = self.strategy.getitervalues(self.w_dict)
+                for i in range(self.pos):
+                    for value in self.iterator:
+                        break
             for value in self.iterator:
                 return wrapvalue(self.space, value)
             else:
@@ -958,6 +1049,12 @@ def create_iterator_classes(dictimpl):
             BaseIteratorImplementation.__init__(self, space, strategy, w_dict)
 
         def next_item_entry(self):
+            if self.storage_replaced():
+                self.iterator = self.strategy.getiteritems_with_hash(
+                    self.w_dict)
+                for i in range(self.pos):
+                    for key, value, keyhash in self.iterator:
+                        break
             for key, value, keyhash in self.iterator:
                 return (wrapkey(self.space, key),
                         wrapvalue(self.space, value))
@@ -970,6 +1067,11 @@ def create_iterator_classes(dictimpl):
             BaseIteratorImplementation.__init__(self, space, strategy, w_dict)
 
         def next_key_entry(self):
+            if self.storage_replaced():
+                self.iterator = self.strategy.getiterreversed(self.w_dict)
+                for i in range(self.pos):
+                    for key in self.iterator:
+                        break
             for key in self.iterator:
                 return wrapkey(self.space, key)
             else:
@@ -996,6 +1098,7 @@ def create_iterator_classes(dictimpl):
     def rev_update1_dict_dict(self, w_dict, w_updatedict):
         # the logic is to call prepare_dict_update() after the first setitem():
         # it gives the w_updatedict a chance to switch its strategy.
+        w_updatedict._unshare()
         if 1:     # (preserve indentation)
             iteritemsh = self.getiteritems_with_hash(w_dict)
             if not same_strategy(self, w_updatedict):
@@ -1159,8 +1262,15 @@ class AbstractTypedStrategy(object):
         w_dict.dstorage = strategy.erase(d_new)
 
     def copy(self, w_dict):
+        if not isinstance(w_dict, W_DictObject):
+            return W_DictObject(self.space, self, self.copy_storage(w_dict))
+        # the storage is shared until one of the two dicts is modified
+        w_dict.dshared = True
+        return W_DictObject(self.space, self, w_dict.dstorage, shared=True)
+
+    def copy_storage(self, w_dict):
         dstorage = self.unerase(w_dict.dstorage)
-        return W_DictObject(self.space, self, self.erase(dstorage.copy()))
+        return self.erase(dstorage.copy())
 
     # --------------- iterator interface -----------------
 
@@ -1431,6 +1541,9 @@ def update1_dict_dict(space, w_dict, w_data):
         w_copy = w_data.get_strategy().copy(w_data)
         w_dict.set_strategy(w_copy.get_strategy())
         w_dict.dstorage = w_copy.dstorage
+        if isinstance(w_copy, W_DictObject) and w_copy.dshared:
+            assert isinstance(w_dict, W_DictObject)
+            w_dict.dshared = True
     else:
         w_data.get_strategy().rev_update1_dict_dict(w_data, w_dict)
 
@@ -228,6 +228,9 @@ def list_unroll_condition(w_list1, space, w_list2):
 
 class W_ListObject(W_Root):
     strategy = None
+    # True if 'lstorage' may be shared with other lists (see clone()).  In
+    # that case it must be copied with _unshare() before being mutated.
+    lshared = False
 
     def __init__(self, space, wrappeditems, sizehint=-1):
         assert isinstance(wrappeditems, list)
@@ -315,6 +318,13 @@ class W_ListObject(W_Root):
         self.strategy = cpy_strategy
         self.lstorage = cpy_strategy.erase(CPyListStorage(space, lst))
 
+    def _unshare(self):
+        """Make sure that the storage is not shared with another list,
+        copying it if necessary.  Must be called before mutating it."""
+        if self.lshared:
+            self.lshared = False
+            self.lstorage = self.strategy.getstorage_copy(self)
+
     # ___________________________________________________
 
     def init_from_list_w(self, list_w):
@@ -331,6 +341,7 @@ class W_ListObject(W_Root):
         else:
             strategy = space.fromcache(ObjectListStrategy)
         self.strategy = strategy
+        self.lshared = False
         strategy.clear(self)
 
     def clone(self, sizehint=0):
@@ -342,6 +353,7 @@ class W_ListObject(W_Root):
     def _resize_hint(self, hint):
         """Ensure the underlying list has room for at least hint
         elements without changing the len() of the list"""
+        self._unshare()
         return self.strategy._resize_hint(self, hint)
 
     def copy_into(self, other):
@@ -356,6 +368,7 @@ class W_ListObject(W_Root):
 
     def append(self, w_item):
         """L.append(object) -- append object to end"""
+        self._unshare()
         self.strategy.append(self, w_item)
 
     def length(self):
@@ -376,6 +389,13 @@ class W_ListObject(W_Root):
     def getitems(self):
         """Returns a list of all items after wrapping them. The result can
         share with the storage, if possible."""
+        self._unshare()
+        return self.strategy.getitems(self)
+
+    def getitems_view(self):
+        """Like getitems(), for callers that don't modify the result. The
+        storage is not unshared, so the result may be shared with other
+        lists too."""
         return self.strategy.getitems(self)
 
     def getitems_fixedsize(self):
@@ -396,6 +416,9 @@ class W_ListObject(W_Root):
         ObjectListStrategy."""
         return self.strategy.getitems_copy(self)
 
+    # the getitems_xxx() below are only used by the read-only
+    # space.listview_xxx(), so they don't unshare the storage either
+
     def getitems_bytes(self):
         """Return the items in the list as unwrapped strings. If the list does
         not use the list strategy, return None."""
@@ -424,50 +447,60 @@ class W_ListObject(W_Root):
 
     def inplace_mul(self, times):
         """Alters the list by multiplying its content by times."""
+        self._unshare()
         self.strategy.inplace_mul(self, times)
 
     def deleteslice(self, start, step, length):
         """Deletes a slice from the list. Used in delitem and delslice.
         Arguments must be normalized (see getslice)."""
+        self._unshare()
         self.strategy.deleteslice(self, start, step, length)
 
     def pop(self, index):
         """Pops an item from the list. Index must be normalized.
         May raise IndexError."""
+        self._unshare()
         return self.strategy.pop(self, index)
 
     def pop_end(self):
         """ Pop the last element from the list."""
+        self._unshare()
         return self.strategy.pop_end(self)
 
     def setitem(self, index, w_item):
         """Inserts a wrapped item at the given (unwrapped) index.
         May raise IndexError."""
+        self._unshare()
         self.strategy.setitem(self, index, w_item)
 
     def setslice(self, start, step, slicelength, sequence_w):
         """Sets the slice of the list from start to start+step*slicelength to
         the sequence sequence_w.
         Used by setslice and setitem."""
+        self._unshare()
         self.strategy.setslice(self, start, step, slicelength, sequence_w)
 
     def insert(self, index, w_item):
         """Inserts an item at the given position. Item must be wrapped,
         index not."""
+        self._unshare()
         self.strategy.insert(self, index, w_item)
 
     def extend(self, w_iterable):
         '''L.extend(iterable) -- extend list by appending
         elements from the iterable'''
+        self._unshare()
         self.strategy.extend(self, w_iterable)
 
     def reverse(self):
         """Reverses the list."""
+        self._unshare()
         self.strategy.reverse(self)
 
     def sort(self, reverse):
         """Sorts the list ascending or descending depending on
         argument reverse. Argument must be unwrapped."""
+        self._unshare()
         self.strategy.sort(self, reverse)
 
     def physical_size(self):
@@ -1561,13 +1594,17 @@ class AbstractUnwrappedStrategy(object):
         return self.erase(newlist_hint(sizehint))
 
     def clone(self, w_list, sizehint=0):
+        if not sizehint:
+            # share the storage until one of the two lists is mutated
+            w_clone = W_ListObject.from_storage_and_strategy(
+                    self.space, w_list.lstorage, self)
+            w_list.lshared = True
+            w_clone.lshared = True
+            return w_clone
         l = self.unerase(w_list.lstorage)
-        if sizehint:
-            assert sizehint >= len(l)
-            l2 = newlist_hint(sizehint)
-            l2.extend(l)
-        else:
-            l2 = l[:]
+        assert sizehint >= len(l)
+        l2 = newlist_hint(sizehint)
+        l2.extend(l)
         storage = self.erase(l2)
         w_clone = W_ListObject.from_storage_and_strategy(
                 self.space, storage, self)
@@ -1578,8 +1615,9 @@ class AbstractUnwrappedStrategy(object):
 
     def copy_into(self, w_list, w_other):
         w_other.strategy = self
-        items = self.unerase(w_list.lstorage)[:]
-        w_other.lstorage = self.erase(items)
+        w_other.lstorage = w_list.lstorage
+        w_list.lshared = True
+        w_other.lshared = True
 
     def find_or_count(self, w_list, w_obj, start, stop, count):
         if self.is_correct_type(w_obj):
@@ -1647,6 +1685,8 @@ class AbstractUnwrappedStrategy(object):
     def getslice(self, w_list, start, stop, step, length):
         if step == 1 and 0 <= start <= stop:
             l = self.unerase(w_list.lstorage)
+            if start == 0 and stop == len(l):
+                return self.clone(w_list)
             assert start >= 0
             assert stop >= 0
             sublist = l[start:stop]
@@ -206,11 +206,10 @@ class AbstractAttribute(object):
         while True:
             current = self
             unbox_type = None
-            if self.terminator.allow_unboxing:
-                if ALLOW_UNBOXING_INTS and type(w_value) is self.space.IntObjectCls:
-                    unbox_type = self.space.IntObjectCls
-                elif type(w_value) is self.space.FloatObjectCls:
-                    unbox_type = self.space.FloatObjectCls
+            if ALLOW_UNBOXING_INTS and type(w_value) is self.space.IntObjectCls:
+                unbox_type = self.space.IntObjectCls
+            elif type(w_value) is self.space.FloatObjectCls:
+                unbox_type = self.space.FloatObjectCls
             number_to_readd, holder = self._find_branch_to_move_into(name, attrkind, unbox_type)
             attr = holder.pick_attr(unbox_type)
             # we found the attributes further up, need to save the
@@ -256,12 +255,11 @@ class AbstractAttribute(object):
 
 
 class Terminator(AbstractAttribute):
-    _immutable_fields_ = ['w_cls', 'allow_unboxing?']
+    _immutable_fields_ = ['w_cls']
 
     def __init__(self, space, w_cls):
         AbstractAttribute.__init__(self, space, self)
         self.w_cls = w_cls
-        self.allow_unboxing = True
 
     def _read_terminator(self, obj, name, attrkind):
         return None
@@ -467,7 +465,8 @@ class PlainAttribute(AbstractAttribute):
 
 
 class UnboxedPlainAttribute(PlainAttribute):
-    _immutable_fields_ = ["listindex", "firstunwrapped", "typ"]
+    _immutable_fields_ = ["listindex", "firstunwrapped", "typ", "first_unboxed",
+                          "unboxed_size_hint?", "devolved?"]
     def __init__(self, name, attrkind, back, order, typ):
         AbstractAttribute.__init__(self, back.space, back.terminator)
         # don't call PlainAttribute.__init__, that runs into weird problems
@@ -479,9 +478,12 @@ class UnboxedPlainAttribute(PlainAttribute):
         # here, storageindex is where the list of floats is stored
         # and listindex is where in the list the actual value goes
         self.firstunwrapped = False
+        self.unboxed_size_hint = 0
+        self.devolved = False
         self._compute_storageindex_listindex()
         self._num_attributes = back.num_attributes() + 1
         self.typ = typ
+        self.first_unboxed._grow_unboxed_size_hint(self.listindex + 1)
 
     def _compute_storageindex_listindex(self):
         attr = self.back
@@ -490,14 +492,26 @@ class UnboxedPlainAttribute(PlainAttribute):
             if isinstance(attr, UnboxedPlainAttribute):
                 storageindex = attr.storageindex
                 listindex = attr.listindex + 1
+                first_unboxed = attr.first_unboxed
                 break
             attr = attr.back
         else:
             storageindex = self.back.storage_needed()
             listindex = 0
+            first_unboxed = self
             self.firstunwrapped = True
         self.storageindex = storageindex
         self.listindex = listindex
+        self.first_unboxed = first_unboxed
+
+    def _grow_unboxed_size_hint(self, size):
+        # the first unboxed attribute of a chain remembers the size of the
+        # longest unboxed list that any map sharing it has needed so far.
+        # Objects allocate their unboxed list with that size directly, instead
+        # of copying it every time they get one more unboxed attribute.
+        assert self.firstunwrapped
+        if size > self.unboxed_size_hint:
+            self.unboxed_size_hint = size
 
     def storage_needed(self):
         if self.firstunwrapped:
@@ -526,11 +540,20 @@ class UnboxedPlainAttribute(PlainAttribute):
         obj._set_mapdict_storage_and_map(new_obj.storage, map)
         return map
 
+    def _devolve(self):
+        """ Stop unboxing this attribute: objects that get it from now on
+        store it boxed, and the objects that still use self as part of their
+        map are converted the next time they access it. The other unboxed
+        attributes of the class are not affected. """
+        holder = self.back.cache_attrs[(self.name, self.attrkind)]
+        holder.devolve()
+
     def _direct_read(self, obj):
         w_res = self._prim_direct_read(obj)
-        if self.terminator.allow_unboxing == False:
-            # oops, some other object using the same class isn't type stable!
-            # stop using unboxing altogether to not get too many variants of maps
+        if self.devolved:
+            # oops, some other object using the same class isn't type stable
+            # for this attribute! stop unboxing it, to not get too many
+            # variants of maps
             self._convert_to_boxed(obj)
         return w_res
 
@@ -555,19 +578,21 @@ class UnboxedPlainAttribute(PlainAttribute):
             unboxed[self.listindex] = val
             return
         # type change not supposed to happen. according to the principle
-        # of type freezing, we just give up, and will never unbox anything
-        # from that class again
-        self.terminator.allow_unboxing = False
+        # of type freezing, we just give up, and will never unbox this
+        # attribute of that class again
+        self._devolve()
         map = self._convert_to_boxed(obj)
-        # now obj won't have any UnboxedPlainAttribute in its chain any
-        # more, because allow_unboxing is False
+        # now the attribute is a PlainAttribute in the map of obj, because
+        # it was re-added after devolving it
         map.write(obj, self.name, self.attrkind, w_value)
 
     def _switch_map_and_write_storage(self, obj, w_value):
         from rpython.rlib.debug import make_sure_not_resized
         val = self._unbox(w_value)
         if self.firstunwrapped:
-            unboxed = erase_unboxed(make_sure_not_resized([val]))
+            unboxed_list = [0] * self.unboxed_size_hint
+            unboxed_list[0] = val
+            unboxed = erase_unboxed(make_sure_not_resized(unboxed_list))
             if self.storage_needed() > obj._mapdict_storage_length():
                 obj._set_mapdict_increase_storage(self, unboxed)
                 return
@@ -582,10 +607,13 @@ class UnboxedPlainAttribute(PlainAttribute):
                 # size can only increase by 1
                 jit.record_exact_value(len(unboxed), self.listindex)
                 assert len(unboxed) == self.listindex
-                unboxed = unboxed + [val]
+                size_hint = self.first_unboxed.unboxed_size_hint
+                unboxed = unboxed + [0] * (size_hint - self.listindex)
+                unboxed[self.listindex] = val
                 obj._mapdict_write_storage(self.storageindex, erase_unboxed(unboxed))
             else:
-                # the unboxed list is already large enough, due to reordering
+                # the unboxed list is already large enough, because it was
+                # allocated with the size hint or due to reordering
                 unboxed[self.listindex] = val
 
     def repr(self):
@@ -611,15 +639,20 @@ class CachedAttributeHolder(object):
     def pick_attr(self, unbox_type):
         if self.typ is None or self.typ is unbox_type:
             return self.attr
+        # this will never be traced, because devolve() invalidates a
+        # quasi-immutable field
+        self.devolve()
+        return self.attr
+
+    def devolve(self):
+        if self.typ is None:
+            return
         self.typ = None
-        # this will never be traced, because the previous assignment
-        # invalidates a quasi-immutable field
-        self.attr.terminator.allow_unboxing = False
-        name = self.attr.name
-        attrkind = self.attr.attrkind
-        back = self.attr.back
-        attr = self.attr = PlainAttribute(name, attrkind, back, self.order)
-        return attr
+        old_attr = self.attr
+        assert isinstance(old_attr, UnboxedPlainAttribute)
+        old_attr.devolved = True
+        self.attr = PlainAttribute(old_attr.name, old_attr.attrkind,
+                                   old_attr.back, self.order)
 
 
 class MapAttrCache(object):
@@ -956,6 +989,10 @@ def _make_storage_mixin_size_n(n=SUBCLASSES_NUM_FIELDS):
                 prev_storage_size = self._get_mapdict_map().storage_needed()
                 new_storage = [erase_item(None)] * (storage_needed - prev_storage_size)
                 curr_storage = self._mapdict_get_storage_list()
+                if len(curr_storage) > prev_storage_size - nmin1:
+                    # reordering attributes can switch to a map that needs a
+                    # shorter storage list than the one we still have
+                    curr_storage = curr_storage[:prev_storage_size - nmin1]
                 jit.record_exact_value(len(curr_storage), prev_storage_size - nmin1)
                 new_storage = curr_storage + new_storage
                 new_storage[storage_needed - n] = value
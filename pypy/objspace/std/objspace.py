@@ -502,11 +502,11 @@ class StdObjSpace(ObjSpace):
 
     def listview_no_unpack(self, w_obj):
         if type(w_obj) is W_ListObject:
-            return w_obj.getitems()
+            return w_obj.getitems_view()
         elif isinstance(w_obj, W_AbstractTupleObject) and self._uses_tuple_iter(w_obj):
             return w_obj.getitems_copy()
         elif isinstance(w_obj, W_ListObject) and self._uses_list_iter(w_obj):
-            return w_obj.getitems()
+            return w_obj.getitems_view()
         else:
             return None
 
@@ -1,7 +1,9 @@
 from pypy.interpreter.error import oefmt
-from pypy.objspace.std.tupleobject import W_AbstractTupleObject
+from pypy.objspace.std.tupleobject import (
+    W_AbstractTupleObject, _unroll_condition_cmp)
 from pypy.objspace.std.util import negate
 from rpython.rlib import jit
+from rpython.rlib.debug import make_sure_not_resized
 from rpython.rlib.objectmodel import specialize
 from rpython.rlib.rarithmetic import intmask
 from rpython.rlib.unroll import unrolling_iterable
@@ -151,10 +153,155 @@ Cls_ii = make_specialised_class((int, int))
 Cls_oo = make_specialised_class((object, object))
 Cls_ff = make_specialised_class((float, float))
 
+# ---------- array-backed tuples of ints or floats ----------
+# Tuples of more than two items which are all exact ints, or all exact
+# floats, store their items unwrapped in a single fixed-size list.  Hashing
+# and comparing two such tuples of the same kind work directly on the
+# unwrapped items, without allocating any W_IntObject or W_FloatObject.
+
+ARRAY_MIN_LENGTH = 3
+
+def make_array_class(typ):
+    if typ == int:
+        def wrap(space, x):
+            return space.newint(x)
+        def hash_item(space, x):
+            from pypy.objspace.std.intobject import _hash_int
+            return _hash_int(x)
+    elif typ == float:
+        def wrap(space, x):
+            return space.newfloat(x)
+        def hash_item(space, x):
+            from pypy.objspace.std.floatobject import _hash_float
+            return _hash_float(space, x)
+    else:
+        assert 0
+
+    class cls(W_AbstractTupleObject):
+        _immutable_fields_ = ['items[*]']
+
+        def __init__(self, space, items):
+            make_sure_not_resized(items)
+            self.space = space
+            self.items = items
+
+        def length(self):
+            return len(self.items)
+
+        def tolist(self):
+            space = self.space
+            items = self.items
+            list_w = [None] * len(items)
+            for i in range(len(items)):
+                list_w[i] = wrap(space, items[i])
+            return list_w
+
+        # same source code, but builds and returns a resizable list
+        getitems_copy = func_with_new_name(tolist, 'getitems_copy')
+
+        def descr_hash(self, space):
+            return space.newint(self._descr_hash(space))
+
+        @jit.look_inside_iff(lambda self, space: self._unroll_condition())
+        def _descr_hash(self, space):
+            items = self.items
+            mult = 1000003
+            x = 0x345678
+            z = len(items)
+            for value in items:
+                y = hash_item(space, value)
+                x = (x ^ y) * mult
+                z -= 1
+                mult += 82520 + z + z
+            x += 97531
+            return intmask(x)
+
+        def descr_eq(self, space, w_other):
+            if not isinstance(w_other, W_AbstractTupleObject):
+                return space.w_NotImplemented
+            if isinstance(w_other, cls):
+                return space.newbool(self._eq_same_class(w_other))
+            return self._descr_eq_generic(space, w_other)
+
+        @jit.look_inside_iff(lambda self, w_other:
+                             _unroll_condition_cmp(self, None, w_other))
+        def _eq_same_class(self, w_other):
+            items1 = self.items
+            items2 = w_other.items
+            if len(items1) != len(items2):
+                return False
+            for i in range(len(items1)):
+                myval = items1[i]
+                otherval = items2[i]
+                if myval != otherval:
+                    if typ == float:
+                        # issue with NaNs, which should be equal here
+                        if float2longlong(myval) == float2longlong(otherval):
+                            continue
+                    return False
+            return True
+
+        @jit.look_inside_iff(_unroll_condition_cmp)
+        def _descr_eq_generic(self, space, w_other):
+            items = self.items
+            if len(items) != w_other.length():
+                return space.w_False
+            for i in range(len(items)):
+                w_otherval = w_other.getitem(space, i)
+                if not space.eq_w(wrap(space, items[i]), w_otherval):
+                    return space.w_False
+            return space.w_True
+
+        descr_ne = negate(descr_eq)
+
+        def getitem(self, space, index):
+            items = self.items
+            if index < 0:
+                index += len(items)
+            if not 0 <= index < len(items):
+                raise oefmt(space.w_IndexError, "tuple index out of range")
+            return wrap(space, items[index])
+
+        def _unroll_condition(self):
+            return jit.loop_unrolling_heuristic(
+                    self.items, len(self.items), UNROLL_CUTOFF)
+
+    cls.__name__ = 'W_%sArrayTupleObject' % (typ.__name__.capitalize(),)
+    _specialisations.append(cls)
+    return cls
+
+Cls_int_array = make_array_class(int)
+Cls_float_array = make_array_class(float)
+
+def _makearraytuple(space, list_w):
+    from pypy.objspace.std.intobject import W_IntObject
+    from pypy.objspace.std.floatobject import W_FloatObject
+    length = len(list_w)
+    w_first = list_w[0]
+    if type(w_first) is W_IntObject:
+        for w_item in list_w:
+            if type(w_item) is not W_IntObject:
+                raise NotSpecialised
+        intitems = [0] * length
+        for i in range(length):
+            intitems[i] = space.int_w(list_w[i])
+        return Cls_int_array(space, intitems)
+    elif type(w_first) is W_FloatObject:
+        for w_item in list_w:
+            if type(w_item) is not W_FloatObject:
+                raise NotSpecialised
+        floatitems = [0.0] * length
+        for i in range(length):
+            floatitems[i] = space.float_w(list_w[i])
+        return Cls_float_array(space, floatitems)
+    raise NotSpecialised
+
 def makespecialisedtuple(space, list_w):
     if len(list_w) == 2:
         w_arg1, w_arg2 = list_w
         return makespecialisedtuple2(space, w_arg1, w_arg2)
+    elif len(list_w) >= ARRAY_MIN_LENGTH:
+        return _makearraytuple(space, list_w)
     else:
         raise NotSpecialised
 
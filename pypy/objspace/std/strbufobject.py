@@ -0,0 +1,130 @@
+"""The str object returned by the addition of large strings: it keeps
+appending to the same StringBuilder, so that 's += chunk' in a loop is
+linear instead of quadratic."""
+
+import inspect
+
+import py
+
+from rpython.rlib.buffer import StringBuffer
+from rpython.rlib.rstring import StringBuilder
+
+from pypy.interpreter.buffer import SimpleView
+from pypy.interpreter.error import oefmt
+from pypy.objspace.std.bytesobject import W_AbstractBytesObject, W_BytesObject
+
+# the results of additions shorter than this are built directly as
+# W_BytesObjects: copying them is cheap, and they keep the exact type
+# W_BytesObject that the list, set and dict strategies look for
+MIN_LENGTH = 128
+
+
+class W_StringBufferObject(W_AbstractBytesObject):
+    w_str = None
+
+    def __init__(self, builder):
+        self.builder = builder             # StringBuilder
+        # the builder can be shared with the result of 'self + other', which
+        # then appends more characters to it
+        self.length = builder.getlength()
+
+    def force_w(self):
+        w_str = self.w_str
+        if w_str is None:
+            s = self.builder.build()
+            if self.length < len(s):
+                s = s[:self.length]
+            w_str = W_BytesObject(s)
+            self.w_str = w_str
+        return w_str
+
+    def force(self):
+        return self.force_w()._value
+
+    def __repr__(self):
+        """representation for debugging purposes"""
+        return "%s(%r[:%d])" % (
+            self.__class__.__name__, self.builder, self.length)
+
+    def unwrap(self, space):
+        return self.force()
+
+    def str_w(self, space):
+        return self.force()
+
+    def utf8_w(self, space):
+        return self.force()
+
+    def buffer_w(self, space, flags):
+        space.check_buf_flags(flags, True)
+        return SimpleView(StringBuffer(self.force()))
+
+    def readbuf_w(self, space):
+        return StringBuffer(self.force())
+
+    def writebuf_w(self, space):
+        raise oefmt(space.w_TypeError,
+                    "Cannot use string as modifiable buffer")
+
+    charbuf_w = str_w
+
+    def listview_bytes(self):
+        return self.force_w().listview_bytes()
+
+    def ord(self, space):
+        return self.force_w().ord(space)
+
+    def descr_len(self, space):
+        return space.newint(self.length)
+
+    def descr_add(self, space, w_other):
+        if not isinstance(w_other, W_AbstractBytesObject):
+            # unicode, bytearray, buffers...
+            return self.force_w().descr_add(space, w_other)
+        other = space.bytes_w(w_other)
+        if self.builder.getlength() != self.length:
+            # another addition already appended to our builder
+            builder = StringBuilder(self.length + len(other))
+            builder.append(self.force())
+        else:
+            builder = self.builder
+        builder.append(other)
+        return W_StringBufferObject(builder)
+
+    def descr_str(self, space):
+        # W_StringBufferObject is never subclassed at app-level
+        assert type(self) is W_StringBufferObject
+        return self
+
+
+def _unbuffer(w_obj):
+    if isinstance(w_obj, W_StringBufferObject):
+        return w_obj.force_w()
+    return w_obj
+
+def _make_delegate(name, func):
+    args = inspect.getargs(func.func_code)
+    if args.varargs or args.keywords:
+        raise TypeError("varargs and keywords not supported in %s" % name)
+    assert args.args[:2] == ['self', 'space']
+    argnames = args.args[2:]
+    callargs = [('_unbuffer(%s)' % arg) if arg.startswith('w_') else arg
+                for arg in argnames]
+    source = py.code.Source("""
+        def %(name)s(self, space, %(args)s):
+            return self.force_w().%(name)s(space, %(callargs)s)
+    """ % {'name': name, 'args': ', '.join(argnames),
+           'callargs': ', '.join(callargs)})
+    d = {'_unbuffer': _unbuffer}
+    exec source.compile() in d
+    f = d[name]
+    f.func_defaults = func.func_defaults
+    return f
+
+for _name, _func in W_AbstractBytesObject.__dict__.items():
+    if (_name.startswith('descr_') and inspect.isfunction(_func) and
+            _name not in W_StringBufferObject.__dict__):
+        setattr(W_StringBufferObject, _name, _make_delegate(_name, _func))
+del _name, _func
+
+W_StringBufferObject.typedef = W_BytesObject.typedef
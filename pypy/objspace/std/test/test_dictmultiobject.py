@@ -184,6 +184,50 @@ class TestW_DictObject(object):
         # w_l = self.space.call_method(w_d, "keys")
         # assert sorted(self.space.listview_unicode(w_l)) == [u"a", u"b"]
 
+    def test_copy_shares_storage(self):
+        space = self.space
+        w = space.wrap
+        w_d = space.newdict()
+        w_d.initialize_content([(w(1), w(2)), (w(3), w(4))])
+        w_copy = w_d.copy()
+        assert w_copy.dstorage is w_d.dstorage
+        assert w_copy.get_strategy() is w_d.get_strategy()
+        w_copy.setitem(w(5), w(6))
+        assert w_copy.dstorage is not w_d.dstorage
+        assert w_d.length() == 2 and w_copy.length() == 3
+        # w_d is still flagged and gets its own storage when mutated
+        storage = w_d.dstorage
+        w_d.delitem(w(1))
+        assert w_d.dstorage is not storage
+        assert w_d.length() == 1 and w_copy.length() == 3
+        #
+        w_empty = space.newdict()
+        update1_dict_dict(space, w_empty, w_copy)
+        assert w_empty.dstorage is w_copy.dstorage
+        w_empty.setitem(w(7), w(8))
+        assert w_empty.length() == 4 and w_copy.length() == 3
+        #
+        # iterating doesn't unshare the storage
+        w_copy2 = w_copy.copy()
+        w_iter = w_copy2.iteritems()
+        while w_iter.next_item()[0] is not None:
+            pass
+        assert w_copy2.dstorage is w_copy.dstorage
+
+    def test_clear_shared_storage(self, monkeypatch):
+        space = self.space
+        w = space.wrap
+        w_d = space.newdict()
+        w_d.initialize_content([(w(1), w(2)), (w(3), w(4))])
+        w_copy = w_d.copy()
+        monkeypatch.setattr(W_DictObject, "_unshare", None)
+        w_copy.clear()
+        assert w_copy.length() == 0
+        assert isinstance(w_copy.get_strategy(), EmptyDictStrategy)
+        assert not w_copy.dshared
+        assert w_d.length() == 2
+        assert space.int_w(w_d.getitem(w(1))) == 2
+
     def test_update_empty_does_copy(self, monkeypatch):
         w = self.space.wrap
         wb = self.space.newbytes
@@ -216,6 +260,81 @@ class AppTest_DictObject:
         assert d == dd
         assert not d is dd
 
+    def test_copies_are_independent(self):
+        for d in [{1: 2, 3: 4}, {1: 2.5, 3: 4.5}, {'a': 2, 'b': 4},
+                  {'a': 'x', 'b': 'y'}, {u'a': 1, u'b': 2}, {1: 2, 'b': 4}]:
+            orig = dict(d.items())
+            keys = list(orig)
+            dd = d.copy()
+            dd[keys[0]] = 42
+            assert d == orig and dd[keys[0]] == 42
+            dd = d.copy()
+            del dd[keys[0]]
+            assert d == orig and len(dd) == 1
+            dd = d.copy()
+            dd.setdefault('new', 5)
+            dd.pop(keys[1])
+            dd.popitem()
+            assert d == orig and len(dd) == 1
+            dd = d.copy()
+            dd.clear()
+            assert d == orig and dd == {}
+            dd = d.copy()
+            dd.update({keys[0]: 7})
+            dd.update({5.5: 7})
+            assert d == orig and dd[keys[0]] == 7
+            dd = {}
+            dd.update(d)
+            d[keys[1]] = 43
+            assert dd == orig
+            d[keys[1]] = orig[keys[1]]
+            dd = d.copy()
+            d[keys[0]] = 44
+            assert dd == orig
+            d[keys[0]] = orig[keys[0]]
+            dd = d.copy()
+            dd['x'] = 1
+            assert 'x' not in d and dd.copy() == dd
+
+    def test_copy_then_iterate(self):
+        d = {1: 2, 3: 4, 5: 6}
+        dd = d.copy()
+        it = d.iteritems()
+        d[1] = 20
+        d[3] = 40
+        d[5] = 60
+        assert sorted(it) == [(1, 20), (3, 40), (5, 60)]
+        assert dd == {1: 2, 3: 4, 5: 6}
+
+    def test_iterate_then_copy(self):
+        d = {1: 1, 2: 2, 3: 3}
+        result = []
+        for k, v in d.iteritems():
+            if k == 1:
+                d.copy()
+                d[3] = 99
+            result.append((k, v))
+        assert sorted(result) == [(1, 1), (2, 2), (3, 99)]
+        #
+        d = {1: 1, 2: 2, 3: 3}
+        it = d.itervalues()
+        first = next(it)
+        dd = d.copy()
+        for k in d:
+            d[k] = k * 10
+        assert sorted([first] + list(it)) == sorted([first] +
+            [v for v in d.values() if v != first * 10])
+        assert dd == {1: 1, 2: 2, 3: 3}
+        #
+        import __pypy__
+        d = {1: 1, 2: 2, 3: 3}
+        it = __pypy__.reversed_dict(d)
+        first = next(it)
+        dd = d.copy()
+        d[first] = 0
+        assert [first] + list(it) == list(reversed(d.keys()))
+        assert dd == {1: 1, 2: 2, 3: 3}
+
     def test_get(self):
         d = {1: 2, 3: 4}
         assert d.get(1) == 2
@@ -1163,7 +1282,7 @@ class AppTestStrategies(object):
     def test_empty_to_string(self):
         d = {}
         assert "EmptyDictStrategy" in self.get_strategy(d)
-        d[b"a"] = 1
+        d[b"a"] = "x"
         assert "BytesDictStrategy" in self.get_strategy(d)
 
         class O(object):
@@ -1171,7 +1290,7 @@ class AppTestStrategies(object):
         o = O()
         d = o.__dict__ = {}
         assert "EmptyDictStrategy" in self.get_strategy(d)
-        o.a = 1
+        o.a = "x"
         assert "BytesDictStrategy" in self.get_strategy(d)
 
     def test_empty_to_unicode(self):
@@ -932,6 +932,42 @@ class AppTestListObject(object):
         assert x[10:3:-2] == [9,7,5]
         assert x[1:5:-1] == []
 
+    def test_copies_are_independent(self):
+        for items in [[3, 1, 2], [3.5, 1.5, 2.5], ['c', 'a', 'b'],
+                      [u'c', u'a', u'b'], [3, 'a', None]]:
+            for copy in [lambda l: l[:], list, lambda l: l[0:len(l)]]:
+                l = items[:]
+                c = copy(l)
+                c.sort()
+                assert l == items
+                c = copy(l)
+                l.sort(reverse=True)
+                assert c == items
+                l = items[:]
+                c = copy(l)
+                c[0] = 42
+                del c[1]
+                assert l == items
+                c = copy(l)
+                l.append(5)
+                l += [6]
+                l *= 2
+                assert c == items
+                c = copy(l)
+                l[:] = []
+                assert c == (items + [5, 6]) * 2
+                assert l == []
+                l = items[:]
+                c = copy(l)
+                c.reverse()
+                c.insert(0, 7)
+                c.pop()
+                assert l == items
+                c = copy(l)
+                c.extend(c)
+                assert l == items
+                assert c == items * 2
+
     def test_delall(self):
         l = l0 = [1,2,3]
         del l[:]
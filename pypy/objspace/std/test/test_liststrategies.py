@@ -550,6 +550,58 @@ class TestW_ListStrategies(TestW_ListObject):
         clone.append(self.space.wrap(7))
         assert not self.space.eq_w(l1, clone)
 
+    def test_clone_shares_storage(self):
+        space = self.space
+        for items in [[1, 2, 3], [1.5, 2.5], ["a", "b"], [1, "b", None]]:
+            l1 = W_ListObject(space, [space.wrap(x) for x in items])
+            l2 = l1.clone()
+            assert l2.lstorage is l1.lstorage
+            assert l1.lshared and l2.lshared
+            l2.append(space.wrap(items[0]))
+            assert l2.lstorage is not l1.lstorage
+            assert not l2.lshared
+            # l1 is still flagged, and copies its storage when mutated
+            storage = l1.lstorage
+            l1.reverse()
+            assert l1.lstorage is not storage
+            assert not l1.lshared
+            assert space.unwrap(l1) == items[::-1]
+            assert space.unwrap(l2) == items + [items[0]]
+
+    def test_full_slice_and_copy_into_share_storage(self):
+        space = self.space
+        l1 = W_ListObject(space, [space.wrap(1), space.wrap(2), space.wrap(3)])
+        l2 = l1.getslice(0, 3, 1, 3)
+        assert l2.lstorage is l1.lstorage
+        l3 = l1.getslice(0, 2, 1, 2)
+        assert l3.lstorage is not l1.lstorage
+        assert not l3.lshared
+        l4 = W_ListObject(space, [])
+        l4.extend(l1)
+        assert l4.lstorage is l1.lstorage
+        l4.setitem(0, space.wrap(42))
+        assert space.unwrap(l1) == [1, 2, 3]
+        assert space.unwrap(l2) == [1, 2, 3]
+        assert space.unwrap(l4) == [42, 2, 3]
+
+    def test_listview_does_not_unshare(self):
+        space = self.space
+        l1 = W_ListObject(space, [space.wrap(1), space.wrap("a")])
+        l2 = l1.clone()
+        assert space.listview(l2) is space.listview(l1)
+        assert l1.lshared and l2.lshared
+        assert l1.lstorage is l2.lstorage
+        assert space.fixedview(l2) == space.fixedview(l1)
+        assert l1.lshared and l2.lshared
+        l2.append(space.wrap(None))
+        assert space.listview(l1) is not space.listview(l2)
+        assert len(space.listview(l1)) == 2
+        #
+        l1 = W_ListObject(space, [space.wrap(1), space.wrap(2)])
+        l2 = l1.clone()
+        assert space.listview_int(l2) is space.listview_int(l1)
+        assert l1.lshared and l2.lshared
+
     def test_add_does_not_use_getitems(self):
         l1 = W_ListObject(self.space, [self.space.wrap(1), self.space.wrap(2), self.space.wrap(3)])
         l1.getitems = None
@@ -13,15 +13,26 @@ class Config:
 space = FakeSpace()
 space.config = Config
 
+class NoUnboxingSpace(FakeSpace):
+    # values are unboxed based on their exact type, so nothing is unboxed
+    # by the maps of this space
+    IntObjectCls = None
+    FloatObjectCls = None
+
+no_unboxing_space = NoUnboxingSpace()
+no_unboxing_space.config = Config
+
 class Class(object):
     def __init__(self, hasdict=True, allow_unboxing=False):
         self.hasdict = hasdict
+        if allow_unboxing:
+            map_space = space
+        else:
+            map_space = no_unboxing_space
         if hasdict:
-            self.terminator = DictTerminator(space, self)
-            self.terminator.devolved_dict_terminator.allow_unboxing = allow_unboxing
+            self.terminator = DictTerminator(map_space, self)
         else:
-            self.terminator = NoDictTerminator(space, self)
-        self.terminator.allow_unboxing = allow_unboxing
+            self.terminator = NoDictTerminator(map_space, self)
 
     def instantiate(self, sp=None):
         if sp is None:
@@ -64,7 +75,8 @@ class Object(Object):
             if isinstance(curr, Terminator):
                 return
             curr = curr.back
-        assert len(unerase_unboxed(self._mapdict_read_storage(curr.storageindex))) == curr.listindex + 1
+        unboxed = unerase_unboxed(self._mapdict_read_storage(curr.storageindex))
+        assert curr.listindex + 1 <= len(unboxed) <= curr.first_unboxed.unboxed_size_hint
 
 
 def test_plain_attribute():
@@ -653,12 +665,35 @@ def test_unboxed_type_change():
     w_obj.setdictvalue(space, "b", "woopsie")
     assert w_obj.getdictvalue(space, "b") == "woopsie"
     assert type(w_obj.map) is PlainAttribute
-    assert w_obj.map.terminator.allow_unboxing == False
 
     w_obj = cls.instantiate(space)
     w_obj.setdictvalue(space, "b", 15.12)
     # next time we won't unbox
     assert type(w_obj.map) is PlainAttribute
+    # but other attributes are still unboxed
+    w_obj.setdictvalue(space, "c", 15.12)
+    assert type(w_obj.map) is UnboxedPlainAttribute
+
+def test_unboxed_type_change_keeps_other_attributes_unboxed():
+    cls = Class(allow_unboxing=True)
+    w_obj = cls.instantiate(space)
+    w_obj.setdictvalue(space, "a", 1.5)
+    w_obj.setdictvalue(space, "b", 0.0)
+    w_obj.setdictvalue(space, "c", 2.5)
+    old_map = w_obj.map
+    w_obj.setdictvalue(space, "b", "x")
+    assert old_map.back.devolved
+    assert not old_map.devolved
+    assert not old_map.back.back.devolved
+    assert w_obj.getdictvalue(space, "a") == 1.5
+    assert w_obj.getdictvalue(space, "b") == "x"
+    assert w_obj.getdictvalue(space, "c") == 2.5
+    assert type(w_obj.map) is UnboxedPlainAttribute
+    assert type(w_obj.map.back) is PlainAttribute
+    assert type(w_obj.map.back.back) is UnboxedPlainAttribute
+    # the unboxed list was allocated with the size needed by the old map
+    assert unerase_unboxed(w_obj.storage[0])[:2] == [
+            float2longlong(1.5), float2longlong(2.5)]
 
 def test_unboxed_type_change_other_object():
     cls = Class(allow_unboxing=True)
@@ -673,7 +708,6 @@ def test_unboxed_type_change_other_object():
     w_obj1.setdictvalue(space, "b", "woopsie")
     assert w_obj1.getdictvalue(space, "b") == "woopsie"
     assert type(w_obj1.map) is PlainAttribute
-    assert w_obj1.map.terminator.allow_unboxing == False
 
     # w_obj2 is unaffected so far
     assert type(w_obj2.map) is UnboxedPlainAttribute
@@ -691,7 +725,30 @@ def test_unboxed_mixed_two_different_instances():
     w_obj2 = cls.instantiate(space)
     w_obj2.setdictvalue(space, "b", "abc")
 
-    assert w_obj2.map.terminator.allow_unboxing == False
+    assert type(w_obj2.map) is PlainAttribute
+    assert w_obj1.map.devolved
+    assert w_obj1.getdictvalue(space, "b") == 15.12
+    assert w_obj1.map is w_obj2.map
+
+def test_unboxed_size_hint():
+    cls = Class(allow_unboxing=True)
+    w_obj1 = cls.instantiate(space)
+    for i in range(10):
+        w_obj1.setdictvalue(space, "a%s" % i, i * 1.5)
+    assert w_obj1.map.first_unboxed.unboxed_size_hint == 10
+    unboxed1 = unerase_unboxed(w_obj1.storage[0])
+    assert len(unboxed1) == 10
+    # the next object of that class allocates the complete list directly
+    w_obj2 = cls.instantiate(space)
+    w_obj2.setdictvalue(space, "a0", 0.0)
+    unboxed2 = unerase_unboxed(w_obj2.storage[0])
+    assert len(unboxed2) == 10
+    for i in range(1, 10):
+        w_obj2.setdictvalue(space, "a%s" % i, i * 0.5)
+        assert unerase_unboxed(w_obj2.storage[0]) is unboxed2
+    for i in range(10):
+        assert w_obj1.getdictvalue(space, "a%s" % i) == i * 1.5
+        assert w_obj2.getdictvalue(space, "a%s" % i) == i * 0.5
 
 def test_unboxed_attr_immutability(monkeypatch):
     cls = Class(allow_unboxing=True)
@@ -803,6 +860,29 @@ def test_unbox_reorder_bug3():
     assert obj2.getdictvalue(space, "blocked") == "blocked2"
 
 
+def test_reorder_storage_list_bug():
+    from pypy.objspace.std.mapdict import _make_storage_mixin_size_n
+    from pypy.objspace.std.objectobject import W_ObjectObject
+    class objectcls(W_ObjectObject):
+        objectmodel.import_from_mixin(BaseUserClassMapdict)
+        objectmodel.import_from_mixin(MapdictDictSupport)
+        objectmodel.import_from_mixin(_make_storage_mixin_size_n(5))
+    cls = Class()
+    obj = objectcls()
+    obj.user_setup(space, cls)
+    for attr in "abcdefgh":
+        obj.setdictvalue(space, attr, attr)
+
+    obj2 = objectcls()
+    obj2.user_setup(space, cls)
+    for attr in "abcdefgijh":
+        obj2.setdictvalue(space, attr, attr + "2")
+    # reordering 'h' before 'i' and 'j' goes through a map whose storage
+    # list is shorter than the one the object still has
+    for attr in "abcdefgijh":
+        assert obj2.getdictvalue(space, attr) == attr + "2"
+
+
 def test_unboxed_insert_different_orders_perm():
     from itertools import permutations
     cls = Class(allow_unboxing=True)
@@ -1253,7 +1333,7 @@ class AppTestWithMapDict(object):
         a1.x = "a"
         a1.y = 1
         a1.z = "b"
-        a1.y = None # mark the terminator as allow_unboxing = False
+        a1.y = None # devolve the unboxed attribute y of the class
 
         d = a.__dict__
         # reading a.y during iteration changes the map! now that the iterators
@@ -51,6 +51,25 @@ class TestW_SpecialisedTupleObject():
         hash_test([1, 2, 3], must_be_specialized=False)
         hash_test([1 << 62, 0])
 
+    def test_array_tuples(self):
+        space = self.space
+        w_tuple = space.newtuple([space.wrap(i) for i in range(5)])
+        assert type(w_tuple).__name__ == 'W_IntArrayTupleObject'
+        assert w_tuple.items == [0, 1, 2, 3, 4]
+        w_tuple = space.newtuple([space.wrap(i + 0.5) for i in range(20)])
+        assert type(w_tuple).__name__ == 'W_FloatArrayTupleObject'
+        assert w_tuple.items[19] == 19.5
+        for values in [[1, 2, 3.5], [1.5, 2.5, 3], [1, 2, 3, 'x'], [1]]:
+            w_tuple = space.newtuple([space.wrap(x) for x in values])
+            assert type(w_tuple) is W_TupleObject
+
+    def test_array_tuples_hash_against_normal_tuple(self):
+        self.hash_test([1, 2, 3], must_be_specialized=False)
+        self.hash_test(range(-10, 10), must_be_specialized=False)
+        self.hash_test([-1, -1, -1, 1 << 62], must_be_specialized=False)
+        self.hash_test([1.5, 2.0, -0.0, 1e300], must_be_specialized=False)
+        self.hash_test([float('inf'), 2.0, 3.0], must_be_specialized=False)
+
     try:
         from hypothesis import given, strategies
     except ImportError:
@@ -95,10 +114,52 @@ class AppTestW_SpecialisedTupleObject:
             obj = (1, 2, 3)
             assert self.isspecialised(obj, '_ooo')
 
+    def w_isarray(self, obj, expected):
+        import __pypy__
+        r = __pypy__.internal_repr(obj)
+        return ("W_%sArrayTupleObject" % expected) in r
+
     def test_len(self):
         t = (42, 43)
         assert len(t) == 2
 
+    def test_array_tuples(self):
+        x = 5
+        t = (x, 6, 7, 8, 9, 10, 11)
+        assert self.isarray(t, 'Int')
+        assert len(t) == 7
+        assert t[0] == 5 and t[-1] == 11 and t[2:4] == (7, 8)
+        assert list(t) == range(5, 12)
+        assert 9 in t and 12 not in t
+        assert t.index(8) == 3 and t.count(7) == 1
+        raises(IndexError, "t[7]")
+        raises(IndexError, "t[-8]")
+        f = tuple([x + 0.5 for x in range(10)])
+        assert self.isarray(f, 'Float')
+        assert f[3] == 3.5
+        assert self.isarray(tuple(range(3)), 'Int')
+        assert not self.isarray((1, 2, 3.0), 'Int')
+        assert not self.isarray((1, 2, 3.0), 'Float')
+
+    def test_array_tuples_eq_hash(self):
+        t1 = tuple(range(10))
+        t2 = tuple([i for i in range(10)])
+        assert t1 == t2 and not t1 != t2
+        assert hash(t1) == hash(t2)
+        t3 = tuple([float(i) for i in range(10)])
+        assert t1 == t3 and hash(t1) == hash(t3)
+        t4 = tuple([i * 1L for i in range(10)])
+        assert t1 == t4 == t3 and hash(t1) == hash(t4)
+        assert t1 != tuple(range(11)) and t1 != tuple(range(1, 11))
+        assert t1 < tuple(range(1, 11))
+        assert t1 + (10,) == tuple(range(11))
+        d = {t1: 'a'}
+        assert d[t3] == 'a'
+        N = float('nan')
+        assert (N, N, N) == (N, N, N)
+        assert (0.0, 0.0, 0.0) == (-0.0, -0.0, -0.0)
+        assert (1.5, 2.5, 3.5) != (1.5, 2.5, N)
+
     def test_notspecialisedtuple(self):
         assert not self.isspecialised((42, 43, 44, 45))
         assert not self.isspecialised((1.5,))
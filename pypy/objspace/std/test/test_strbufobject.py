@@ -0,0 +1,96 @@
+from pypy.objspace.std.test import test_bytesobject
+
+
+class AppTestDefaultConfig:
+    def test_strategies_of_added_strings(self):
+        # withstrbuf is off by default, so the results of adding large
+        # strings still get the bytes strategies
+        from __pypy__ import strategy
+        a = "x" * 100
+        b = "y" * 100
+        assert strategy([a + b]) == "BytesListStrategy"
+        assert strategy(set([a + b])) == "BytesSetStrategy"
+        assert strategy({a + b: "v"}) == "BytesDictStrategy"
+
+class AppTestStringObject(test_bytesobject.AppTestBytesObject):
+    spaceconfig = {"objspace.std.withstrbuf": True}
+
+    def test_basic(self):
+        import __pypy__
+        s = "Hello, ".__add__("World!")
+        assert type(s) is str
+        assert 'W_StringBufferObject' not in __pypy__.internal_repr(s)
+        s = ("x" * 100).__add__("y" * 100)
+        assert type(s) is str
+        assert 'W_StringBufferObject' in __pypy__.internal_repr(s)
+        assert s == "x" * 100 + "y" * 100
+
+    def test_add_twice(self):
+        x = "a" * 200
+        y = x + "b"
+        c = x + "c"
+        assert c == "a" * 200 + "c"
+        assert y == "a" * 200 + "b"
+
+    def test_add_twice2(self):
+        x = "a" * 200
+        y = x + "b"
+        c = y + "c"
+        d = y + "d"
+        assert c == "a" * 200 + "bc"
+        assert d == "a" * 200 + "bd"
+
+    def test_loop(self):
+        import __pypy__
+        s = ""
+        for i in range(1000):
+            s += str(i)
+            assert len(s) <= 3000
+        assert 'W_StringBufferObject' in __pypy__.internal_repr(s)
+        assert s == "".join([str(i) for i in range(1000)])
+        assert len(s) == len("".join([str(i) for i in range(1000)]))
+
+    def test_compare(self):
+        x = "a" * 200 + "b"
+        y = "a" * 200 + "b"
+        assert x == y
+        assert not x != y
+        assert x == "a" * 200 + "b"
+        assert "a" * 200 + "b" == x
+        assert x < "b"
+        assert "b" > x
+        assert x <= y and x >= y
+        assert hash(x) == hash("a" * 200 + "b")
+        d = {x: 1}
+        assert d["a" * 200 + "b"] == 1
+        assert d[y] == 1
+
+    def test_str_methods(self):
+        x = "a" * 200 + "b"
+        assert x.startswith("a" * 200)
+        assert x.endswith("b")
+        assert x.upper() == "A" * 200 + "B"
+        assert x[-1] == "b"
+        assert x[199:] == "ab"
+        assert "ab" in x
+        assert x.count("a") == 200
+        assert "-".join([x, "c"]) == x + "-c"
+        assert x.replace("a", "") == "b"
+        assert "%s!" % x == x + "!"
+        assert str(x) is x
+        assert x * 2 == "a" * 200 + "b" + "a" * 200 + "b"
+
+    def test_mixed_types(self):
+        x = "a" * 200 + "b"
+        assert x + u"c" == u"a" * 200 + u"bc"
+        assert type(x + u"c") is unicode
+        assert x + bytearray("c") == bytearray("a" * 200 + "bc")
+        assert u"c" + x == u"c" + u"a" * 200 + u"b"
+        assert "c" + x == "c" + "a" * 200 + "b"
+        raises(TypeError, "x + 5")
+        raises(TypeError, "5 + x")
+
+    def test_marshal(self):
+        import marshal
+        x = "a" * 200 + "b"
+        assert marshal.loads(marshal.dumps(x)) == x
@@ -0,0 +1,175 @@
+import py
+
+from pypy.objspace.std.dictmultiobject import BytesDictStrategy
+from pypy.objspace.std.unboxeddict import (BytesIntDictStrategy,
+    BytesFloatDictStrategy)
+from pypy.objspace.std.test.test_dictmultiobject import (
+    BaseTestRDictImplementation, BaseTestDevolvedDictImplementation)
+
+
+class TestBytesIntDictImplementation(BaseTestRDictImplementation):
+    StrategyClass = BytesIntDictStrategy
+
+    def test_view_as_kwargs(self):
+        self.fill_impl()
+        assert self.fakespace.view_as_kwargs(self.impl) == (
+            ["fish", "fish2"], [1000, 2000])
+
+    def test_devolve_value(self):
+        self.fill_impl()
+        self.impl.setitem(self.string, "x")
+        assert type(self.impl.get_strategy()) is BytesDictStrategy
+        assert self.impl.getitem(self.string) == "x"
+        assert self.impl.getitem(self.string2) == 2000
+
+    def test_devolve_value_setitem_str(self):
+        self.fill_impl()
+        self.impl.setitem_str("fish3", 1.5)
+        assert type(self.impl.get_strategy()) is BytesDictStrategy
+        assert self.impl.getitem_str("fish3") == 1.5
+        assert self.impl.getitem_str("fish") == 1000
+
+class TestDevolvedBytesIntDictImplementation(
+        BaseTestDevolvedDictImplementation):
+    StrategyClass = BytesIntDictStrategy
+
+
+class TestBytesFloatDictImplementation(BaseTestRDictImplementation):
+    StrategyClass = BytesFloatDictStrategy
+
+    def fill_impl(self):
+        self.impl.setitem(self.string, 1000.0)
+        self.impl.setitem(self.string2, 2000.0)
+
+    def test_setitem(self):
+        self.impl.setitem(self.string, 1000.0)
+        assert self.impl.getitem(self.string) == 1000.0
+        self.check_not_devolved()
+
+    def test_setitem_str(self):
+        self.impl.setitem_str(self.string, 1000.0)
+        assert self.impl.getitem_str(self.string) == 1000.0
+        self.check_not_devolved()
+
+    def test_devolve_value(self):
+        self.fill_impl()
+        self.impl.setitem(self.string, 3)
+        assert type(self.impl.get_strategy()) is BytesDictStrategy
+        assert type(self.impl.getitem(self.string)) is int
+        assert self.impl.getitem(self.string2) == 2000.0
+
+
+class AppTestUnboxedDict(object):
+
+    def setup_class(cls):
+        if cls.runappdirect:
+            py.test.skip("__repr__ doesn't work on appdirect")
+
+    def w_get_strategy(self, obj):
+        import __pypy__
+        r = __pypy__.internal_repr(obj)
+        return r[r.find("(") + 1: r.find(")")]
+
+    def test_use_strategy(self):
+        d = {}
+        d[b"a"] = 1
+        assert "BytesIntDictStrategy" in self.get_strategy(d)
+        d = {b"a": 1.5}
+        assert "BytesFloatDictStrategy" in self.get_strategy(d)
+        d = {1: 2}
+        assert "IntIntDictStrategy" in self.get_strategy(d)
+        d = {}
+        d.setdefault(1, 2.5)
+        assert "IntFloatDictStrategy" in self.get_strategy(d)
+
+        class O(object):
+            pass
+        o = O()
+        d = o.__dict__ = {}
+        o.a = 1
+        assert "BytesIntDictStrategy" in self.get_strategy(d)
+
+    def test_counter(self):
+        d = {}
+        for word in "a b a c a b".split():
+            d[word] = d.get(word, 0) + 1
+        assert "BytesIntDictStrategy" in self.get_strategy(d)
+        assert d == {"a": 3, "b": 2, "c": 1}
+        assert sorted(d.items()) == [("a", 3), ("b", 2), ("c", 1)]
+        assert sorted(d.values()) == [1, 2, 3]
+        assert sorted(d.itervalues()) == [1, 2, 3]
+        assert sorted(d.iteritems()) == [("a", 3), ("b", 2), ("c", 1)]
+
+    def test_operations(self):
+        d = {1: 0.5, 2: 1.5, 3: 2.5}
+        assert "IntFloatDictStrategy" in self.get_strategy(d)
+        assert d.pop(2) == 1.5
+        assert d.pop(2, None) is None
+        raises(KeyError, d.pop, 2)
+        assert d.setdefault(1, 7.0) == 0.5
+        assert d.get(4) is None
+        assert 1 in d and 4 not in d
+        d2 = d.copy()
+        assert "IntFloatDictStrategy" in self.get_strategy(d2)
+        assert d2 == d
+        d2.update({5: 6.5})
+        assert d2 == {1: 0.5, 3: 2.5, 5: 6.5}
+        k, v = d2.popitem()
+        assert {1: 0.5, 3: 2.5, 5: 6.5}[k] == v
+        assert len(d2) == 2
+        assert "IntFloatDictStrategy" in self.get_strategy(d2)
+        del d[1]
+        assert d == {3: 2.5}
+        d.clear()
+        assert d == {}
+
+    def test_identity(self):
+        x = 12345678
+        d = {"a": x}
+        assert d["a"] is x
+        y = float('nan')
+        d = {"a": y}
+        assert d["a"] is y
+
+    def test_kwargs(self):
+        def f(**kwargs):
+            return kwargs
+        d = {"a": 1, "b": 2}
+        assert "BytesIntDictStrategy" in self.get_strategy(d)
+        assert f(**d) == {"a": 1, "b": 2}
+
+    def test_devolve_value(self):
+        d = {1: 2, 3: 4}
+        d[5] = "x"
+        assert "IntDictStrategy" in self.get_strategy(d)
+        assert d == {1: 2, 3: 4, 5: "x"}
+        d = {"a": 1.5}
+        d["b"] = 2
+        assert "BytesDictStrategy" in self.get_strategy(d)
+        assert type(d["a"]) is float and type(d["b"]) is int
+        d = {"a": 1}
+        d["b"] = True
+        assert "BytesDictStrategy" in self.get_strategy(d)
+        assert d["b"] is True
+        d = {"a": 1}
+        d["b"] = 2L
+        assert "BytesDictStrategy" in self.get_strategy(d)
+        assert type(d["b"]) is long
+
+    def test_devolve_key(self):
+        d = {1: 2}
+        d["x"] = 3
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d == {1: 2, "x": 3}
+        class Foo(object):
+            def __eq__(self, other):
+                return False
+        d = {"a": 1.5}
+        assert d.get(Foo()) is None
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d == {"a": 1.5}
+
+    def test_int_keys_float_lookup(self):
+        d = {1: 2}
+        assert d[1.0] == 2
+        assert d[1L] == 2
@@ -53,6 +53,20 @@ class TestUnicodeObject:
         assert space.eq_w(w_char1, w_uni._getitem_result(space, 0))
         assert space.eq_w(w_char2, w_uni._getitem_result(space, 1))
 
+    def test_find_without_index(self):
+        space = self.space
+        u = u"\xe4bc" * 10 + u"xyz" + u"\u1234bc" * 10
+        w_uni = space.newutf8(u.encode("utf-8"), len(u))
+        w_res = space.call_method(w_uni, "find", space.newutf8("xyz", 3))
+        assert space.int_w(w_res) == 30
+        w_res = space.call_method(w_uni, "rfind", space.newutf8("b", 1))
+        assert space.int_w(w_res) == len(u) - 2
+        assert not w_uni._index_storage
+        # but the other callers build the index, as they might ask for
+        # many positions
+        assert w_uni._byte_to_index(len(u"\xe4bc".encode("utf-8"))) == 3
+        assert w_uni._index_storage
+
 
     if HAS_HYPOTHESIS:
         @given(strategies.text(), strategies.integers(min_value=0, max_value=10),
@@ -970,6 +984,20 @@ class AppTestUnicodeString:
         assert u'abcdefghiabc'.rfind(u'abcz') == -1
         assert u"\u1234\u5678".rfind(u'\u5678') == 1
 
+    def test_find_long_non_ascii(self):
+        u = u'abc\xe9\u1234\U00012345' * 30 + u'xyz' + u'\u1234abc' * 30
+        i = 6 * 30
+        assert u.find(u'xyz') == i
+        assert u.rfind(u'xyz') == i
+        assert u.find(u'\u1234abc\u1234') == i + 3
+        assert u.rfind(u'\xe9') == i - 3
+        assert u.rfind(u'\u1234') == len(u) - 4
+        assert u.partition(u'xyz') == (u[:i], u'xyz', u[i + 3:])
+        assert u.rpartition(u'\U00012345') == (u[:i - 1], u'\U00012345',
+                                                 u[i:])
+        assert u[i:i + 3] == u'xyz'
+        assert u.find(u'xyz', 10) == i
+
     def test_rfind_corner_case(self):
         assert u'abc'.rfind('', 4) == -1
 
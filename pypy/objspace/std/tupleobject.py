@@ -100,6 +100,9 @@ class W_AbstractTupleObject(W_Root):
             return w_sequence
         else:
             tuple_w = space.fixedview(w_sequence)
+        if space.is_w(w_tupletype, space.w_tuple):
+            # may return one of the specialised tuple implementations
+            return space.newtuple(tuple_w)
         w_obj = space.allocate_instance(W_TupleObject, w_tupletype)
         W_TupleObject.__init__(w_obj, tuple_w)
         return w_obj
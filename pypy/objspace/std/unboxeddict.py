@@ -0,0 +1,303 @@
+## ----------------------------------------------------------------------------
+## dict strategies with unboxed values (see dictmultiobject.py)
+
+from rpython.rlib import jit, rerased
+from pypy.objspace.std.dictmultiobject import (
+    AbstractTypedStrategy, BytesDictStrategy, DictStrategy, IntDictStrategy,
+    ObjectDictStrategy, _never_equal_to_string, create_iterator_classes)
+
+
+# These strategies are selected by EmptyDictStrategy.switch_to_correct_strategy
+# when the first key is a str or an int and the first value is an int or a
+# float.  The values are then stored unwrapped, so that a dict like
+# {str: int} or {int: float} takes less memory and doesn't contain any GC
+# pointer to trace apart from the keys.
+#
+# When a value of another type is stored, the dict devolves to the
+# corresponding strategy with wrapped values (BytesDictStrategy or
+# IntDictStrategy); when a key of another type is stored, it devolves to
+# ObjectDictStrategy, like the other typed strategies.
+
+class UnboxedValueMixin(object):
+    _mixin_ = True
+
+    def is_correct_value(self, w_value):
+        raise NotImplementedError("abstract base class")
+
+    def wrap_value(self, value):
+        raise NotImplementedError("abstract base class")
+
+    def unwrap_value(self, w_value):
+        raise NotImplementedError("abstract base class")
+
+    def get_boxed_strategy(self):
+        raise NotImplementedError("abstract base class")
+
+    def setitem(self, w_dict, w_key, w_value):
+        if self.is_correct_type(w_key):
+            if self.is_correct_value(w_value):
+                d = self.unerase(w_dict.dstorage)
+                d[self.unwrap(w_key)] = self.unwrap_value(w_value)
+                return
+            self.switch_to_boxed_strategy(w_dict)
+        else:
+            self.switch_to_object_strategy(w_dict)
+        w_dict.setitem(w_key, w_value)
+
+    def setdefault(self, w_dict, w_key, w_default):
+        if self.is_correct_type(w_key):
+            d = self.unerase(w_dict.dstorage)
+            key = self.unwrap(w_key)
+            try:
+                value = d[key]
+            except KeyError:
+                self.setitem(w_dict, w_key, w_default)
+                return w_default
+            return self.wrap_value(value)
+        else:
+            self.switch_to_object_strategy(w_dict)
+            return w_dict.setdefault(w_key, w_default)
+
+    def getitem(self, w_dict, w_key):
+        space = self.space
+        if self.is_correct_type(w_key):
+            d = self.unerase(w_dict.dstorage)
+            key = self.unwrap(w_key)
+            try:
+                value = d[key]
+            except KeyError:
+                return None
+            return self.wrap_value(value)
+        elif self._never_equal_to(space.type(w_key)):
+            return None
+        else:
+            self.switch_to_object_strategy(w_dict)
+            return w_dict.getitem(w_key)
+
+    def values(self, w_dict):
+        return [self.wrap_value(value)
+                for value in self.unerase(w_dict.dstorage).itervalues()]
+
+    def items(self, w_dict):
+        space = self.space
+        d = self.unerase(w_dict.dstorage)
+        return [space.newtuple2(self.wrap(key), self.wrap_value(value))
+                for (key, value) in d.iteritems()]
+
+    def popitem(self, w_dict):
+        key, value = self.unerase(w_dict.dstorage).popitem()
+        return (self.wrap(key), self.wrap_value(value))
+
+    def pop(self, w_dict, w_key, w_default):
+        space = self.space
+        if self.is_correct_type(w_key):
+            d = self.unerase(w_dict.dstorage)
+            key = self.unwrap(w_key)
+            if w_default is None:
+                return self.wrap_value(d.pop(key))
+            try:
+                value = d.pop(key)
+            except KeyError:
+                return w_default
+            return self.wrap_value(value)
+        elif self._never_equal_to(space.type(w_key)):
+            if w_default is not None:
+                return w_default
+            raise KeyError
+        else:
+            self.switch_to_object_strategy(w_dict)
+            return w_dict.get_strategy().pop(w_dict, w_key, w_default)
+
+    def switch_to_object_strategy(self, w_dict):
+        d = self.unerase(w_dict.dstorage)
+        strategy = self.space.fromcache(ObjectDictStrategy)
+        d_new = strategy.unerase(strategy.get_empty_storage())
+        for key, value in d.iteritems():
+            d_new[self.wrap(key)] = self.wrap_value(value)
+        w_dict.set_strategy(strategy)
+        w_dict.dstorage = strategy.erase(d_new)
+
+    def switch_to_boxed_strategy(self, w_dict):
+        d = self.unerase(w_dict.dstorage)
+        strategy = self.get_boxed_strategy()
+        d_new = strategy.unerase(strategy.get_empty_storage())
+        for key, value in d.iteritems():
+            d_new[key] = self.wrap_value(value)
+        w_dict.set_strategy(strategy)
+        w_dict.dstorage = strategy.erase(d_new)
+
+
+class IntValueMixin(object):
+    _mixin_ = True
+
+    def is_correct_value(self, w_value):
+        space = self.space
+        return space.is_w(space.type(w_value), space.w_int)
+
+    def wrap_value(self, value):
+        return self.space.newint(value)
+
+    def unwrap_value(self, w_value):
+        return self.space.int_w(w_value)
+
+    def wrapvalue(space, value):
+        return space.newint(value)
+
+
+class FloatValueMixin(object):
+    _mixin_ = True
+
+    def is_correct_value(self, w_value):
+        space = self.space
+        return space.is_w(space.type(w_value), space.w_float)
+
+    def wrap_value(self, value):
+        return self.space.newfloat(value)
+
+    def unwrap_value(self, w_value):
+        return self.space.float_w(w_value)
+
+    def wrapvalue(space, value):
+        return space.newfloat(value)
+
+
+class BytesKeyMixin(object):
+    _mixin_ = True
+
+    def wrap(self, unwrapped):
+        return self.space.newbytes(unwrapped)
+
+    def unwrap(self, wrapped):
+        return self.space.bytes_w(wrapped)
+
+    def is_correct_type(self, w_obj):
+        space = self.space
+        return space.is_w(space.type(w_obj), space.w_bytes)
+
+    def get_empty_storage(self):
+        return self.erase({})
+
+    def _never_equal_to(self, w_lookup_type):
+        return _never_equal_to_string(self.space, w_lookup_type)
+
+    def get_boxed_strategy(self):
+        return self.space.fromcache(BytesDictStrategy)
+
+    def setitem_str(self, w_dict, key, w_value):
+        assert key is not None
+        if self.is_correct_value(w_value):
+            self.unerase(w_dict.dstorage)[key] = self.unwrap_value(w_value)
+        else:
+            self.switch_to_boxed_strategy(w_dict)
+            w_dict.setitem_str(key, w_value)
+
+    def getitem(self, w_dict, w_key):
+        space = self.space
+        # -- This is called extremely often.  Hack for performance --
+        if type(w_key) is space.StringObjectCls:
+            return self.getitem_str(w_dict, w_key.unwrap(space))
+        # -- End of performance hack --
+        return UnboxedValueMixin.getitem(self, w_dict, w_key)
+
+    def getitem_str(self, w_dict, key):
+        assert key is not None
+        d = self.unerase(w_dict.dstorage)
+        try:
+            value = d[key]
+        except KeyError:
+            return None
+        return self.wrap_value(value)
+
+    def listview_bytes(self, w_dict):
+        return self.unerase(w_dict.dstorage).keys()
+
+    def w_keys(self, w_dict):
+        return self.space.newlist_bytes(self.listview_bytes(w_dict))
+
+    def wrapkey(space, key):
+        return space.newbytes(key)
+
+    @jit.look_inside_iff(lambda self, w_dict:
+                         w_dict._unrolling_heuristic())
+    def view_as_kwargs(self, w_dict):
+        d = self.unerase(w_dict.dstorage)
+        l = len(d)
+        keys, values = [None] * l, [None] * l
+        i = 0
+        for key, value in d.iteritems():
+            keys[i] = key
+            values[i] = self.wrap_value(value)
+            i += 1
+        return keys, values
+
+
+class IntKeyMixin(object):
+    _mixin_ = True
+
+    def wrap(self, unwrapped):
+        return self.space.newint(unwrapped)
+
+    def unwrap(self, wrapped):
+        return self.space.int_w(wrapped)
+
+    def is_correct_type(self, w_obj):
+        space = self.space
+        return space.is_w(space.type(w_obj), space.w_int)
+
+    def get_empty_storage(self):
+        return self.erase({})
+
+    def _never_equal_to(self, w_lookup_type):
+        space = self.space
+        return (space.is_w(w_lookup_type, space.w_NoneType) or
+                space.is_w(w_lookup_type, space.w_bytes) or
+                space.is_w(w_lookup_type, space.w_unicode)
+                )
+
+    def get_boxed_strategy(self):
+        return self.space.fromcache(IntDictStrategy)
+
+    def listview_int(self, w_dict):
+        return self.unerase(w_dict.dstorage).keys()
+
+    def w_keys(self, w_dict):
+        return self.space.newlist_int(self.listview_int(w_dict))
+
+    def wrapkey(space, key):
+        return space.newint(key)
+
+
+class BytesIntDictStrategy(BytesKeyMixin, IntValueMixin, UnboxedValueMixin,
+                           AbstractTypedStrategy, DictStrategy):
+    erase, unerase = rerased.new_erasing_pair("bytes_int")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+create_iterator_classes(BytesIntDictStrategy)
+
+
+class BytesFloatDictStrategy(BytesKeyMixin, FloatValueMixin, UnboxedValueMixin,
+                             AbstractTypedStrategy, DictStrategy):
+    erase, unerase = rerased.new_erasing_pair("bytes_float")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+create_iterator_classes(BytesFloatDictStrategy)
+
+
+class IntIntDictStrategy(IntKeyMixin, IntValueMixin, UnboxedValueMixin,
+                         AbstractTypedStrategy, DictStrategy):
+    erase, unerase = rerased.new_erasing_pair("int_int")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+create_iterator_classes(IntIntDictStrategy)
+
+
+class IntFloatDictStrategy(IntKeyMixin, FloatValueMixin, UnboxedValueMixin,
+                           AbstractTypedStrategy, DictStrategy):
+    erase, unerase = rerased.new_erasing_pair("int_float")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+create_iterator_classes(IntFloatDictStrategy)
@@ -894,7 +894,7 @@ class W_UnicodeObject(W_Root):
         if pos < 0:
             return space.newtuple([self, self._empty(), self._empty()])
         else:
-            lgt = rutf8.check_utf8(value, True, stop=pos)
+            lgt = self._codepoints_in_utf8(0, pos)
             return space.newtuple(
                 [W_UnicodeObject(value[0:pos], lgt), w_sub,
                  W_UnicodeObject(value[pos + len(sub._utf8):len(value)],
@@ -912,7 +912,7 @@ class W_UnicodeObject(W_Root):
         if pos < 0:
             return space.newtuple([self._empty(), self._empty(), self])
         else:
-            lgt = rutf8.check_utf8(value, True, stop=pos)
+            lgt = self._codepoints_in_utf8(0, pos)
             return space.newtuple(
                 [W_UnicodeObject(value[0:pos], lgt), w_sub,
                  W_UnicodeObject(value[pos + len(sub._utf8):len(value)],
@@ -1028,6 +1028,24 @@ class W_UnicodeObject(W_Root):
         return rutf8.codepoint_index_at_byte_position(
             self._utf8, self._get_index_storage(), bytepos, self._len())
 
+    def _search_result_to_index(self, bytepos, forward):
+        """ like _byte_to_index(), for the result of a search that started
+        from the start of the string, or from its end if not 'forward'
+        """
+        if self.is_ascii():
+            return bytepos
+        if not self._index_storage:
+            # no index yet: counting the codepoints that the search walked
+            # over is not slower than the search itself, whereas building
+            # the index would walk the whole string.  Not done in
+            # _byte_to_index(), whose callers (like the match objects of
+            # _sre) can ask for many positions.
+            if forward:
+                return rutf8.codepoints_in_utf8(self._utf8, 0, bytepos)
+            return self._length - rutf8.codepoints_in_utf8(
+                self._utf8, bytepos, len(self._utf8))
+        return self._byte_to_index(bytepos)
+
     def next_codepoint_pos_dont_look_inside(self, pos):
         if self.is_ascii():
             return pos + 1
@@ -1064,14 +1082,14 @@ class W_UnicodeObject(W_Root):
             res_index = self._utf8.find(w_sub._utf8, start_index, end_index)
             if res_index < 0:
                 return None
-            res = self._byte_to_index(res_index)
+            res = self._search_result_to_index(res_index, True)
             assert res >= 0
             return space.newint(res)
         else:
             res_index = self._utf8.rfind(w_sub._utf8, start_index, end_index)
             if res_index < 0:
                 return None
-            res = self._byte_to_index(res_index)
+            res = self._search_result_to_index(res_index, False)
             assert res >= 0
             return space.newint(res)
 
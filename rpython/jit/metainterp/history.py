@@ -452,6 +452,11 @@ class JitCellToken(AbstractDescr):
         assert isinstance(jitcell_token, JitCellToken)
         self._keepalive_jitcell_tokens[jitcell_token] = None
 
+    def get_code_size(self):
+        if self.compiled_loop_token is None:
+            return 0
+        return self.compiled_loop_token.get_code_size()
+
     def __repr__(self):
         return '<Loop %d, gen=%d>' % (self.number, self.generation)
 
@@ -2,6 +2,7 @@ import math
 from rpython.rlib.rarithmetic import r_int64
 from rpython.rlib.debug import debug_start, debug_print, debug_stop
 from rpython.rlib.objectmodel import we_are_translated
+from rpython.rlib.listsort import make_timsort_class
 
 #
 # Logic to decide which loops are old and not used any more.
@@ -19,6 +20,18 @@ from rpython.rlib.objectmodel import we_are_translated
 # 'generation' field is much smaller than the current generation, and
 # removed from the set.
 #
+# Additionally, if 'max_code_size' is set, the total size of the machine
+# code of the alive loops (including their bridges) is checked after
+# each new loop or bridge.  If it is above the limit, the least recently
+# used loops, i.e. the ones with the smallest 'generation', are removed
+# from 'alive_loops' until we are below the limit again.
+#
+
+def _generation_lt(token1, token2):
+    return token1.generation < token2.generation
+
+GenerationSort = make_timsort_class(lt=_generation_lt)
+
 
 class MemoryManager(object):
 
@@ -38,6 +51,9 @@ class MemoryManager(object):
         self.current_generation = r_int64(1)
         self.next_check = r_int64(-1)
         self.alive_loops = {}
+        self.max_code_size = 0
+        self.code_size = 0
+        self.evicted_loops = 0
 
     def set_max_age(self, max_age, check_frequency=0):
         if max_age <= 0:
@@ -49,11 +65,17 @@ class MemoryManager(object):
             self.check_frequency = check_frequency
             self.next_check = self.current_generation + 1
 
+    def set_max_code_size(self, max_code_size):
+        # in bytes; 0 means no limit
+        self.max_code_size = max_code_size
+
     def next_generation(self):
         self.current_generation += 1
         if self.current_generation == self.next_check:
             self._kill_old_loops_now()
             self.next_check = self.current_generation + self.check_frequency
+        if self.max_code_size > 0:
+            self._evict_loops_over_budget()
 
     def keep_loop_alive(self, looptoken):
         if looptoken.generation != self.current_generation:
@@ -82,6 +104,32 @@ class MemoryManager(object):
             rgc.collect(); rgc.collect(); rgc.collect()
         debug_stop("jit-mem-collect")
 
+    def _evict_loops_over_budget(self):
+        tokens = self.alive_loops.keys()
+        total = 0
+        for looptoken in tokens:
+            total += looptoken.get_code_size()
+        self.code_size = total
+        if total <= self.max_code_size:
+            return
+        debug_start("jit-mem-evict")
+        debug_print("Code size before:", total)
+        GenerationSort(tokens).sort()
+        oldtotal = len(self.alive_loops)
+        for looptoken in tokens:
+            if total <= self.max_code_size:
+                break
+            if looptoken.generation >= self.current_generation - 1:
+                break     # don't evict the loops that we just compiled or ran
+            del self.alive_loops[looptoken]
+            total -= looptoken.get_code_size()
+        evicted = oldtotal - len(self.alive_loops)
+        self.evicted_loops += evicted
+        self.code_size = total
+        debug_print("Loop tokens evicted:", evicted)
+        debug_print("Code size after: ", total)
+        debug_stop("jit-mem-evict")
+
     def release_all_loops(self):
         debug_start("jit-mem-releaseall")
         debug_print("Loop tokens cleared:", len(self.alive_loops))
@@ -349,6 +349,24 @@ class JitHookInterfaceTests(object):
                                no_stats_history=True)
         assert res == 42
 
+    def test_memmgr_stats(self):
+        driver = JitDriver(greens = [], reds = ['i'])
+        def loop(i):
+            while i > 0:
+                driver.jit_merge_point(i=i)
+                i -= 1
+        def main():
+            if jit_hooks.stats_memmgr_alive_loops(None) != 0:
+                return 1000
+            loop(30)
+            if jit_hooks.stats_memmgr_alive_loops(None) == 0:
+                return 2000
+            return jit_hooks.stats_memmgr_evicted_loops(None)
+
+        res = self.meta_interp(main, [], ProfilerClass=Profiler,
+                               no_stats_history=True)
+        assert res == 0
+
 
 class LLJitHookInterfaceTests(JitHookInterfaceTests):
     # use this for any backend, instead of the super class
@@ -22,6 +22,12 @@ class FakeLoopToken:
     generation = 0
     invalidated = False
 
+    def __init__(self, code_size=0):
+        self.code_size = code_size
+
+    def get_code_size(self):
+        return self.code_size
+
 
 class _TestMemoryManager:
     # We spawn a fresh process below to lower the time it takes to do
@@ -78,6 +84,39 @@ class _TestMemoryManager:
             else:
                 assert tokens[i] in memmgr.alive_loops
 
+    def test_max_code_size(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_code_size(250)
+        tokens = [FakeLoopToken(100) for i in range(5)]
+        for token in tokens:
+            memmgr.keep_loop_alive(token)
+            memmgr.next_generation()
+        assert memmgr.alive_loops == dict.fromkeys(tokens[3:])
+        assert memmgr.code_size == 200
+        assert memmgr.evicted_loops == 3
+
+    def test_max_code_size_lru(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_code_size(350)
+        tokens = [FakeLoopToken(100) for i in range(4)]
+        for i in range(len(tokens)):
+            memmgr.keep_loop_alive(tokens[i])
+            memmgr.next_generation()
+            # tokens[0] is used all the time, so it is not evicted
+            memmgr.keep_loop_alive(tokens[0])
+        assert memmgr.alive_loops == dict.fromkeys(
+            [tokens[0], tokens[2], tokens[3]])
+        assert memmgr.evicted_loops == 1
+
+    def test_max_code_size_keeps_newest(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_code_size(50)
+        token = FakeLoopToken(100)
+        memmgr.keep_loop_alive(token)
+        memmgr.next_generation()
+        assert memmgr.alive_loops == {token: None}
+        assert memmgr.evicted_loops == 0
+
 
 class _TestIntegration(LLJitMixin):
     # See comments in TestMemoryManager.  To get temporarily the normal
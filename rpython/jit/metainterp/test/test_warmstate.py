@@ -1,3 +1,4 @@
+import py
 from rpython.rtyper.test.test_llinterp import interpret
 from rpython.rtyper.lltypesystem import lltype, llmemory, rstr, rffi
 from rpython.rtyper.annlowlevel import llhelper
@@ -197,3 +198,33 @@ def test_make_jitdriver_callbacks_5():
     state.make_jitdriver_callbacks()
     res = state.can_never_inline(5, 42.5)
     assert res is True
+
+def test_compile_duty(monkeypatch):
+    from rpython.jit.metainterp import warmstate
+    class FakeTime:
+        now = 100.0
+        def time(self):
+            return self.now
+    faketime = FakeTime()
+    monkeypatch.setattr(warmstate, 'time', faketime)
+    state = WarmEnterState(FakeWarmRunnerDesc(), None)
+    jitcounter = state.warmrunnerdesc.jitcounter
+    # no limit by default
+    state.tracing_finished(50.0)
+    assert state.may_start_tracing(1234)
+    # at most 20% of the time: 2 seconds of tracing means 8 idle seconds
+    state.set_param_compile_duty(20)
+    state.tracing_finished(98.0)
+    assert state.next_tracing_time == 108.0
+    assert not state.may_start_tracing(1234)
+    # the counter was put close to the threshold again
+    assert jitcounter.lookup_chain(1234) is None
+    assert not jitcounter.tick(1234, 0.01)
+    assert jitcounter.tick(1234, 0.01)
+    faketime.now = 108.5
+    assert state.may_start_tracing(1234)
+    # out of range values are clamped
+    state.set_param_compile_duty(101)
+    assert state.compile_duty == 100
+    state.set_param_compile_duty(-5)
+    assert state.compile_duty == 0
@@ -1,4 +1,5 @@
 import sys
+import time
 import weakref
 
 from rpython.jit.codewriter import support, longlong
@@ -296,6 +297,15 @@ class WarmEnterState(object):
             self.warmrunnerdesc.memory_manager is not None):   # all for tests
             self.warmrunnerdesc.memory_manager.set_max_age(value)
 
+    def set_param_max_code_size(self, value):
+        # note: it's a global parameter, not a per-jitdriver one
+        if value < 0:
+            raise ValueError
+        if (self.warmrunnerdesc is not None and
+            self.warmrunnerdesc.memory_manager is not None):   # all for tests
+            self.warmrunnerdesc.memory_manager.set_max_code_size(
+                value * 1024 * 1024)
+
     def set_param_retrace_limit(self, value):
         if self.warmrunnerdesc:
             if self.warmrunnerdesc.memory_manager:
@@ -328,6 +338,33 @@ class WarmEnterState(object):
     def set_param_vec_cost(self, ivalue):
         self.vec_cost = ivalue
 
+    def set_param_compile_duty(self, value):
+        if value < 0:
+            value = 0
+        elif value > 100:
+            value = 100
+        self.compile_duty = value
+        self.next_tracing_time = 0.0
+
+    def may_start_tracing(self, hash):
+        """Return False if starting to trace now would exceed the
+        'compile_duty' percentage of time.  In that case, the counter of
+        'hash' is set again close to the threshold, so that we retry
+        after a few more iterations.
+        """
+        if self.compile_duty > 0 and time.time() < self.next_tracing_time:
+            jitcounter = self.warmrunnerdesc.jitcounter
+            jitcounter.change_current_fraction(hash, 0.98)
+            return False
+        return True
+
+    def tracing_finished(self, starttime):
+        if self.compile_duty > 0:
+            now = time.time()
+            busy = now - starttime
+            idle = busy * (100 - self.compile_duty) / self.compile_duty
+            self.next_tracing_time = now + idle
+
     def disable_noninlinable_function(self, greenkey):
         cell = self.JitCell.ensure_jit_cell_at_key(greenkey)
         cell.flags |= JC_DONT_TRACE_HERE
@@ -383,6 +420,7 @@ class WarmEnterState(object):
         cpu = self.cpu
         jitcounter = self.warmrunnerdesc.jitcounter
         result_type = jitdriver_sd.result_type
+        warmstate = self
 
         def execute_assembler(loop_token, *args):
             # Call the backend to run the 'looptoken' with the given
@@ -429,6 +467,8 @@ class WarmEnterState(object):
             jitcounter.decay_all_counters()
             if rstack.stack_almost_full():
                 return
+            if not warmstate.may_start_tracing(hash):
+                return
             greenargs = args[:num_green_args]
             if cell is None:
                 cell = JitCell(*greenargs)
@@ -438,10 +478,12 @@ class WarmEnterState(object):
                 metainterp_sd, jitdriver_sd,
                 force_finish_trace=bool(cell.flags & JC_FORCE_FINISH))
             cell.flags |= JC_TRACING | JC_TRACING_OCCURRED
+            starttime = time.time()
             try:
                 metainterp.compile_and_run_once(jitdriver_sd, *args)
             finally:
                 cell.flags &= ~JC_TRACING
+                warmstate.tracing_finished(starttime)
 
         def maybe_compile_and_run(increment_threshold, *args):
             """Entry point to the JIT.  Called at the point with the
@@ -166,6 +166,9 @@ class GCBase(object):
         self.collect()
         return True
 
+    def freeze(self):
+        pass
+
     def malloc(self, typeid, length=0, zero=False):
         """NOT_RPYTHON
         For testing.  The interface used by the gctransformer is
@@ -36,6 +36,13 @@ class GcHooks(object):
         incminimark.GC_STATES.
         """
 
+    def on_gc_pause_miss(self, duration, target, state):
+        """
+        Called when a step of a major collection took more than the
+        target duration set with PYPY_GC_MAX_PAUSE, just before the
+        corresponding on_gc_collect_step().  It is enabled together with
+        on_gc_collect_step().
+        """
 
     def on_gc_collect(self, num_major_collects,
                       arenas_count_before, arenas_count_after,
@@ -58,6 +65,11 @@ class GcHooks(object):
         if self.is_gc_collect_step_enabled():
             self.on_gc_collect_step(duration, oldstate, newstate)
 
+    @rgc.no_collect
+    def fire_gc_pause_miss(self, duration, target, state):
+        if self.is_gc_collect_step_enabled():
+            self.on_gc_pause_miss(duration, target, state)
+
     @rgc.no_collect
     def fire_gc_collect(self, num_major_collects,
                         arenas_count_before, arenas_count_after,
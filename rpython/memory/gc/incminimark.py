@@ -9,12 +9,33 @@ Environment variables can be used to fine-tune the following parameters:
  PYPY_GC_NURSERY_DEBUG   If set to non-zero, will fill nursery with garbage,
                          to help debugging.
 
+ PYPY_GC_NURSERY_MAX     If set to more than PYPY_GC_NURSERY, the nursery
+                         size is adapted at runtime between the two values:
+                         it is doubled when more than 1/8th of it survives
+                         minor collections, and halved again when less than
+                         1/64th survives.  Default is '0' (fixed size).
+
  PYPY_GC_INCREMENT_STEP  The size of memory marked during the marking step.
                          Default is size of nursery * 2. If you mark it too high
                          your GC is not incremental at all. The minimum is set
                          to size that survives minor collection * 1.5 so we
                          reclaim anything all the time.
 
+ PYPY_GC_MAX_PAUSE       Target duration of a major collection step, in
+                         milliseconds (e.g. '5').  If set, the amount of
+                         work done by each marking and sweeping step is
+                         adapted at runtime to stay below this duration,
+                         and the next major collection starts earlier if
+                         the GC cannot keep up with the allocations.
+                         Steps taking longer are reported to the
+                         on_gc_collect_step hook.  Default is '0' (off).
+
+ PYPY_GC_FRAGMENTATION   If set (e.g. to '0.25'), after a major collection
+                         the free pages in arenas that are still partly
+                         used are returned to the OS when they amount to
+                         more than this fraction of the arena memory.
+                         Default is '0' (never).
+
  PYPY_GC_MAJOR_COLLECT   Major collection memory factor.  Default is '1.82',
                          which means trigger a major collection when the
                          memory consumed equals 1.82 times the memory
@@ -166,7 +187,18 @@ GCFLAG_SHADOW_INITIALIZED   = first_gcflag << 11
 # rpython.rtyper.rmodel
 GCFLAG_DUMMY        = first_gcflag << 12
 
-_GCFLAG_FIRST_UNUSED = first_gcflag << 13    # the first unused bit
+# The following flag is set by freeze() on all old objects alive at that
+# point.  These objects keep GCFLAG_VISITED forever and are never swept,
+# so that major collections don't write to the memory pages containing
+# them (see freeze()).
+GCFLAG_FROZEN       = first_gcflag << 13
+
+# Set on frozen objects that went through the write barrier after
+# freeze().  They are listed in 'frozen_modified_objects' and traced
+# again by every major collection.
+GCFLAG_FROZEN_MODIFIED = first_gcflag << 14
+
+_GCFLAG_FIRST_UNUSED = first_gcflag << 15    # the first unused bit
 
 flagnames_and_values = unroll.unrolling_iterable([
     (name, value) for name, value in globals().items()
@@ -292,6 +324,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
                  growth_rate_max=2.5,   # for tests
                  card_page_indices=0,
                  large_object=8*WORD,
+                 nursery_max_size=0,
+                 max_pause=0.0,
                  ArenaCollectionClass=None,
                  **kwds):
         "NOT_RPYTHON"
@@ -299,6 +333,19 @@ class IncrementalMiniMarkGC(MovingGCBase):
         assert small_request_threshold % WORD == 0
         self.read_from_env = read_from_env
         self.nursery_size = nursery_size
+        # if 'nursery_max_size' is larger than the initial nursery size,
+        # the nursery size is adapted after each minor collection;
+        # see adapt_nursery_size()
+        self.nursery_max_size = nursery_max_size
+        self.nursery_base_size = nursery_size
+        self.nursery_resizes = 0
+        self.nursery_surviving_size = 0
+        # if 'max_pause' is set (in seconds), the amount of work done by
+        # the major collection steps is adapted to it; see
+        # adapt_to_max_pause()
+        self.max_pause = max_pause
+        self.pause_misses = 0
+        self.pause_deficit = r_uint(0)
 
         self.small_request_threshold = small_request_threshold
         self.major_collection_threshold = major_collection_threshold
@@ -383,6 +430,12 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.old_rawmalloced_objects = self.AddressStack()
         self.raw_malloc_might_sweep = self.AddressStack()
         self.rawmalloced_total_size = r_uint(0)
+        #
+        # Objects frozen by freeze(): the raw-malloced ones, which are
+        # never swept, and the ones modified since, which must be traced
+        # again by every major collection.
+        self.frozen_rawmalloced_objects = self.AddressStack()
+        self.frozen_modified_objects = self.AddressStack()
         self.rawmalloced_peak_size = r_uint(0)
         self.total_gc_time = 0.0
 
@@ -446,6 +499,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
         if not self.read_from_env:
             self.allocate_nursery()
             self.gc_increment_step = self.nursery_size * 4
+            self.gc_sweep_step = self.nursery_size * 3
             self.gc_nursery_debug = False
         else:
             #
@@ -502,6 +556,15 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 self.gc_increment_step = gc_increment_step
             else:
                 self.gc_increment_step = newsize * 4
+            self.gc_sweep_step = newsize * 3
+            #
+            max_pause = env.read_float_from_env('PYPY_GC_MAX_PAUSE')
+            if max_pause > 0.0:
+                self.max_pause = max_pause / 1000.0
+            #
+            fragmentation = env.read_float_from_env('PYPY_GC_FRAGMENTATION')
+            if fragmentation > 0.0:
+                self.ac.release_fragmentation = fragmentation
             #
             nursery_debug = env.read_uint_from_env('PYPY_GC_NURSERY_DEBUG')
             if nursery_debug > 0:
@@ -511,6 +574,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
             self._minor_collection()    # to empty the nursery
             llarena.arena_free(self.nursery)
             self.nursery_size = newsize
+            #
+            nursery_max = env.read_from_env('PYPY_GC_NURSERY_MAX')
+            if nursery_max > newsize and self.debug_tiny_nursery < 0:
+                self.nursery_max_size = nursery_max & ~(WORD-1)
             self.allocate_nursery()
         #
         env_max_number_of_pinned_objects = os.environ.get('PYPY_GC_MAX_PINNED')
@@ -538,7 +605,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
 
     def _nursery_memory_size(self):
         extra = self.nonlarge_max + 1
-        return self.nursery_size + extra
+        size = self.nursery_size
+        if self.nursery_max_size > size:
+            size = self.nursery_max_size
+        return size + extra
 
     def _alloc_nursery(self):
         # the start of the nursery: we actually allocate a bit more for
@@ -553,6 +623,9 @@ class IncrementalMiniMarkGC(MovingGCBase):
     def allocate_nursery(self):
         debug_start("gc-set-nursery-size")
         debug_print("nursery size:", self.nursery_size)
+        if self.nursery_max_size > self.nursery_size:
+            debug_print("max nursery size:", self.nursery_max_size)
+        self.nursery_base_size = self.nursery_size
         self.nursery = self._alloc_nursery()
         # the current position in the nursery:
         self.nursery_free = self.nursery
@@ -803,8 +876,11 @@ class IncrementalMiniMarkGC(MovingGCBase):
             if self.gc_state == STATE_SCANNING:
                 self.major_collection_step()
         else:
-            # This does a complete minor and major collection.
+            # This does a complete minor and major collection, and
+            # returns the memory of the free pages to the OS.
             self.minor_and_major_collection()
+            if self.ac.pages_freed_since_release > 0:
+                self.ac.release_free_pages()
         self.rrc_invoke_callback()
 
     def collect_step(self):
@@ -821,6 +897,41 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.rrc_invoke_callback()
         return rgc._encode_states(old_state, self.gc_state)
 
+    def freeze(self):
+        """Do a full collection, then move all the surviving objects to
+        a permanent generation that is never collected.
+
+        This is meant for servers that fork worker processes after
+        loading the application.  The frozen objects keep GCFLAG_VISITED
+        forever: major collections in the children don't need to set or
+        reset any flag in their headers, and don't walk the pages that
+        contain them.  Nothing is allocated any more in these pages
+        either.  So the memory pages holding the frozen objects stay
+        shared with the parent process, instead of being copied by the
+        first major collection.
+        """
+        self.minor_and_major_collection()
+        ll_assert(self.gc_state == STATE_SCANNING, "freeze: bad gc_state")
+        debug_start("gc-freeze")
+        npages = self.ac.freeze_pages(self._freeze_arena_object)
+        #
+        oldlist = self.old_rawmalloced_objects
+        nrawobjects = oldlist.length()
+        while oldlist.non_empty():
+            obj = oldlist.pop()
+            self.header(obj).tid |= GCFLAG_VISITED | GCFLAG_FROZEN
+            self.frozen_rawmalloced_objects.append(obj)
+        #
+        debug_print("frozen arena pages:", npages)
+        debug_print("frozen raw-malloced objects:", nrawobjects)
+        debug_stop("gc-freeze")
+
+    def _freeze_arena_object(self, hdr):
+        size_gc_header = self.gcheaderbuilder.size_gc_header
+        obj = hdr + size_gc_header
+        self.header(obj).tid |= GCFLAG_VISITED | GCFLAG_FROZEN
+        return False     # never free it
+
     def minor_collection_with_major_progress(self, extrasize=0,
                                              force_enabled=False):
         """Do a minor collection.  Then, if the GC is enabled and there
@@ -844,6 +955,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # 'threshold_objects_made_old' by nursery_size/2.
 
         if self.gc_state != STATE_SCANNING or self.threshold_reached(extrasize):
+            start = time.time()
             self.major_collection_step(extrasize)
 
             # See documentation in major_collection_step() for target invariants
@@ -856,6 +968,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
                     # Note that target (A2) is tweaked by (*); see
                     # test_gc_set_max_heap_size in translator/c, test_newgc.py
 
+                if self.max_pause_reached(start, extrasize):
+                    break
                 self._minor_collection()
                 self.major_collection_step(extrasize)
 
@@ -1447,9 +1561,11 @@ class IncrementalMiniMarkGC(MovingGCBase):
     def _debug_check_object_scanning(self, obj):
         # This check is called before scanning starts.
         # Scanning is done in a single step.
-        # the GCFLAG_VISITED should not be set between collections
-        ll_assert(self.header(obj).tid & GCFLAG_VISITED == 0,
-                  "unexpected GCFLAG_VISITED")
+        # the GCFLAG_VISITED should not be set between collections,
+        # except on frozen objects which keep it forever
+        if self.header(obj).tid & GCFLAG_FROZEN == 0:
+            ll_assert(self.header(obj).tid & GCFLAG_VISITED == 0,
+                      "unexpected GCFLAG_VISITED")
 
         # All other invariants from the sweeping phase should still be
         # satisfied.
@@ -1672,7 +1788,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 # the whole array needs to be turned gray and rescanned if it's
                 # currently black, which happens at the end of
                 # collect_cardrefs_to_nursery
-                if self.gc_state == STATE_MARKING:
+                if (self.gc_state == STATE_MARKING or
+                        dest_hdr.tid & GCFLAG_FROZEN):
                     if dest_hdr.tid & GCFLAG_CARDS_SET == 0:
                         self.old_objects_with_cards_set.append(dest_addr)
                         dest_hdr.tid |= GCFLAG_CARDS_SET
@@ -1687,8 +1804,11 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # NB: if we are marking, we must not inspect the state of the
         # GCFLAG_TRACK_YOUNG_PTRS of source_addr here, because in the marking
         # phase we rely on the write barrier to also turn black objects back
-        # into gray ones. see also the end of collect_cardrefs_to_nursery
-        if source_hdr.tid & GCFLAG_TRACK_YOUNG_PTRS == 0 or self.gc_state == STATE_MARKING:
+        # into gray ones. see also the end of collect_cardrefs_to_nursery.
+        # Frozen objects need the same, see _record_frozen_modified().
+        if (source_hdr.tid & GCFLAG_TRACK_YOUNG_PTRS == 0 or
+                self.gc_state == STATE_MARKING or
+                dest_hdr.tid & GCFLAG_FROZEN):
             # there might be in source a pointer to a young object
             self._remember_young_pointer_inlined(dest_addr)
         #
@@ -1768,6 +1888,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
         #
         start = time.time()
         debug_start("gc-minor")
+        if self.nursery_free:
+            nursery_used = self.nursery_free - self.nursery
+        else:
+            nursery_used = self.nursery_size  # from collect_and_reserve()
         #
         # All nursery barriers are invalid from this point on.  They
         # are evaluated anew as part of the minor collection.
@@ -1937,6 +2061,12 @@ class IncrementalMiniMarkGC(MovingGCBase):
         else:
             llarena.arena_reset(prev, self.nursery + self.nursery_size - prev, 0)
         #
+        # if there are no pinned objects left, the nursery is now completely
+        # empty and we can change its size
+        if (self.nursery_max_size > self.nursery_base_size and
+                not nursery_barriers.non_empty()):
+            self.adapt_nursery_size(nursery_used)
+        #
         # always add the end of the nursery to the list
         nursery_barriers.append(self.nursery + self.nursery_size)
         #
@@ -1973,6 +2103,31 @@ class IncrementalMiniMarkGC(MovingGCBase):
             total_memory_used=total_memory_used,
             pinned_objects=self.pinned_objects_in_nursery)
 
+    def adapt_nursery_size(self, nursery_used):
+        # Called at the end of a minor collection, when the nursery is
+        # empty.  The memory for the nursery was allocated for the
+        # 'nursery_max_size' and the part past the current size is
+        # always zero, so we only need to change 'nursery_size'.  If many
+        # objects survive, a larger nursery gives them more time to die;
+        # if very few survive, a smaller nursery is more cache-friendly.
+        # Minor collections done while the nursery was mostly empty (e.g.
+        # from collect() or from a large external malloc) are ignored.
+        if nursery_used < self.nursery_size // 2:
+            return
+        surviving = self.nursery_surviving_size
+        newsize = self.nursery_size
+        if surviving > nursery_used // 8:
+            newsize = min(self.nursery_size * 2, self.nursery_max_size)
+        elif surviving < nursery_used // 64:
+            newsize = max(self.nursery_size // 2, self.nursery_base_size)
+        if newsize != self.nursery_size:
+            debug_start("gc-set-nursery-size")
+            debug_print("surviving size:", surviving)
+            debug_print("nursery size:", self.nursery_size, "=>", newsize)
+            debug_stop("gc-set-nursery-size")
+            self.nursery_size = newsize
+            self.nursery_resizes += 1
+
     def _reset_flag_old_objects_pointing_to_pinned(self, obj, ignore):
         ll_assert(self.header(obj).tid & GCFLAG_PINNED_OBJECT_PARENT_KNOWN != 0,
                   "!GCFLAG_PINNED_OBJECT_PARENT_KNOWN, but requested to reset.")
@@ -2011,6 +2166,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
         oldlist = self.old_objects_with_cards_set
         while oldlist.non_empty():
             obj = oldlist.pop()
+            self._record_frozen_modified(obj)
             #
             # Remove the GCFLAG_CARDS_SET flag.
             ll_assert(self.header(obj).tid & GCFLAG_HAS_CARDS != 0,
@@ -2089,6 +2245,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
         oldlist = self.old_objects_pointing_to_young
         while oldlist.non_empty():
             obj = oldlist.pop()
+            self._record_frozen_modified(obj)
             #
             # Check that the flags are correct: we must not have
             # GCFLAG_TRACK_YOUNG_PTRS so far.
@@ -2105,6 +2262,16 @@ class IncrementalMiniMarkGC(MovingGCBase):
             # and adding them to 'old_objects_pointing_to_young' as well.
             self.trace_and_drag_out_of_nursery(obj)
 
+    def _record_frozen_modified(self, obj):
+        # A frozen object was written to.  It keeps GCFLAG_VISITED, so
+        # major collections would not trace it any more and could free
+        # the objects it now references.  Remember it, so that every
+        # major collection traces it again from collect_roots().
+        tid = self.header(obj).tid
+        if tid & (GCFLAG_FROZEN | GCFLAG_FROZEN_MODIFIED) == GCFLAG_FROZEN:
+            self.header(obj).tid = tid | GCFLAG_FROZEN_MODIFIED
+            self.frozen_modified_objects.append(obj)
+
     def trace_and_drag_out_of_nursery(self, obj):
         """obj must not be in the nursery.  This copies all the
         young objects it references out of the nursery.
@@ -2464,11 +2631,18 @@ class IncrementalMiniMarkGC(MovingGCBase):
                     # there are more objects added during the marking steps
                     # of this major collection.  Visit them all now.
                     # The idea is to ensure termination at the cost of some
-                    # incrementality, in theory.
+                    # incrementality, in theory.  With PYPY_GC_MAX_PAUSE,
+                    # only go on while the step is below the target
+                    # duration; the next steps will visit the rest.
                     swap = self.objects_to_trace
                     self.objects_to_trace = self.more_objects_to_trace
                     self.more_objects_to_trace = swap
-                    self.visit_all_objects()
+                    if self.max_pause > 0.0:
+                        while (self.objects_to_trace.non_empty() and
+                               time.time() - start < self.max_pause):
+                            self.visit_all_objects_step(estimate)
+                    else:
+                        self.visit_all_objects()
 
             # XXX A simplifying assumption that should be checked,
             # finalizers/weak references are rare and short which means that
@@ -2534,13 +2708,17 @@ class IncrementalMiniMarkGC(MovingGCBase):
             #END MARKING
         elif self.gc_state == STATE_SWEEPING:
             #
+            if self.max_pause > 0.0:
+                sweep_step = self.gc_sweep_step
+            else:
+                sweep_step = 3 * self.nursery_size
             if self.raw_malloc_might_sweep.non_empty():
                 # Walk all rawmalloced objects and free the ones that don't
                 # have the GCFLAG_VISITED flag.  Visit at most 'limit' objects.
                 # This limit is conservatively high enough to guarantee that
-                # a total object size of at least '3 * nursery_size' bytes
-                # is processed.
-                limit = 3 * self.nursery_size // self.small_request_threshold
+                # a total object size of at least 'sweep_step' bytes
+                # (3 * nursery_size by default) is processed.
+                limit = sweep_step // self.small_request_threshold
                 nobjects = self.free_unvisited_rawmalloc_objects_step(limit)
                 debug_print("freeing raw objects:", limit-nobjects,
                             "freed, limit was", limit)
@@ -2548,9 +2726,9 @@ class IncrementalMiniMarkGC(MovingGCBase):
             else:
                 # Ask the ArenaCollection to visit a fraction of the objects.
                 # Free the ones that have not been visited above, and reset
-                # GCFLAG_VISITED on the others.  Visit at most '3 *
-                # nursery_size' bytes.
-                limit = 3 * self.nursery_size // self.ac.page_size
+                # GCFLAG_VISITED on the others.  Visit at most 'sweep_step'
+                # bytes.
+                limit = sweep_step // self.ac.page_size
                 done = self.ac.mass_free_incremental(self._free_if_unvisited,
                                                      limit)
                 status = done and "No more pages left." or "More to do."
@@ -2571,10 +2749,19 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 total_memory_used -= float(self.kept_alive_by_finalizer)
                 if total_memory_used < 0:
                     total_memory_used = 0
-                bounded = self.set_major_threshold_from(
-                    min(total_memory_used * self.major_collection_threshold,
-                        total_memory_used + self.max_delta),
-                    reserving_size)
+                threshold = min(
+                    total_memory_used * self.major_collection_threshold,
+                    total_memory_used + self.max_delta)
+                if self.pause_deficit > 0:
+                    # with PYPY_GC_MAX_PAUSE, this major collection was
+                    # lagging behind the allocations: start the next one
+                    # earlier, but keep at least half of the usual margin
+                    debug_print("max pause deficit:", self.pause_deficit)
+                    threshold = max(threshold - float(self.pause_deficit),
+                                    (threshold + total_memory_used) * 0.5)
+                    self.pause_deficit = r_uint(0)
+                bounded = self.set_major_threshold_from(threshold,
+                                                        reserving_size)
                 #
                 # Print statistics
                 debug_start("gc-collect-done")
@@ -2637,12 +2824,64 @@ class IncrementalMiniMarkGC(MovingGCBase):
         duration = time.time() - start
         self.total_gc_time += duration
         debug_print("time taken: ", duration)
+        if self.max_pause > 0.0:
+            self.adapt_to_max_pause(duration, oldstate)
         debug_stop("gc-collect-step")
         self.hooks.fire_gc_collect_step(
             duration=duration,
             oldstate=oldstate,
             newstate=self.gc_state)
 
+    def adapt_to_max_pause(self, duration, oldstate):
+        # With PYPY_GC_MAX_PAUSE, 'gc_increment_step' and 'gc_sweep_step'
+        # are budgets that we adjust after every step: they are shrunk in
+        # proportion if the step took too long, and grown slowly if it
+        # took less than half of the target.  The other states are not
+        # incremental, but we still report them if they miss the target.
+        if duration > self.max_pause:
+            self.pause_misses += 1
+            debug_print("max pause missed:", self.max_pause)
+            self.hooks.fire_gc_pause_miss(duration, self.max_pause, oldstate)
+            factor = 0.9 * self.max_pause / duration
+        elif duration < self.max_pause * 0.5:
+            factor = 1.25
+        else:
+            return
+        minimum = 4 * self.ac.page_size
+        maximum = 64 * self.nursery_size
+        if oldstate == STATE_MARKING:
+            step = int(float(self.gc_increment_step) * factor)
+            step = min(max(step, minimum), maximum)
+            self.gc_increment_step = r_uint(step)
+        elif oldstate == STATE_SWEEPING:
+            step = int(float(self.gc_sweep_step) * factor)
+            self.gc_sweep_step = min(max(step, minimum), maximum)
+
+    def max_pause_reached(self, start, extrasize):
+        # With PYPY_GC_MAX_PAUSE, stop doing extra major collection steps
+        # after a minor collection when the target duration is reached,
+        # even though the major collection is lagging behind the
+        # allocations (target (A2) in major_collection_step()) --- but
+        # only by less than one nursery: past that, we go on with the
+        # steps as usual, so that the lag cannot grow without bounds.
+        # It is recorded in 'pause_deficit' and the next major collection
+        # starts earlier to compensate.  Not done either when we are
+        # getting close to PYPY_GC_MAX.
+        if self.max_pause == 0.0 or time.time() - start < self.max_pause:
+            return False
+        if self.max_heap_size > 0.0:
+            total = float(self.get_total_memory_used()) + float(extrasize)
+            if total >= self.max_heap_size * 0.9:
+                return False
+        made_old = self.size_objects_made_old + r_uint(extrasize)
+        if made_old > self.threshold_objects_made_old:
+            deficit = made_old - self.threshold_objects_made_old
+            if deficit > r_uint(self.nursery_size):
+                return False
+            if deficit > self.pause_deficit:
+                self.pause_deficit = deficit
+        return True
+
     def _sweep_old_objects_pointing_to_pinned(self, obj, new_list):
         if self.header(obj).tid & GCFLAG_VISITED:
             new_list.append(obj)
@@ -2682,6 +2921,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 arena -= extra_words * WORD
                 allocsize += extra_words * WORD
             #
+            if allocsize >= self.ac.arena_size:
+                # a large block: make sure that its memory is returned to
+                # the OS, even if free() would keep it for reuse
+                llarena.arena_reset(arena, allocsize, 4)
             llarena.arena_free(arena)
             self.rawmalloced_total_size -= r_uint(allocsize)
 
@@ -2720,6 +2963,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # Collect all roots.  Starts from the non-stack roots.
         self.collect_nonstack_roots()
         #
+        # The frozen objects modified since freeze() are roots too.
+        self.frozen_modified_objects.foreach(
+            self._add_to_objects_to_trace_again, None)
+        #
         # Add the stack roots.
         self.root_walker.walk_roots(
             IncrementalMiniMarkGC._collect_ref_stk, # stack roots
@@ -2736,6 +2983,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.old_objects_with_finalizers.foreach(callback, arg, 2)
     enum_live_with_finalizers._annspecialcase_ = 'specialize:arg(1)'
 
+    def _add_to_objects_to_trace_again(self, obj, ignored):
+        self.header(obj).tid &= ~GCFLAG_VISITED
+        self.objects_to_trace.append(obj)
+
     def _collect_obj(self, obj, ignored):
         # Ignore pinned objects, which are the ones still in the nursery here.
         # Cache effects: don't read any flag out of 'obj' at this point.
@@ -3128,6 +3379,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
     def get_stats(self, stats_no):
         from rpython.memory.gc import inspector
 
+        size_class = stats_no >> rgc.SIZE_CLASS_SHIFT
+        if size_class > 0:
+            stats_no &= (1 << rgc.SIZE_CLASS_SHIFT) - 1
+            return self.get_size_class_stats(stats_no, size_class)
         if stats_no == rgc.TOTAL_MEMORY:
             return intmask(self.get_total_memory_used() + self.nursery_size)
         elif stats_no == rgc.PEAK_MEMORY:
@@ -3149,8 +3404,31 @@ class IncrementalMiniMarkGC(MovingGCBase):
                                self.ac.total_memory_used))
         elif stats_no == rgc.NURSERY_SIZE:
             return intmask(self.nursery_size)
+        elif stats_no == rgc.NURSERY_SURVIVING_SIZE:
+            return intmask(self.nursery_surviving_size)
+        elif stats_no == rgc.NURSERY_RESIZES:
+            return self.nursery_resizes
         elif stats_no == rgc.TOTAL_GC_TIME:
             return int(self.total_gc_time * 1000)
+        elif stats_no == rgc.ARENA_FREE_PAGES_MEMORY:
+            return self.ac.count_free_pages() * self.ac.page_size
+        elif stats_no == rgc.NUM_SIZE_CLASSES:
+            return self.small_request_threshold // WORD + 1
+        return 0
+
+    def get_size_class_stats(self, stats_no, size_class):
+        if size_class > self.small_request_threshold // WORD:
+            return 0
+        block_size = size_class * WORD
+        if stats_no == rgc.SIZE_CLASS_BLOCK_SIZE:
+            return block_size
+        elif stats_no == rgc.SIZE_CLASS_PAGES:
+            return self.ac.pages_for_size[size_class]
+        elif stats_no == rgc.SIZE_CLASS_USED_MEMORY:
+            return self.ac.count_used_blocks(size_class) * block_size
+        elif stats_no == rgc.SIZE_CLASS_CAPACITY:
+            return (self.ac.pages_for_size[size_class] *
+                    self.ac.nblocks_for_size[size_class] * block_size)
         return 0
 
 
@@ -3,6 +3,7 @@ from rpython.rtyper.lltypesystem import lltype, llmemory, llarena, rffi
 from rpython.rlib.rarithmetic import LONG_BIT, r_uint
 from rpython.rlib.objectmodel import we_are_translated
 from rpython.rlib.debug import ll_assert, fatalerror
+from rpython.rlib.debug import debug_start, debug_stop, debug_print
 
 WORD = LONG_BIT // 8
 NULL = llmemory.NULL
@@ -16,6 +17,7 @@ assert 1 << WORD_POWER_2 == WORD
 # into pages.  For each arena we allocate one of the following structures:
 
 ARENA_PTR = lltype.Ptr(lltype.ForwardReference())
+ADDRESS_ARRAY = rffi.CArray(llmemory.Address)
 ARENA = lltype.Struct('ArenaReference',
     # -- The address of the arena, as returned by malloc()
     ('base', llmemory.Address),
@@ -24,6 +26,11 @@ ARENA = lltype.Struct('ArenaReference',
     ('totalpages', lltype.Signed),
     # -- A chained list of free pages in the arena.  Ends with NULL.
     ('freepages', llmemory.Address),
+    # -- The free pages whose memory was returned to the OS, which are
+    #    not in 'freepages' but counted in 'nfreepages'.  The array is
+    #    only allocated by the first release_free_pages().
+    ('releasedpages', lltype.Ptr(ADDRESS_ARRAY)),
+    ('nreleasedpages', lltype.Signed),
     # -- A linked list of arenas.  See below.
     ('nextarena', ARENA_PTR),
     )
@@ -39,6 +46,16 @@ ARENA_NULL = lltype.nullptr(ARENA)
 # arenas that have 'nfreepages == i'.  We allocate pages out of the
 # arena in 'current_arena'; when it is exhausted we pick another arena
 # with the smallest value for nfreepages (but > 0).
+#
+# Objects are never moved, so a single surviving object keeps its whole
+# page, and a single used page keeps its whole arena.  We use two tricks
+# to limit the resulting fragmentation.  First, mass_free() puts the
+# pages that are mostly empty at the end of the chained list of their
+# size class, so that new objects go preferably to the fuller pages and
+# the mostly-empty pages have a chance to become entirely free.  Second,
+# if 'release_fragmentation' is set and the free pages of arenas still
+# in use exceed this fraction of the total, the memory of these pages is
+# returned to the OS with madvise() at the end of mass_free().
 
 # ____________________________________________________________
 #
@@ -107,6 +124,11 @@ class ArenaCollection(object):
         self.nblocks_for_size = lltype.malloc(rffi.CArray(lltype.Signed),
                                               length, flavor='raw',
                                               immortal=True)
+        # statistics: the number of pages for each size class.  The
+        # number of allocated blocks is computed by count_used_blocks().
+        self.pages_for_size = lltype.malloc(rffi.CArray(lltype.Signed),
+                                            length, flavor='raw', zero=True,
+                                            immortal=True)
         self.hdrsize = llmemory.raw_malloc_usage(llmemory.sizeof(PAGE_HEADER))
         assert page_size > self.hdrsize
         self.nblocks_for_size[0] = 0    # unused
@@ -143,6 +165,11 @@ class ArenaCollection(object):
         self.peak_memory_used = r_uint(0)
         self.total_memory_alloced = r_uint(0)
         self.peak_memory_alloced = r_uint(0)
+        #
+        # see release_free_pages()
+        self.release_fragmentation = 0.0
+        self.total_free_pages = 0
+        self.pages_freed_since_release = 0
 
 
     def _new_page_ptr_list(self, length):
@@ -204,7 +231,7 @@ class ArenaCollection(object):
         # The result is simply 'current_arena.freepages'.
         arena = self.current_arena
         result = arena.freepages
-        if arena.nfreepages > 0:
+        if arena.nfreepages > arena.nreleasedpages:
             #
             # The 'result' was part of the chained list; read the next.
             arena.nfreepages -= 1
@@ -213,6 +240,13 @@ class ArenaCollection(object):
                                 llmemory.sizeof(llmemory.Address),
                                 0)
             #
+        elif arena.nreleasedpages > 0:
+            # The 'result' is a page released by release_free_pages().
+            arena.nfreepages -= 1
+            arena.nreleasedpages -= 1
+            freepages = result
+            result = arena.releasedpages[arena.nreleasedpages]
+            #
         else:
             # The 'result' is part of the uninitialized pages.
             ll_assert(self.num_uninitialized_pages > 0,
@@ -224,7 +258,7 @@ class ArenaCollection(object):
                 freepages = NULL
         #
         arena.freepages = freepages
-        if freepages == NULL:
+        if freepages == NULL and arena.nreleasedpages == 0:
             # This was the last page, so put the arena away into
             # arenas_lists[0].
             ll_assert(arena.nfreepages == 0, 
@@ -243,6 +277,7 @@ class ArenaCollection(object):
         ll_assert(self.page_for_size[size_class] == PAGE_NULL,
                   "allocate_new_page() called but a page is already waiting")
         self.page_for_size[size_class] = page
+        self.pages_for_size[size_class] += 1
         return page
 
 
@@ -316,6 +351,8 @@ class ArenaCollection(object):
         arena.nfreepages = 0        # they are all uninitialized pages
         arena.totalpages = npages
         arena.freepages = firstpage
+        arena.releasedpages = lltype.nullptr(ADDRESS_ARRAY)
+        arena.nreleasedpages = 0
         self.num_uninitialized_pages = npages
         self.current_arena = arena
         self.arenas_count += 1
@@ -369,6 +406,8 @@ class ArenaCollection(object):
         if size_class >= 0:
             self._rehash_arenas_lists()
             self.size_class_with_old_pages = -1
+            if self.release_fragmentation > 0.0:
+                self._maybe_release_free_pages()
         #
         return True
 
@@ -383,6 +422,35 @@ class ArenaCollection(object):
         ll_assert(res, "non-incremental mass_free_in_pages() returned False")
 
 
+    def freeze_pages(self, freeze_func):
+        """Call freeze_func(obj) on every object, then forget about all
+        the pages in use: nothing will be allocated or freed in them any
+        more.  'freeze_func' must return False.  Returns the number of
+        pages frozen.  Must not be called during mass_free_incremental().
+        """
+        npages = 0
+        size_class = self.small_request_threshold >> WORD_POWER_2
+        while size_class >= 1:
+            block_size = size_class << WORD_POWER_2
+            npages += self._freeze_page_list(self.page_for_size[size_class],
+                                             block_size, freeze_func)
+            npages += self._freeze_page_list(
+                self.full_page_for_size[size_class], block_size, freeze_func)
+            self.page_for_size[size_class] = PAGE_NULL
+            self.full_page_for_size[size_class] = PAGE_NULL
+            size_class -= 1
+        return npages
+
+    def _freeze_page_list(self, page, block_size, freeze_func):
+        npages = 0
+        while page != PAGE_NULL:
+            surviving = self.walk_page(page, block_size, freeze_func)
+            ll_assert(surviving > 0, "freeze_pages(): empty page")
+            page = page.nextpage
+            npages += 1
+        return npages
+
+
     def _rehash_arenas_lists(self):
         #
         # Rehash arenas into the correct arenas_lists[i].  If
@@ -395,6 +463,11 @@ class ArenaCollection(object):
             self.arenas_lists[i] = ARENA_NULL
             i += 1
         #
+        # 'total_free_pages' doesn't count the pages already released
+        total_free_pages = 0
+        if self.current_arena != ARENA_NULL:
+            total_free_pages = (self.current_arena.nfreepages -
+                                self.current_arena.nreleasedpages)
         i = 0
         while i < self.max_pages_per_arena:
             arena = self.old_arenas_lists[i]
@@ -407,6 +480,9 @@ class ArenaCollection(object):
                     llarena.arena_reset(arena.base, self.arena_size, 4)
                     llarena.arena_free(arena.base)
                     self.total_memory_alloced -= self.arena_size
+                    if arena.releasedpages:
+                        lltype.free(arena.releasedpages, flavor='raw',
+                                    track_allocation=False)
                     lltype.free(arena, flavor='raw', track_allocation=False)
                     self.arenas_count -= 1
                     #
@@ -417,11 +493,118 @@ class ArenaCollection(object):
                              "totalpages != nfreepages >= max_pages_per_arena")
                     arena.nextarena = self.arenas_lists[n]
                     self.arenas_lists[n] = arena
+                    total_free_pages += n - arena.nreleasedpages
                 #
                 arena = nextarena
             i += 1
         #
         self.min_empty_nfreepages = 1
+        self.total_free_pages = total_free_pages
+
+
+    def _maybe_release_free_pages(self):
+        if self.pages_freed_since_release == 0:
+            return      # nothing new since the last call
+        free_size = float(self.total_free_pages * self.page_size)
+        limit = self.release_fragmentation * float(self.total_memory_alloced)
+        if free_size > limit:
+            self.release_free_pages()
+
+
+    def release_free_pages(self):
+        """Return to the OS the memory of the free pages of all the arenas
+        still in use, apart from the ones already released by a previous
+        call.  Returns the number of pages released now.
+        """
+        debug_start("gc-release-pages")
+        count = 0
+        if self.current_arena != ARENA_NULL:
+            count += self._release_free_pages_of(self.current_arena)
+        i = 1
+        while i < self.max_pages_per_arena:
+            arena = self.arenas_lists[i]
+            while arena != ARENA_NULL:
+                count += self._release_free_pages_of(arena)
+                arena = arena.nextarena
+            i += 1
+        self.pages_freed_since_release = 0
+        debug_print("released", count, "free pages of", self.page_size,
+                    "bytes")
+        debug_stop("gc-release-pages")
+        return count
+
+
+    def count_free_pages(self):
+        """Return the number of free pages in the arenas still in use."""
+        count = 0
+        if self.current_arena != ARENA_NULL:
+            count = self.current_arena.nfreepages
+        i = 1
+        while i < self.max_pages_per_arena:
+            arena = self.arenas_lists[i]
+            while arena != ARENA_NULL:
+                count += arena.nfreepages
+                arena = arena.nextarena
+            i += 1
+        return count
+
+
+    def count_used_blocks(self, size_class):
+        """Return the number of allocated blocks of the given size class.
+        Walks all the pages of that size class: only for statistics."""
+        return (self._count_used_blocks_in(self.page_for_size[size_class],
+                                           size_class) +
+                self._count_used_blocks_in(
+                    self.full_page_for_size[size_class], size_class) +
+                self._count_used_blocks_in(
+                    self.old_page_for_size[size_class], size_class) +
+                self._count_used_blocks_in(
+                    self.old_full_page_for_size[size_class], size_class))
+
+    def _count_used_blocks_in(self, page, size_class):
+        block_size = size_class * WORD
+        count = 0
+        while page != PAGE_NULL:
+            # the blocks before the first uninitialized one are either
+            # allocated or in the chained list of 'nfree' free blocks
+            freeblock = page.freeblock
+            i = page.nfree
+            while i > 0:
+                freeblock = freeblock.address[0]
+                i -= 1
+            pageaddr = llarena.getfakearenaaddress(
+                llmemory.cast_ptr_to_adr(page))
+            num_initialized_blocks = (
+                (freeblock - pageaddr - self.hdrsize) // block_size)
+            count += num_initialized_blocks - page.nfree
+            page = page.nextpage
+        return count
+
+
+    def _release_free_pages_of(self, arena):
+        # Move the pages of the chained list 'freepages' to the array
+        # 'releasedpages', and release them.  As the chained list is
+        # stored in the pages themselves, this is needed for madvise() to
+        # cover them entirely: it only releases whole pages of the OS.
+        count = arena.nfreepages - arena.nreleasedpages
+        if count == 0:
+            return 0
+        if not arena.releasedpages:
+            arena.releasedpages = lltype.malloc(ADDRESS_ARRAY,
+                                                arena.totalpages,
+                                                flavor='raw',
+                                                track_allocation=False)
+        pageaddr = arena.freepages
+        i = count
+        while i > 0:
+            nextpage = pageaddr.address[0]
+            llarena.arena_reset(pageaddr, self.page_size, 4)
+            arena.releasedpages[arena.nreleasedpages] = pageaddr
+            arena.nreleasedpages += 1
+            pageaddr = nextpage
+            i -= 1
+        arena.freepages = pageaddr
+        return count
 
 
     def mass_free_in_pages(self, size_class, ok_to_free_func, max_pages):
@@ -430,6 +613,15 @@ class ArenaCollection(object):
         remaining_partial_pages = self.page_for_size[size_class]
         remaining_full_pages = self.full_page_for_size[size_class]
         #
+        # The partial pages with at least 1/4th of their blocks used are
+        # put in front of the ones that are mostly empty.  'dense_pages'
+        # and 'sparse_pages' are built by inserting at the head, so their
+        # tails are the first pages that we insert.
+        dense_pages = PAGE_NULL
+        dense_tail = PAGE_NULL
+        sparse_pages = PAGE_NULL
+        sparse_tail = PAGE_NULL
+        #
         step = 0
         while step < 2:
             if step == 0:
@@ -454,16 +646,28 @@ class ArenaCollection(object):
                     page.nextpage = remaining_full_pages
                     remaining_full_pages = page
                     #
+                elif surviving * 4 >= nblocks:
+                    #
+                    # At least 1/4th of the objects are surviving.
+                    # Re-insert the page in the 'dense_pages' chained list.
+                    if dense_pages == PAGE_NULL:
+                        dense_tail = page
+                    page.nextpage = dense_pages
+                    dense_pages = page
+                    #
                 elif surviving > 0:
                     #
                     # There is at least 1 object surviving.  Re-insert
-                    # the page in the 'remaining_partial_pages' chained list.
-                    page.nextpage = remaining_partial_pages
-                    remaining_partial_pages = page
+                    # the page in the 'sparse_pages' chained list.
+                    if sparse_pages == PAGE_NULL:
+                        sparse_tail = page
+                    page.nextpage = sparse_pages
+                    sparse_pages = page
                     #
                 else:
                     # No object survives; free the page.
                     self.free_page(page)
+                    self.pages_for_size[size_class] -= 1
 
                 #
                 max_pages -= 1
@@ -482,6 +686,14 @@ class ArenaCollection(object):
             else:
                 step += 1
         #
+        # The final order is: 'dense_pages', 'sparse_pages', and then the
+        # pages allocated since mass_free_prepare()
+        if sparse_pages != PAGE_NULL:
+            sparse_tail.nextpage = remaining_partial_pages
+            remaining_partial_pages = sparse_pages
+        if dense_pages != PAGE_NULL:
+            dense_tail.nextpage = remaining_partial_pages
+            remaining_partial_pages = dense_pages
         self.page_for_size[size_class] = remaining_partial_pages
         self.full_page_for_size[size_class] = remaining_full_pages
         return max_pages
@@ -495,6 +707,7 @@ class ArenaCollection(object):
         # end of mass_free().
         arena = page.arena
         arena.nfreepages += 1
+        self.pages_freed_since_release += 1
         pageaddr = llmemory.cast_ptr_to_adr(page)
         pageaddr = llarena.getfakearenaaddress(pageaddr)
         llarena.arena_reset(pageaddr, self.page_size, 0)
@@ -21,6 +21,9 @@ class SimpleArenaCollection(object):
         self.all_objects = []
         self.total_memory_used = 0
         self.arenas_count = 0
+        self.pages_freed_since_release = 0
+        self.frozen_objects = []
+        self.frozen_memory_used = 0
 
     def malloc(self, size):
         nsize = raw_malloc_usage(size)
@@ -37,7 +40,7 @@ class SimpleArenaCollection(object):
     def mass_free_prepare(self):
         self.old_all_objects = self.all_objects
         self.all_objects = []
-        self.total_memory_used = 0
+        self.total_memory_used = self.frozen_memory_used
 
     def mass_free_incremental(self, ok_to_free_func, max_pages):
         old = self.old_all_objects
@@ -57,3 +60,12 @@ class SimpleArenaCollection(object):
         self.mass_free_prepare()
         res = self.mass_free_incremental(ok_to_free_func, sys.maxint)
         assert res
+
+    def freeze_pages(self, freeze_func):
+        for rawobj, nsize in self.all_objects:
+            res = freeze_func(rawobj)
+            assert not res
+            self.frozen_objects.append((rawobj, nsize))
+            self.frozen_memory_used += nsize
+        self.all_objects = []
+        return len(self.frozen_objects)
@@ -829,7 +829,8 @@ class TestIncrementalMiniMarkGCFull(DirectGCTest):
         debuglog.reset()
         self.gc.collect() # finish the major collection
         summary = debuglog.summary()
-        assert sorted(debuglog.summary()) == ['gc-collect-step', 'gc-minor']
+        assert sorted(debuglog.summary()) == ['gc-collect-step', 'gc-minor',
+                                              'gc-release-pages']
         # s is freed
         py.test.raises(RuntimeError, 's.x')
 
@@ -1018,6 +1019,149 @@ class TestIncrementalMiniMarkGCFull(DirectGCTest):
         # _debug_check_object_scanning, called on the shadow
         self.gc.collect()
 
+    def test_adaptive_nursery_size(self):
+        base = self.gc.nursery_size
+        # everything survives: the nursery grows up to the max
+        for i in range(200):
+            self.stackroots.append(self.malloc(S))
+        assert self.gc.nursery_size == 4 * base
+        assert self.gc.get_stats(rgc.NURSERY_RESIZES) == 2
+        # nothing survives: the nursery shrinks back to its initial size
+        del self.stackroots[:]
+        for i in range(200):
+            self.malloc(S)
+        assert self.gc.nursery_size == base
+        assert self.gc.get_stats(rgc.NURSERY_RESIZES) == 4
+        assert self.gc.get_stats(rgc.NURSERY_SURVIVING_SIZE) == 0
+    test_adaptive_nursery_size.GC_PARAMS = {'nursery_max_size': 128*WORD}
+
+    def test_adaptive_nursery_size_not_with_pinned(self):
+        base = self.gc.nursery_size
+        s = self.malloc(STR, 1)
+        self.stackroots.append(s)
+        assert self.gc.pin(llmemory.cast_ptr_to_adr(s))
+        for i in range(200):
+            self.stackroots.append(self.malloc(S))
+        assert self.gc.nursery_size == base
+        assert self.gc.nursery_resizes == 0
+        self.gc.unpin(llmemory.cast_ptr_to_adr(s))
+    test_adaptive_nursery_size_not_with_pinned.GC_PARAMS = {
+        'nursery_max_size': 128*WORD}
+
+    def test_size_class_stats(self):
+        from rpython.rlib import rgc
+        size = llmemory.raw_malloc_usage(llmemory.sizeof(S) +
+                                         self.gc.gcheaderbuilder.size_gc_header)
+        size_class = size // WORD
+        def get_stats(stat_no):
+            return self.gc.get_stats(rgc.size_class_stat(stat_no, size_class))
+        assert get_stats(rgc.SIZE_CLASS_BLOCK_SIZE) == size
+        assert get_stats(rgc.SIZE_CLASS_PAGES) == 0
+        for i in range(20):
+            self.stackroots.append(self.malloc(S))
+        self.gc.collect()
+        assert get_stats(rgc.SIZE_CLASS_USED_MEMORY) == 20 * size
+        pages = get_stats(rgc.SIZE_CLASS_PAGES)
+        assert pages > 1
+        assert get_stats(rgc.SIZE_CLASS_CAPACITY) >= 20 * size
+        assert self.gc.get_stats(rgc.ARENA_FREE_PAGES_MEMORY) == 0
+        #
+        del self.stackroots[:]
+        self.gc.collect()
+        assert get_stats(rgc.SIZE_CLASS_USED_MEMORY) == 0
+        assert get_stats(rgc.SIZE_CLASS_PAGES) == 0
+        # empty arenas are freed, and the free pages of the other arenas
+        # are released by collect()
+        free_memory = self.gc.get_stats(rgc.ARENA_FREE_PAGES_MEMORY)
+        assert free_memory <= pages * self.gc.ac.page_size
+        assert self.gc.ac.pages_freed_since_release == 0
+
+    def test_max_pause(self):
+        self.stackroots.append(self.malloc(S))
+        for i in range(100):
+            s = self.malloc(S)
+            self.write(s, 'next', self.stackroots[0])
+            self.stackroots[0] = s
+        self.gc.pause_misses = 0
+        for i in range(10):
+            self.gc.collect()
+        # every step misses the target, so the budgets are at the minimum
+        assert self.gc.pause_misses >= 40
+        minimum = 4 * self.gc.ac.page_size
+        assert self.gc.gc_increment_step == minimum
+        assert self.gc.gc_sweep_step == minimum
+        # all objects are still alive
+        s = self.stackroots[0]
+        for i in range(100):
+            s = s.next
+        assert s
+    test_max_pause.GC_PARAMS = {'max_pause': 1e-9}
+
+    def test_max_pause_reached(self):
+        from rpython.rlib.rarithmetic import r_uint
+        import time
+        start = time.time()
+        assert not self.gc.max_pause_reached(start - 1.0, 0)   # disabled
+        self.gc.max_pause = 0.005
+        assert not self.gc.max_pause_reached(start, 0)
+        nursery_size = self.gc.nursery_size
+        self.gc.threshold_objects_made_old = r_uint(100)
+        self.gc.size_objects_made_old = r_uint(100 + nursery_size // 2)
+        assert self.gc.max_pause_reached(start - 1.0, 0)
+        assert self.gc.pause_deficit == nursery_size // 2
+        # but not if the major collection lags behind by more than that
+        assert not self.gc.max_pause_reached(start - 1.0, nursery_size)
+        self.gc.size_objects_made_old = r_uint(101 + nursery_size)
+        assert not self.gc.max_pause_reached(start - 1.0, 0)
+        assert self.gc.pause_deficit == nursery_size // 2
+        self.gc.size_objects_made_old = r_uint(100 + nursery_size // 2)
+        self.gc.max_heap_size = float(self.gc.get_total_memory_used() + 50)
+        assert not self.gc.max_pause_reached(start - 1.0, 100)
+        self.gc.max_heap_size = 0.0
+        # the deficit makes the next major collection start earlier
+        self.gc.collect()
+        assert self.gc.pause_deficit == 0
+
+    def test_freeze(self):
+        from rpython.memory.gc import incminimark
+        for i in range(20):
+            s = self.malloc(S)
+            s.x = i
+            self.stackroots.append(s)
+        self.gc.freeze()
+        frozen = self.stackroots[0]
+        assert self.flags(frozen) & incminimark.GCFLAG_FROZEN
+        assert self.flags(frozen) & incminimark.GCFLAG_VISITED
+        used = self.gc.ac.total_memory_used
+        # frozen objects are never freed, and not even visited by the
+        # sweeping phase
+        garbage = self.stackroots[1]
+        del self.stackroots[1:]
+        self.gc.collect()
+        assert self.gc.ac.total_memory_used == used
+        assert garbage.x == 1
+        assert self.flags(garbage) & incminimark.GCFLAG_VISITED
+        # a frozen object that is modified keeps its new referents alive
+        s = self.malloc(S)
+        s.x = 42
+        self.write(frozen, 'next', s)
+        self.gc.collect()
+        self.gc.collect()
+        assert frozen.next.x == 42
+        assert self.flags(frozen) & incminimark.GCFLAG_FROZEN_MODIFIED
+        assert self.gc.frozen_modified_objects.length() == 1
+        # also when the new referent is already old
+        s = self.malloc(S)
+        s.x = 43
+        self.stackroots.append(s)
+        self.gc.collect()
+        self.write(frozen, 'prev', self.stackroots.pop())
+        self.gc.collect()
+        self.gc.collect()
+        assert frozen.prev.x == 43
+        assert frozen.next.x == 42
+        assert self.gc.frozen_modified_objects.length() == 1
+
 
 class Node(object):
     def __init__(self, x, prev, next):
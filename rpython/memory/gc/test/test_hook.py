@@ -26,6 +26,7 @@ class MyGcHooks(GcHooks):
         self.steps = []
         self.collects = []
         self.durations = []
+        self.pause_misses = []
 
     def on_gc_minor(self, duration, total_memory_used, pinned_objects):
         self.durations.append(duration)
@@ -39,6 +40,11 @@ class MyGcHooks(GcHooks):
             'oldstate': oldstate,
             'newstate': newstate})
 
+    def on_gc_pause_miss(self, duration, target, state):
+        self.pause_misses.append({
+            'target': target,
+            'state': state})
+
     def on_gc_collect(self, num_major_collects,
                       arenas_count_before, arenas_count_after,
                       arenas_bytes, rawmalloc_bytes_before,
@@ -123,9 +129,24 @@ class TestIncMiniMarkHooks(BaseDirectGCTest):
             }
             ]
 
+    def test_on_gc_pause_miss(self):
+        from rpython.memory.gc import incminimark as m
+        self.gc.hooks._gc_collect_step_enabled = True
+        self.gc.max_pause = 1e-9      # every step misses it
+        self.malloc(S)
+        self.gc.collect()
+        assert self.gc.hooks.pause_misses == [
+            {'target': 1e-9, 'state': m.STATE_SCANNING},
+            {'target': 1e-9, 'state': m.STATE_MARKING},
+            {'target': 1e-9, 'state': m.STATE_SWEEPING},
+            {'target': 1e-9, 'state': m.STATE_FINALIZING},
+        ]
+        assert len(self.gc.hooks.steps) == 4
+
     def test_hook_disabled(self):
         self.gc._minor_collection()
         self.gc.collect()
         assert self.gc.hooks.minors == []
         assert self.gc.hooks.steps == []
         assert self.gc.hooks.collects == []
+        assert self.gc.hooks.pause_misses == []
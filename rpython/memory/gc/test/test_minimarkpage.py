@@ -402,6 +402,116 @@ def test_mass_free_half_page_becomes_more_free():
     assert freepages(ac) == NULL
     assert ac.full_page_for_size[2] == PAGE_NULL
 
+def test_mass_free_sparse_pages_last():
+    pagesize = hdrsize + 16*WORD
+    ac = arena_collection_for_test(pagesize, "###", fill_with_objects=2)
+    keep = [1, 4, 1]     # surviving objects in each page, out of 8
+    def answer(addr):
+        ofs = addr - ac._startpageaddr
+        num_page = ofs // pagesize
+        num_block = (ofs % pagesize - hdrsize) // (2*WORD)
+        return num_block >= keep[num_page]
+    ac.mass_free(OkToFree(ac, answer))
+    page = ac.page_for_size[2]
+    checkpage(ac, page, 1)
+    checkpage(ac, page.nextpage, 2)
+    checkpage(ac, page.nextpage.nextpage, 0)
+    assert page.nextpage.nextpage.nextpage == PAGE_NULL
+    assert ac.full_page_for_size[2] == PAGE_NULL
+
+def test_release_free_pages(monkeypatch):
+    pagesize = hdrsize + 16*WORD
+    ac = arena_collection_for_test(pagesize, "2.3. ")
+    released = []
+    def arena_reset(addr, size, zero):
+        if zero == 4:
+            released.append((addr, size))
+        return original_arena_reset(addr, size, zero)
+    original_arena_reset = llarena.arena_reset
+    monkeypatch.setattr(llarena, 'arena_reset', arena_reset)
+    assert ac.release_free_pages() == 2
+    assert ac.pages_freed_since_release == 0
+    # the whole pages are released, and taken out of the chained list
+    assert released == [(pagenum(ac, 1), pagesize), (pagenum(ac, 3), pagesize)]
+    assert freepages(ac) == pagenum(ac, 4)
+    assert ac.current_arena.nfreepages == 2
+    assert ac.current_arena.nreleasedpages == 2
+    # they are not released again
+    assert ac.release_free_pages() == 0
+    assert len(released) == 2
+    page = ac.allocate_new_page(4)
+    checkpage(ac, page, 3)
+    page = ac.allocate_new_page(5)
+    checkpage(ac, page, 1)
+    assert ac.current_arena.nfreepages == 0
+    page = ac.allocate_new_page(6)
+    checkpage(ac, page, 4)
+    assert not ac.current_arena      # the arena is full
+
+def test_release_free_pages_then_mass_free():
+    pagesize = hdrsize + 16*WORD
+    ac = arena_collection_for_test(pagesize, "#.#.", fill_with_objects=2)
+    assert ac.release_free_pages() == 2
+    ac.mass_free(OkToFree(ac, 0.5))
+    assert ac.total_free_pages == 0      # the released pages don't count
+    ac.mass_free(OkToFree(ac, True))
+    assert ac.total_free_pages == 2
+    assert ac.current_arena.nfreepages == 4
+    # the pages of the chained list are used first
+    pages = [ac.allocate_new_page(size_class) for size_class in range(3, 7)]
+    checkpage(ac, pages[0], 0)
+    checkpage(ac, pages[1], 2)
+    checkpage(ac, pages[2], 3)
+    checkpage(ac, pages[3], 1)
+
+def test_mass_free_releases_free_pages():
+    pagesize = hdrsize + 16*WORD
+    ac = arena_collection_for_test(pagesize, "###", fill_with_objects=2)
+    ac.release_fragmentation = 0.5
+    released = []
+    ac.release_free_pages = lambda: released.append(ac.total_free_pages)
+    ac.mass_free(OkToFree(ac, 0.5))
+    assert released == []       # no page was freed
+    ac.mass_free(OkToFree(ac, True))
+    assert released == [3]
+
+def test_size_class_stats():
+    pagesize = hdrsize + 16*WORD
+    ac = arena_collection_for_test(pagesize, "    ")
+    for i in range(10):
+        ac.malloc(2*WORD)
+    ac.malloc(3*WORD)
+    assert ac.pages_for_size[2] == 2       # 8 blocks per page
+    assert ac.count_used_blocks(2) == 10
+    assert ac.pages_for_size[3] == 1
+    assert ac.count_used_blocks(3) == 1
+    assert ac.count_free_pages() == 0
+    #
+    ac.mass_free(OkToFree(ac, lambda addr: addr - ac._startpageaddr <
+                                           pagesize))
+    assert ac.pages_for_size[2] == 1
+    assert ac.count_used_blocks(2) == 2
+    assert ac.pages_for_size[3] == 1
+    assert ac.count_used_blocks(3) == 1
+    assert ac.count_free_pages() == 1
+
+def test_freeze_pages():
+    pagesize = hdrsize + 16*WORD
+    ac = arena_collection_for_test(pagesize, "    ")
+    for i in range(10):
+        ac.malloc(2*WORD)
+    ac.malloc(3*WORD)
+    ok_to_free = OkToFree(ac, False)
+    assert ac.freeze_pages(ok_to_free) == 3
+    assert len(ok_to_free.seen) == 11
+    assert ac.total_memory_used == 23*WORD
+    # new objects go to new pages, and the frozen ones are never freed
+    obj = ac.malloc(2*WORD)
+    assert obj - ac._startpageaddr == 3 * pagesize + hdrsize
+    ac.mass_free(OkToFree(ac, True))
+    assert ac.total_memory_used == 23*WORD
+    assert ac.count_free_pages() == 1
+
 # ____________________________________________________________
 
 class DoneTesting(Exception):
@@ -479,6 +589,9 @@ def randomize(random, incremental):
                 else:
                     surviving_total_size += live_objects[at]
             assert ac.total_memory_used == surviving_total_size
+            used_blocks = sum([ac.count_used_blocks(i) * i * WORD
+                               for i in range(1, 7)])
+            assert used_blocks == surviving_total_size
             #
             assert not (set(live_objects) & set(live_objects_extra))
             live_objects.update(live_objects_extra)
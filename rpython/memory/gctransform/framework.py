@@ -313,6 +313,7 @@ class BaseFrameworkGCTransformer(GCTransformer):
             [s_gc, annmodel.SomeInteger()], annmodel.s_None)
         self.collect_step_ptr = getfn(GCClass.collect_step.im_func, [s_gc],
                                       annmodel.SomeInteger())
+        self.freeze_ptr = getfn(GCClass.freeze.im_func, [s_gc], annmodel.s_None)
         self.enable_ptr = getfn(GCClass.enable.im_func, [s_gc], annmodel.s_None)
         self.disable_ptr = getfn(GCClass.disable.im_func, [s_gc], annmodel.s_None)
         self.isenabled_ptr = getfn(GCClass.isenabled.im_func, [s_gc],
@@ -910,6 +911,13 @@ class BaseFrameworkGCTransformer(GCTransformer):
                   resultvar=op.result)
         self.pop_roots(hop, livevars)
 
+    def gct_gc__freeze(self, hop):
+        op = hop.spaceop
+        livevars = self.push_roots(hop)
+        hop.genop("direct_call", [self.freeze_ptr, self.c_const_gc],
+                  resultvar=op.result)
+        self.pop_roots(hop, livevars)
+
     def gct_gc__enable(self, hop):
         op = hop.spaceop
         hop.genop("direct_call", [self.enable_ptr, self.c_const_gc],
@@ -570,6 +570,7 @@ PARAMETER_DOCS = {
     'trace_limit': 'number of recorded operations before we abort tracing with ABORT_TOO_LONG',
     'inlining': 'inline python functions or not (1/0)',
     'loop_longevity': 'a parameter controlling how long loops will be kept before being freed, an estimate',
+    'max_code_size': 'maximum size in MB of the machine code kept alive; the least recently used loops are freed above it (0 = no limit)',
     'retrace_limit': 'how many times we can try retracing before giving up',
     'pureop_historylength': 'how many pure operations the optimizer should remember for CSE (internal)',
     'max_retrace_guards': 'number of extra guards a retrace can cause',
@@ -583,6 +584,8 @@ PARAMETER_DOCS = {
     'vec_cost': 'threshold for which traces to bail. Unpacking increases the counter,'\
                 ' vector operation decrease the cost',
     'vec_all': 'try to vectorize trace loops that occur outside of the numpypy library',
+    'compile_duty': 'maximum percentage of time spent tracing and compiling; '
+                    'new traces are postponed to stay below it (0 = no limit)',
 }
 
 PARAMETERS = {'threshold': 1039, # just above 1024, prime
@@ -592,6 +595,7 @@ PARAMETERS = {'threshold': 1039, # just above 1024, prime
               'trace_limit': 6000,
               'inlining': 1,
               'loop_longevity': 1000,
+              'max_code_size': 0,
               'retrace_limit': 0,
               'pureop_historylength': 16,
               'max_retrace_guards': 15,
@@ -602,6 +606,7 @@ PARAMETERS = {'threshold': 1039, # just above 1024, prime
               'vec': 0,
               'vec_all': 0,
               'vec_cost': 0,
+              'compile_duty': 0,
               }
 unroll_parameters = unrolling_iterable(PARAMETERS.items())
 
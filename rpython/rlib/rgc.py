@@ -30,6 +30,15 @@ def collect_step():
     gc.collect()
     return _encode_states(1, 0)
 
+def freeze():
+    """
+    Do a full collection, then move all the surviving objects to a
+    permanent generation that is never collected or scanned again.
+    Meant to be called before fork() in a server that preforks workers,
+    to keep the memory pages shared.  Only implemented by incminimark.
+    """
+    gc.collect()
+
 def _encode_states(oldstate, newstate):
     return oldstate << 8 | newstate
 
@@ -213,6 +222,18 @@ class CollectStepEntry(ExtRegistryEntry):
         return hop.genop('gc__collect_step', hop.args_v, resulttype=hop.r_result)
 
 
+class FreezeEntry(ExtRegistryEntry):
+    _about_ = freeze
+
+    def compute_result_annotation(self):
+        from rpython.annotator import model as annmodel
+        return annmodel.s_None
+
+    def specialize_call(self, hop):
+        hop.exception_cannot_occur()
+        return hop.genop('gc__freeze', hop.args_v, resulttype=hop.r_result)
+
+
 class SetMaxHeapSizeEntry(ExtRegistryEntry):
     _about_ = set_max_heap_size
 
@@ -845,7 +866,18 @@ def cast_gcref_to_int(gcref):
 (TOTAL_MEMORY, TOTAL_ALLOCATED_MEMORY, TOTAL_MEMORY_PRESSURE,
  PEAK_MEMORY, PEAK_ALLOCATED_MEMORY, TOTAL_ARENA_MEMORY,
  TOTAL_RAWMALLOCED_MEMORY, PEAK_ARENA_MEMORY, PEAK_RAWMALLOCED_MEMORY,
- NURSERY_SIZE, TOTAL_GC_TIME) = range(11)
+ NURSERY_SIZE, TOTAL_GC_TIME, NURSERY_SURVIVING_SIZE,
+ NURSERY_RESIZES, ARENA_FREE_PAGES_MEMORY, NUM_SIZE_CLASSES) = range(15)
+
+# Statistics about one size class of the small objects in the arenas:
+# call get_stats(size_class_stat(SIZE_CLASS_xxx, size_class)), with
+# 1 <= size_class < get_stats(NUM_SIZE_CLASSES).
+(SIZE_CLASS_BLOCK_SIZE, SIZE_CLASS_PAGES, SIZE_CLASS_USED_MEMORY,
+ SIZE_CLASS_CAPACITY) = range(15, 19)
+SIZE_CLASS_SHIFT = 8
+
+def size_class_stat(stat_no, size_class):
+    return stat_no | (size_class << SIZE_CLASS_SHIFT)
 
 @not_rpython
 def get_stats(stat_no):
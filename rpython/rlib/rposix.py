@@ -14,6 +14,7 @@ from rpython.rlib.objectmodel import (
 from rpython.rlib.rarithmetic import intmask, widen
 from rpython.rlib.signature import signature
 from rpython.tool.sourcetools import func_renamer
+from rpython.translator import cdir
 from rpython.translator.platform import platform
 from rpython.translator.tool.cbuild import ExternalCompilationInfo
 
@@ -549,6 +550,158 @@ if not _WIN32:
         with rffi.scoped_nonmovingbuffer(data) as buf:
             return handle_posix_error('pwrite', c_pwrite(fd, buf, count, offset))
 
+    _iobatch_srcdir = os.path.join(os.path.dirname(__file__), 'src')
+    eci_iobatch = eci.merge(ExternalCompilationInfo(
+        includes=['iobatch.h'],
+        include_dirs=[_iobatch_srcdir, cdir],
+        separate_module_files=[os.path.join(_iobatch_srcdir, 'iobatch.c')]))
+    IOBATCHP = rffi.COpaquePtr('struct rpy_iobatch_s',
+                               compilation_info=eci_iobatch)
+    c_iobatch_new = external('rpy_iobatch_new', [rffi.LONG, rffi.INT],
+                             IOBATCHP, compilation_info=eci_iobatch,
+                             save_err=rffi.RFFI_SAVE_ERRNO, releasegil=False)
+    c_iobatch_uses_io_uring = external('rpy_iobatch_uses_io_uring',
+                                       [IOBATCHP], rffi.INT,
+                                       compilation_info=eci_iobatch,
+                                       releasegil=False)
+    c_iobatch_start = external('rpy_iobatch_start',
+                               [IOBATCHP, rffi.LONG, rffi.INTP, rffi.CCHARP,
+                                rffi.CCHARPP, rffi.CArrayPtr(rffi.SIZE_T),
+                                rffi.LONGLONGP, rffi.LONGP], rffi.INT,
+                               compilation_info=eci_iobatch,
+                               save_err=rffi.RFFI_SAVE_ERRNO, releasegil=False)
+    c_iobatch_wait = external('rpy_iobatch_wait', [IOBATCHP], rffi.INT,
+                              compilation_info=eci_iobatch,
+                              save_err=rffi.RFFI_SAVE_ERRNO, releasegil=True)
+    c_iobatch_cancel = external('rpy_iobatch_cancel', [IOBATCHP], rffi.INT,
+                                compilation_info=eci_iobatch,
+                                releasegil=True)
+    c_iobatch_free = external('rpy_iobatch_free', [IOBATCHP], lltype.Void,
+                              compilation_info=eci_iobatch, releasegil=False)
+
+    class BatchIO(object):
+        """Does lists of reads and writes of file descriptors concurrently:
+        with io_uring where the kernel supports it, and with helper threads
+        otherwise.  Operations on the same file descriptor are done in the
+        order they are given; operations on different ones run concurrently.
+
+        Call start(), then wait() until it doesn't raise OSError(EINTR),
+        and then results().  finish() cancels the operations that are still
+        running, and must be called before the next start().  close() must
+        be called at the end.
+        """
+
+        def __init__(self, max_ops, use_io_uring=True):
+            ll_batch = c_iobatch_new(max_ops, int(use_io_uring))
+            if not ll_batch:
+                raise OSError(get_saved_errno(), "batch_io")
+            self.ll_batch = ll_batch
+            self.max_ops = max_ops
+            self.n = 0
+            self.datas = None
+            self.ll_fds = lltype.malloc(rffi.INTP.TO, max_ops, flavor='raw')
+            self.ll_writes = lltype.malloc(rffi.CCHARP.TO, max_ops,
+                                           flavor='raw')
+            self.ll_bufs = lltype.malloc(rffi.CCHARPP.TO, max_ops,
+                                         flavor='raw', zero=True)
+            self.ll_sizes = lltype.malloc(rffi.CArray(rffi.SIZE_T), max_ops,
+                                          flavor='raw')
+            self.ll_offsets = lltype.malloc(rffi.LONGLONGP.TO, max_ops,
+                                            flavor='raw')
+            self.ll_results = lltype.malloc(rffi.LONGP.TO, max_ops,
+                                            flavor='raw')
+
+        def uses_io_uring(self):
+            return bool(c_iobatch_uses_io_uring(self.ll_batch))
+
+        def start(self, fds, datas, sizes, offsets):
+            """Start the operations: operation 'i' writes datas[i] to fds[i]
+            if it is not None, and otherwise reads at most sizes[i] bytes
+            from it; it works at offsets[i] like pread() or pwrite(), or at
+            the current position if offsets[i] is negative."""
+            n = len(fds)
+            assert len(datas) == len(sizes) == len(offsets) == n
+            assert self.n == 0 and n <= self.max_ops
+            for i in range(n):
+                if datas[i] is None and sizes[i] < 0:
+                    raise OSError(errno.EINVAL, "batch_io")
+            self.n = n
+            self.datas = datas
+            for i in range(n):
+                self.ll_fds[i] = rffi.cast(rffi.INT, fds[i])
+                self.ll_offsets[i] = rffi.cast(rffi.LONGLONG, offsets[i])
+                data = datas[i]
+                if data is not None:
+                    self.ll_writes[i] = '\x01'
+                    self.ll_bufs[i] = rffi.str2charp(data,
+                                                     track_allocation=False)
+                    self.ll_sizes[i] = rffi.cast(rffi.SIZE_T, len(data))
+                else:
+                    self.ll_writes[i] = '\x00'
+                    self.ll_bufs[i] = lltype.malloc(rffi.CCHARP.TO, sizes[i],
+                                                    flavor='raw',
+                                                    track_allocation=False)
+                    self.ll_sizes[i] = rffi.cast(rffi.SIZE_T, sizes[i])
+            res = c_iobatch_start(self.ll_batch, n, self.ll_fds,
+                                  self.ll_writes, self.ll_bufs, self.ll_sizes,
+                                  self.ll_offsets, self.ll_results)
+            if res < 0:
+                err = get_saved_errno()
+                self._free_buffers()
+                raise OSError(err, "batch_io")
+
+        def wait(self):
+            """Wait until all the operations are done.  Raises OSError(EINTR)
+            if a signal arrived first; call wait() again to continue."""
+            if c_iobatch_wait(self.ll_batch) < 0:
+                raise OSError(get_saved_errno(), "batch_io")
+
+        def results(self):
+            """Returns a list with, for each operation, the bytes read or
+            the number of bytes written, and the errno (0 if the operation
+            succeeded): (data_or_None, count, errno)."""
+            results = []
+            for i in range(self.n):
+                res = widen(self.ll_results[i])
+                if res < 0:
+                    results.append((None, 0, -res))
+                elif self.datas[i] is not None:
+                    results.append((None, res, 0))
+                else:
+                    results.append((rffi.charpsize2str(self.ll_bufs[i], res),
+                                    res, 0))
+            return results
+
+        def finish(self):
+            if c_iobatch_cancel(self.ll_batch) < 0:
+                # some operations could not be stopped: leak their buffers
+                # rather than let the kernel write into freed memory
+                for i in range(self.n):
+                    self.ll_bufs[i] = lltype.nullptr(rffi.CCHARP.TO)
+            self._free_buffers()
+
+        def _free_buffers(self):
+            for i in range(self.n):
+                if self.ll_bufs[i]:
+                    lltype.free(self.ll_bufs[i], flavor='raw',
+                                track_allocation=False)
+                    self.ll_bufs[i] = lltype.nullptr(rffi.CCHARP.TO)
+            self.n = 0
+            self.datas = None
+
+        def close(self):
+            if not self.ll_batch:
+                return
+            self.finish()
+            c_iobatch_free(self.ll_batch)
+            self.ll_batch = lltype.nullptr(IOBATCHP.TO)
+            lltype.free(self.ll_results, flavor='raw')
+            lltype.free(self.ll_offsets, flavor='raw')
+            lltype.free(self.ll_sizes, flavor='raw')
+            lltype.free(self.ll_bufs, flavor='raw')
+            lltype.free(self.ll_writes, flavor='raw')
+            lltype.free(self.ll_fds, flavor='raw')
+
     if HAVE_FALLOCATE:
         c_posix_fallocate = external('posix_fallocate',
                                      [rffi.INT, OFF_T, OFF_T], rffi.INT,
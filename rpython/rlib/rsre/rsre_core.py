@@ -2,6 +2,8 @@ import sys
 from rpython.rlib.debug import check_nonneg
 from rpython.rlib.unroll import unrolling_iterable
 from rpython.rlib.rsre import rsre_char, rsre_constants as consts
+from rpython.rlib.rsre.rsre_literal import find_required_literals
+from rpython.rlib.rsre.rsre_dfa import build_dfa
 from rpython.tool.sourcetools import func_with_new_name
 from rpython.rlib.objectmodel import we_are_translated, not_rpython
 from rpython.rlib import jit
@@ -51,10 +53,19 @@ class EndOfString(Exception):
     pass
 
 class CompiledPattern(object):
-    _immutable_fields_ = ['pattern[*]', 'flags']
+    _immutable_fields_ = ['pattern[*]', 'flags', 'literals[*]', 'dfa']
 
     def __init__(self, pattern, flags):
         self.pattern = pattern
+        # the literals of which at least one must occur in every match,
+        # or None; see rsre_literal.py
+        base = 0
+        if len(pattern) > 1 and pattern[0] == consts.OPCODE_INFO:
+            base = 1 + pattern[1]
+        self.literals = find_required_literals(pattern, base)
+        # for the patterns with repeated groups, the cached DFA that
+        # finds where a match is possible, or None; see rsre_dfa.py
+        self.dfa = build_dfa(pattern, base)
         if not consts.V37:      # 'flags' is ignored in >=3.7 mode
             self.flags = flags
         # check we don't get the old value of MAXREPEAT
@@ -110,6 +121,18 @@ class AbstractMatchContext(object):
     match_marks = None
     match_marks_flat = None
     match_mode = MODE_ANY
+    # the 'candidates' list of the last prefilter_search() on this context,
+    # valid for the searches starting at or after 'prefilter_start'
+    prefilter_pattern = None
+    prefilter_candidates = None
+    prefilter_start = 0
+    # the positions where a match of 'dfa_starts_pattern' starts, found by
+    # the last dfa_find_starts() on this context: bit number i is set for
+    # the position 'i' bytes after 'dfa_starts_from'
+    dfa_starts_pattern = None
+    dfa_starts = None
+    dfa_starts_from = 0
+    dfa_starts_full = False
 
     def __init__(self, match_start, end):
         # 'match_start' and 'end' must be known to be non-negative
@@ -186,6 +209,12 @@ class AbstractMatchContext(object):
             raise EndOfString
         return position
 
+    @not_rpython
+    def find_literal(self, literal, start):
+        """Return the position of the first occurrence of the
+        RequiredLiteral between 'start' and 'self.end', or -1."""
+        raise NotImplementedError
+
     def get_mark(self, gid):
         return find_mark(self.match_marks, gid)
 
@@ -255,6 +284,24 @@ class FixedMatchContext(AbstractMatchContext):
     def maximum_distance(self, position_low, position_high):
         return position_high - position_low
 
+    def find_literal(self, literal, start):
+        # uses the overlap table of the literal like fast_search() does for
+        # the prefix of the pattern: no character is compared twice
+        codes = literal.codes
+        overlap = literal.overlap
+        i = 0
+        while start < self.end:
+            if self.str(start) != codes[i]:
+                if i > 0:
+                    i = overlap[i - 1]
+                    continue
+            else:
+                i += 1
+                if i == len(codes):
+                    return start + 1 - i
+            start += 1
+        return -1
+
 
 class BufMatchContext(FixedMatchContext):
     """Concrete subclass for matching in a buffer."""
@@ -273,6 +320,11 @@ class BufMatchContext(FixedMatchContext):
         return BufMatchContext(self._buffer, start,
                                self.end)
 
+    def find_literal(self, literal, start):
+        if literal.as_bytes is None:
+            return -1
+        return FixedMatchContext.find_literal(self, literal, start)
+
     def get_single_byte(self, base_position, index):
         return self.str(base_position + index)
 
@@ -294,6 +346,12 @@ class StrMatchContext(FixedMatchContext):
         return StrMatchContext(self._string, start,
                                self.end)
 
+    def find_literal(self, literal, start):
+        s = literal.as_bytes
+        if s is None:
+            return -1
+        return self._string.find(s, start, self.end)
+
     def get_single_byte(self, base_position, index):
         return self.str(base_position + index)
 
@@ -1379,6 +1437,9 @@ def match_context(ctx, pattern):
     ctx.original_pos = ctx.match_start
     if ctx.end < ctx.match_start:
         return False
+    if pattern.dfa is not None:
+        if not dfa_accepts(ctx, pattern, ctx.match_start):
+            return False
     ctx.jitdriver_Match.jit_merge_point(ctx=ctx, pattern=pattern)
     return sre_match(ctx, pattern, 0, ctx.match_start, None) is not None
 
@@ -1396,8 +1457,14 @@ def search_context(ctx, pattern):
         else:
             charset = (flags & consts.SRE_INFO_CHARSET)
         base += 1 + pattern.pat(1)
+    if pattern.dfa is not None:
+        return dfa_search(ctx, pattern, base)
     if pattern.pat(base) == consts.OPCODE_LITERAL:
         return literal_search(ctx, pattern, base)
+    if pattern.literals is not None:
+        # only for the patterns without a literal prefix, which have
+        # their own search loops above
+        return prefilter_search(ctx, pattern, base, charset)
     if charset:
         return charset_search(ctx, pattern, base)
     return regular_search(ctx, pattern, base)
@@ -1420,6 +1487,187 @@ def regular_search(ctx, pattern, base):
         start = ctx.next_indirect(start)
     return False
 
+install_jitdriver_spec("DfaSearch",
+                       greens=['base', 'pattern'],
+                       reds=['start', 'ctx'],
+                       debugprint=(1, 0))
+@specializectx
+def dfa_search(ctx, pattern, base):
+    # the DFAs tell in linear time where the leftmost match starts; we
+    # only call sre_match() there, because it still computes the exact
+    # span and groups
+    start = ctx.match_start
+    while True:
+        ctx.jitdriver_DfaSearch.jit_merge_point(ctx=ctx, pattern=pattern,
+                                                start=start, base=base)
+        index = dfa_find_start(ctx, pattern, start)
+        if index < 0:
+            return False
+        start = ctx.go_forward_by_bytes(start, index)
+        if sre_match(ctx, pattern, base, start, None) is not None:
+            ctx.match_start = start
+            return True
+        if start >= ctx.end:     # should not occur
+            return False
+        start = ctx.next(start)
+
+@specializectx
+@jit.dont_look_inside
+def dfa_find_start(ctx, pattern, start):
+    """Return the number of bytes between 'start' and the first position
+    at or after it where a match starts, or -1 if there is none."""
+    mode = ctx.match_mode
+    if pattern.dfa.nullable and mode != MODE_FULL:
+        # an empty match is found at once, except at the start of a
+        # MODE_NONEMPTY search
+        if (mode != MODE_NONEMPTY or start != ctx.match_start or
+                dfa_accepts(ctx, pattern, start)):
+            return 0
+        if start >= ctx.end:
+            return -1
+        return ctx.bytes_difference(ctx.next(start), start)
+    full = mode == MODE_FULL
+    if (ctx.dfa_starts_pattern is not pattern or
+            ctx.dfa_starts_full != full or start < ctx.dfa_starts_from):
+        # the first search on this context often finds a match at its
+        # start; check that before scanning all the rest of the string
+        if ctx.dfa_starts_pattern is None and dfa_accepts(ctx, pattern, start):
+            return 0
+        dfa_find_starts(ctx, pattern, start, full)
+    bits = ctx.dfa_starts
+    position = start
+    while True:
+        i = ctx.bytes_difference(position, ctx.dfa_starts_from)
+        if bits[i >> 5] & (1 << (i & 31)):
+            return ctx.bytes_difference(position, start)
+        if position >= ctx.end:
+            return -1
+        position = ctx.next(position)
+
+@specializectx
+def dfa_find_starts(ctx, pattern, start, full):
+    # Run the reverse DFA from the end of the string down to 'start',
+    # letting a match end at every position (or only at the end if
+    # 'full'): its state is accepting at the positions where a match
+    # starts.  Store them as a bitmap on the context.
+    dfa = pattern.dfa.reverse
+    length = ctx.bytes_difference(ctx.end, start)
+    bits = [0] * ((length >> 5) + 1)
+    state = dfa.get_start_state()
+    if full and state.accepting:
+        bits[length >> 5] |= 1 << (length & 31)
+    position = ctx.end
+    while position > start:
+        position = ctx.prev(position)
+        if not full:
+            state = dfa.inject(state)
+        state = dfa.step(pattern, state, ctx.str(position))
+        if state.accepting:
+            i = ctx.bytes_difference(position, start)
+            bits[i >> 5] |= 1 << (i & 31)
+        elif full and state.is_dead():
+            break
+    ctx.dfa_starts_pattern = pattern
+    ctx.dfa_starts = bits
+    ctx.dfa_starts_from = start
+    ctx.dfa_starts_full = full
+
+@specializectx
+@jit.dont_look_inside
+def dfa_accepts(ctx, pattern, start):
+    """Check with the forward DFA if there is a match at 'start'."""
+    dfa = pattern.dfa.forward
+    state = dfa.get_start_state()
+    position = start
+    while True:
+        if state.accepting:
+            if ctx.match_mode == MODE_FULL:
+                if position == ctx.end:
+                    return True
+            elif ctx.match_mode == MODE_NONEMPTY:
+                if position != ctx.match_start:
+                    return True
+            else:
+                return True
+        if position >= ctx.end or state.is_dead():
+            return False
+        state = dfa.step(pattern, state, ctx.str(position))
+        position = ctx.next(position)
+
+install_jitdriver_spec("PrefilterSearch",
+                       greens=['base', 'charset', 'pattern'],
+                       reds=['start', 'candidates', 'ctx'],
+                       debugprint=(2, 0))
+@specializectx
+def prefilter_search(ctx, pattern, base, charset):
+    # every match contains one of 'pattern.literals': look for them with
+    # a substring search and only call sre_match() at the positions from
+    # where a match could reach one of them.  'candidates[i]' is the
+    # first such position for literal number i, or -1 if this literal
+    # doesn't occur any more; for a literal at a fixed offset it is the
+    # only candidate up to the next occurrence, otherwise all positions
+    # up to it are candidates.  The list is kept on the context: findall()
+    # and the like search again from further positions, and must not look
+    # again for the literals that don't occur any more.
+    literals = pattern.literals
+    start = ctx.match_start
+    candidates = ctx.prefilter_candidates
+    if (candidates is None or ctx.prefilter_pattern is not pattern or
+            start < ctx.prefilter_start):
+        candidates = [ctx.ZERO] * len(literals)
+        for i in range(len(literals)):
+            candidates[i] = _next_candidate(ctx, literals[i], start)
+        ctx.prefilter_pattern = pattern
+        ctx.prefilter_candidates = candidates
+    while True:
+        ctx.jitdriver_PrefilterSearch.jit_merge_point(ctx=ctx, start=start,
+                base=base, charset=charset, pattern=pattern,
+                candidates=candidates)
+        literals = pattern.literals
+        found = False
+        best = start
+        for i in range(len(literals)):
+            candidate = candidates[i]
+            if candidate < start:
+                if candidate == -1:
+                    continue
+                candidate = _next_candidate(ctx, literals[i], start)
+                candidates[i] = candidate
+                if candidate < start:
+                    continue
+            if literals[i].offset < 0:
+                candidate = start
+            if not found or candidate < best:
+                best = candidate
+                found = True
+        if not found:
+            ctx.prefilter_start = start
+            return False
+        start = best
+        ctx.prefilter_start = start
+        if not charset or (start < ctx.end and
+                rsre_char.check_charset(ctx, pattern, 5, ctx.str(start))):
+            if sre_match(ctx, pattern, base, start, None) is not None:
+                ctx.match_start = start
+                return True
+        if start >= ctx.end:
+            return False
+        start = ctx.next(start)
+
+@specializectx
+def _next_candidate(ctx, literal, start):
+    offset = literal.offset
+    position = start
+    if offset > 0:
+        try:
+            position = ctx.next_n(start, offset, ctx.end)
+        except EndOfString:
+            position = ctx.end     # the literal cannot fit any more
+    position = ctx.find_literal(literal, position)
+    if offset > 0 and position != -1:
+        position = ctx.prev_n(position, offset, ctx.ZERO)
+    return position
+
 install_jitdriver_spec("LiteralSearch",
                        greens=['base', 'character', 'pattern'],
                        reds=['start', 'ctx'],
@@ -0,0 +1,362 @@
+"""
+Lazily-built DFAs for the patterns that don't need backtracking: no
+group references, no assertions, no atomic groups or possessive repeats.
+They only answer the question "which positions does a match start at?",
+in time linear in the length of the string: the forward DFA checks a
+given position, and the reverse DFA, run once from the end of the
+string to the start, finds all of them.  The search uses that to call
+the backtracking sre_match() only at the position where the leftmost
+match starts: this avoids the exponential time that repeated groups like
+'(a|aa)*c' can take to fail.  (Going backwards from the end of the first
+match found by a forward scan would not do: for 'a.*z|b' in 'a b z',
+that is the end of 'b', but the leftmost match is the whole string.)
+
+The pattern is turned into two Thompson NFAs when the CompiledPattern is
+built.  The states of the DFAs are sets of NFA nodes; they are computed
+only when a search reaches them, and cached on the CompiledPattern
+together with their transitions.  If more than MAX_DFA_STATES states or
+MAX_OTHER_TRANSITIONS transitions for characters >= 256 are created, the
+cache is flushed and we continue from an empty one.
+"""
+
+from rpython.rlib.rsre import rsre_char, rsre_constants as consts
+from rpython.rlib.rsre.rsre_char import MAXREPEAT
+
+MAX_NFA_NODES = 2000
+MAX_DFA_STATES = 1000
+MAX_OTHER_TRANSITIONS = 20000     # cached for the characters >= 256
+
+NODE_CHAR = 0       # matches the single-character opcode at 'arg'
+NODE_SPLIT = 1      # epsilon transitions to 'out1' and 'out2'
+NODE_MATCH = 2      # the end of the pattern
+
+
+class NotSupported(Exception):
+    pass
+
+class Item(object):
+    pass
+
+class CharItem(Item):
+    def __init__(self, ppos):
+        self.ppos = ppos
+
+class BranchItem(Item):
+    def __init__(self, alternatives):
+        self.alternatives = alternatives
+
+class RepeatItem(Item):
+    def __init__(self, mincount, maxcount, body):
+        self.mincount = mincount
+        self.maxcount = maxcount
+        self.body = body
+
+
+def _parse_sequence(code, ppos, items):
+    # Parse the opcodes starting at 'ppos' into 'items', until the one
+    # that ends the sequence; return the position of the latter.
+    while True:
+        op = code[ppos]
+        if (op == consts.OPCODE_SUCCESS or op == consts.OPCODE_JUMP or
+                op == consts.OPCODE_MAX_UNTIL or
+                op == consts.OPCODE_MIN_UNTIL):
+            return ppos
+        elif (op == consts.OPCODE_LITERAL or
+              op == consts.OPCODE_LITERAL_IGNORE or
+              op == consts.OPCODE_NOT_LITERAL or
+              op == consts.OPCODE_NOT_LITERAL_IGNORE or
+              consts.eq(op, consts.OPCODE37_LITERAL_LOC_IGNORE) or
+              consts.eq(op, consts.OPCODE37_LITERAL_UNI_IGNORE) or
+              consts.eq(op, consts.OPCODE37_NOT_LITERAL_LOC_IGNORE) or
+              consts.eq(op, consts.OPCODE37_NOT_LITERAL_UNI_IGNORE)):
+            items.append(CharItem(ppos))
+            ppos += 2
+        elif op == consts.OPCODE_ANY or op == consts.OPCODE_ANY_ALL:
+            items.append(CharItem(ppos))
+            ppos += 1
+        elif (op == consts.OPCODE_IN or op == consts.OPCODE_IN_IGNORE or
+              consts.eq(op, consts.OPCODE37_IN_LOC_IGNORE) or
+              consts.eq(op, consts.OPCODE37_IN_UNI_IGNORE)):
+            items.append(CharItem(ppos))
+            ppos += 1 + code[ppos + 1]
+        elif op == consts.OPCODE_MARK:
+            ppos += 2
+        elif op == consts.OPCODE_INFO:
+            ppos += 1 + code[ppos + 1]
+        elif op == consts.OPCODE_BRANCH:
+            # <BRANCH> <skip> code <JUMP> ... <NULL>
+            alternatives = []
+            ppos += 1
+            while code[ppos]:
+                alternative = []
+                _parse_sequence(code, ppos + 1, alternative)
+                alternatives.append(alternative)
+                ppos += code[ppos]
+            items.append(BranchItem(alternatives))
+            ppos += 1
+        elif (op == consts.OPCODE_REPEAT_ONE or
+              op == consts.OPCODE_MIN_REPEAT_ONE):
+            # <REPEAT_ONE> <skip> <min> <max> item <SUCCESS> tail
+            body = []
+            _parse_sequence(code, ppos + 4, body)
+            items.append(RepeatItem(code[ppos + 2], code[ppos + 3], body))
+            ppos += 1 + code[ppos + 1]
+        elif op == consts.OPCODE_REPEAT:
+            # <REPEAT> <skip> <min> <max> item <MAX_UNTIL> tail
+            body = []
+            _parse_sequence(code, ppos + 4, body)
+            items.append(RepeatItem(code[ppos + 2], code[ppos + 3], body))
+            ppos += 2 + code[ppos + 1]
+        else:
+            raise NotSupported
+
+def _contains_repeated_group(items):
+    for item in items:
+        if isinstance(item, RepeatItem):
+            if len(item.body) != 1 or not isinstance(item.body[0], CharItem):
+                return True
+        elif isinstance(item, BranchItem):
+            for alternative in item.alternatives:
+                if _contains_repeated_group(alternative):
+                    return True
+    return False
+
+
+class NFA(object):
+
+    def __init__(self):
+        self.kinds = []
+        self.args = []
+        self.out1 = []
+        self.out2 = []
+        self.start = -1
+
+    def new_node(self, kind, arg, out1, out2):
+        if len(self.kinds) >= MAX_NFA_NODES:
+            raise NotSupported
+        self.kinds.append(kind)
+        self.args.append(arg)
+        self.out1.append(out1)
+        self.out2.append(out2)
+        return len(self.kinds) - 1
+
+    def build_sequence(self, items, next, reverse):
+        # build the nodes backwards, starting from the node 'next' that
+        # follows the sequence, and return the entry node.  If 'reverse',
+        # the NFA recognizes the sequence read from right to left.
+        if reverse:
+            for i in range(len(items)):
+                next = self.build_item(items[i], next, reverse)
+        else:
+            for i in range(len(items) - 1, -1, -1):
+                next = self.build_item(items[i], next, reverse)
+        return next
+
+    def build_item(self, item, next, reverse):
+        if isinstance(item, CharItem):
+            return self.new_node(NODE_CHAR, item.ppos, next, -1)
+        elif isinstance(item, BranchItem):
+            alternatives = item.alternatives
+            entry = self.build_sequence(alternatives[-1], next, reverse)
+            for i in range(len(alternatives) - 2, -1, -1):
+                first = self.build_sequence(alternatives[i], next, reverse)
+                entry = self.new_node(NODE_SPLIT, 0, first, entry)
+            return entry
+        elif isinstance(item, RepeatItem):
+            body = item.body
+            if item.maxcount == MAXREPEAT:
+                # a loop, entered or left by a split node
+                entry = self.new_node(NODE_SPLIT, 0, -1, next)
+                self.out1[entry] = self.build_sequence(body, entry, reverse)
+            else:
+                # (max - min) nested optional copies
+                entry = next
+                for i in range(item.maxcount - item.mincount):
+                    first = self.build_sequence(body, entry, reverse)
+                    entry = self.new_node(NODE_SPLIT, 0, first, next)
+            for i in range(item.mincount):
+                entry = self.build_sequence(body, entry, reverse)
+            return entry
+        else:
+            raise AssertionError("unreachable")
+
+
+def _build_nfa(items, reverse):
+    nfa = NFA()
+    match = nfa.new_node(NODE_MATCH, 0, -1, -1)
+    nfa.start = nfa.build_sequence(items, match, reverse)
+    return nfa
+
+
+def build_dfa(code, ppos):
+    """Return a PatternDFA for the pattern 'code' starting at 'ppos', or
+    None.  We only return one for the patterns that contain a repeated
+    group, where backtracking can be expensive; the others are left to
+    the paths of rsre_core.py that the JIT knows how to optimize."""
+    items = []
+    try:
+        end = _parse_sequence(code, ppos, items)
+        if code[end] != consts.OPCODE_SUCCESS:
+            return None
+        if not _contains_repeated_group(items):
+            return None
+        nfa = _build_nfa(items, False)
+        reverse_nfa = _build_nfa(items, True)
+    except NotSupported:
+        return None
+    return PatternDFA(nfa, reverse_nfa)
+
+
+def char_matches(pattern, ppos, c):
+    """Check the character 'c' against the single-character opcode at
+    'ppos' in the CompiledPattern."""
+    code = pattern.pattern
+    op = code[ppos]
+    if op == consts.OPCODE_LITERAL:
+        return c == code[ppos + 1]
+    elif op == consts.OPCODE_NOT_LITERAL:
+        return c != code[ppos + 1]
+    elif op == consts.OPCODE_ANY:
+        return not rsre_char.is_linebreak(c)
+    elif op == consts.OPCODE_ANY_ALL:
+        return True
+    elif op == consts.OPCODE_IN:
+        return rsre_char.check_charset(None, pattern, ppos + 2, c)
+    elif op == consts.OPCODE_LITERAL_IGNORE:
+        return pattern.lowa(c) == code[ppos + 1]
+    elif op == consts.OPCODE_NOT_LITERAL_IGNORE:
+        return pattern.lowa(c) != code[ppos + 1]
+    elif op == consts.OPCODE_IN_IGNORE:
+        return rsre_char.check_charset(None, pattern, ppos + 2,
+                                       pattern.lowa(c))
+    elif consts.eq(op, consts.OPCODE37_LITERAL_UNI_IGNORE):
+        return rsre_char.getlower_unicode(c) == code[ppos + 1]
+    elif consts.eq(op, consts.OPCODE37_NOT_LITERAL_UNI_IGNORE):
+        return rsre_char.getlower_unicode(c) != code[ppos + 1]
+    elif consts.eq(op, consts.OPCODE37_IN_UNI_IGNORE):
+        return rsre_char.check_charset(None, pattern, ppos + 2,
+                                       rsre_char.getlower_unicode(c))
+    elif consts.eq(op, consts.OPCODE37_LITERAL_LOC_IGNORE):
+        return pattern.char_loc_ignore(ppos + 1, c)
+    elif consts.eq(op, consts.OPCODE37_NOT_LITERAL_LOC_IGNORE):
+        return not pattern.char_loc_ignore(ppos + 1, c)
+    elif consts.eq(op, consts.OPCODE37_IN_LOC_IGNORE):
+        return pattern.charset_loc_ignore(None, ppos + 2, c)
+    else:
+        raise AssertionError("unreachable")
+
+
+class DFAState(object):
+
+    def __init__(self, nodes, accepting):
+        self.nodes = nodes            # NODE_CHAR nodes, in increasing order
+        self.accepting = accepting    # if the NFA reached NODE_MATCH
+        self.transitions = None       # list of 256 DFAStates, or None
+        self.other_transitions = None # dict {char: DFAState} for char >= 256
+        self.injected = None          # this state plus the start of the NFA
+
+    def is_dead(self):
+        return not self.nodes and not self.accepting
+
+
+class DFA(object):
+    """The states reachable from the start of the NFA."""
+
+    def __init__(self, nfa):
+        self.nfa = nfa
+        self.flush()
+
+    def flush(self):
+        self.states = {}
+        self.num_other_transitions = 0
+        self.start_state = None
+
+    def get_start_state(self):
+        if self.start_state is None:
+            self.start_state = self._make_state([self.nfa.start])
+        return self.start_state
+
+    def step(self, pattern, state, c):
+        """Return the state after reading the character 'c'."""
+        if c < 256:
+            if state.transitions is None:
+                state.transitions = [None] * 256
+            else:
+                nextstate = state.transitions[c]
+                if nextstate is not None:
+                    return nextstate
+        elif state.other_transitions is None:
+            state.other_transitions = {}
+        else:
+            nextstate = state.other_transitions.get(c, None)
+            if nextstate is not None:
+                return nextstate
+        nfa = self.nfa
+        targets = []
+        for node in state.nodes:
+            if char_matches(pattern, nfa.args[node], c):
+                targets.append(nfa.out1[node])
+        nextstate = self._make_state(targets)
+        if c < 256:
+            state.transitions[c] = nextstate
+        else:
+            state.other_transitions[c] = nextstate
+            self.num_other_transitions += 1
+        return nextstate
+
+    def inject(self, state):
+        """Return the state that also contains the start of the NFA,
+        i.e. that lets a new match start at the current position."""
+        if state.injected is None:
+            targets = state.nodes[:]
+            targets.append(self.nfa.start)
+            state.injected = self._make_state(targets)
+        return state.injected
+
+    def _make_state(self, targets):
+        # the epsilon closure of the 'targets' nodes
+        nfa = self.nfa
+        seen = [False] * len(nfa.kinds)
+        accepting = False
+        while targets:
+            node = targets.pop()
+            if seen[node]:
+                continue
+            seen[node] = True
+            kind = nfa.kinds[node]
+            if kind == NODE_SPLIT:
+                targets.append(nfa.out2[node])
+                targets.append(nfa.out1[node])
+            elif kind == NODE_MATCH:
+                accepting = True
+        nodes = []
+        for node in range(len(seen)):
+            if seen[node] and nfa.kinds[node] == NODE_CHAR:
+                nodes.append(node)
+        keys = [str(node) for node in nodes]
+        if accepting:
+            keys.append('match')
+        key = ','.join(keys)
+        try:
+            return self.states[key]
+        except KeyError:
+            pass
+        if (len(self.states) >= MAX_DFA_STATES or
+                self.num_other_transitions >= MAX_OTHER_TRANSITIONS):
+            # memory cap: forget all the cached states.  The ones that
+            # the caller still references remain valid.
+            self.flush()
+        state = DFAState(nodes, accepting)
+        self.states[key] = state
+        return state
+
+
+class PatternDFA(object):
+    """The DFAs cached on a CompiledPattern: 'forward' recognizes the
+    pattern, and 'reverse' recognizes the pattern read backwards."""
+
+    def __init__(self, nfa, reverse_nfa):
+        self.forward = DFA(nfa)
+        self.reverse = DFA(reverse_nfa)
+        # if the pattern can match the empty string
+        self.nullable = self.forward.get_start_state().accepting
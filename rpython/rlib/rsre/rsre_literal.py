@@ -0,0 +1,198 @@
+"""
+Extraction of the literal substrings that every match of a compiled
+pattern must contain.  search_context() uses them to skip, with a plain
+substring search, the positions where sre_match() cannot succeed: for
+example '.*ERROR \\d+' cannot match anywhere after the last 'ERROR ' of
+the string, and 'ERROR|WARNING' can only match where one of the two
+words starts.
+"""
+
+from rpython.rlib import rutf8
+from rpython.rlib.rsre import rsre_constants as consts
+
+# a search keeps track of the next occurrence of each of the literals;
+# above this number it is not worth it any more
+MAX_LITERALS = 8
+
+
+class RequiredLiteral(object):
+    """A literal substring that can occur in a match.  'offset' is the
+    number of characters between the start of the match and the start of
+    the literal, or -1 if that number is not fixed.
+    """
+    _immutable_ = True
+
+    def __init__(self, codes, offset):
+        self.codes = codes
+        self.offset = offset
+        self.as_bytes = _codes_as_bytes(codes)
+        self.as_utf8 = _codes_as_utf8(codes)
+        self.overlap = _overlap_table(codes)
+
+    def __repr__(self):
+        return '<RequiredLiteral %r at %d>' % (self.codes, self.offset)
+
+def _overlap_table(codes):
+    # the same table as sre_compile.py stores after the prefix of a
+    # pattern: overlap[i] is the length of the longest proper prefix of
+    # the literal that is also a suffix of codes[:i+1]
+    table = [-1] + [0] * len(codes)
+    for i in range(len(codes)):
+        table[i + 1] = table[i] + 1
+        while table[i + 1] > 0 and codes[i] != codes[table[i + 1] - 1]:
+            table[i + 1] = table[table[i + 1] - 1] + 1
+    return table[1:]
+
+def _codes_as_bytes(codes):
+    # None if the literal cannot occur in a byte string
+    result = []
+    for code in codes:
+        if code > 255:
+            return None
+        result.append(chr(code))
+    return ''.join(result)
+
+def _codes_as_utf8(codes):
+    # None if the literal cannot occur in a unicode string
+    result = []
+    for code in codes:
+        if code > 0x10FFFF:
+            return None
+        result.append(rutf8.unichr_as_utf8(code, allow_surrogates=True))
+    return ''.join(result)
+
+
+def find_required_literals(code, ppos):
+    """Return a list of RequiredLiteral such that any match of the
+    pattern 'code' starting at 'ppos' contains one of them, or None if
+    no such list was found.
+    """
+    alternatives = _scan_sequence(code, ppos, 0)
+    if alternatives is None:
+        return None
+    return [RequiredLiteral(codes, offset) for codes, offset in alternatives]
+
+def _shortest(alternatives):
+    shortest = len(alternatives[0][0])
+    for codes, offset in alternatives:
+        shortest = min(shortest, len(codes))
+    return shortest
+
+def _all_fixed(alternatives):
+    for codes, offset in alternatives:
+        if offset < 0:
+            return False
+    return True
+
+def _better(alternatives, best):
+    # prefer the longest shortest literal, and then the ones at a fixed
+    # offset: they let the search jump directly to the candidates
+    if alternatives is None:
+        return False
+    if best is None:
+        return True
+    shortest = _shortest(alternatives)
+    best_shortest = _shortest(best)
+    if shortest != best_shortest:
+        return shortest > best_shortest
+    return _all_fixed(alternatives) and not _all_fixed(best)
+
+def _scan_sequence(code, ppos, offset):
+    # Scan the sequence of opcodes starting at 'ppos' until its end or
+    # until an opcode we don't know about.  'offset' is the width of what
+    # comes before in characters, or -1.  Returns the best list of
+    # alternatives (codes, offset) found, one of which must occur.
+    best = None
+    run = []
+    run_offset = offset
+    while ppos < len(code):
+        op = code[ppos]
+        if op == consts.OPCODE_LITERAL:
+            if not run:
+                run_offset = offset
+            run.append(code[ppos + 1])
+            ppos += 2
+            if offset >= 0:
+                offset += 1
+            continue
+        if op == consts.OPCODE_MARK:
+            ppos += 2
+            continue
+        # any other opcode ends the current run of literals
+        if run:
+            alternatives = [(run, run_offset)]
+            if _better(alternatives, best):
+                best = alternatives
+            run = []
+        if (op == consts.OPCODE_LITERAL_IGNORE or
+              op == consts.OPCODE_NOT_LITERAL or
+              op == consts.OPCODE_NOT_LITERAL_IGNORE or
+              op == consts.OPCODE_CATEGORY or
+              consts.eq(op, consts.OPCODE37_LITERAL_LOC_IGNORE) or
+              consts.eq(op, consts.OPCODE37_LITERAL_UNI_IGNORE) or
+              consts.eq(op, consts.OPCODE37_NOT_LITERAL_LOC_IGNORE) or
+              consts.eq(op, consts.OPCODE37_NOT_LITERAL_UNI_IGNORE)):
+            # <op> <argument>: one character
+            ppos += 2
+            if offset >= 0:
+                offset += 1
+        elif op == consts.OPCODE_ANY or op == consts.OPCODE_ANY_ALL:
+            ppos += 1
+            if offset >= 0:
+                offset += 1
+        elif (op == consts.OPCODE_IN or op == consts.OPCODE_IN_IGNORE or
+              consts.eq(op, consts.OPCODE37_IN_LOC_IGNORE) or
+              consts.eq(op, consts.OPCODE37_IN_UNI_IGNORE)):
+            # <IN> <skip> set: one character
+            ppos += 1 + code[ppos + 1]
+            if offset >= 0:
+                offset += 1
+        elif op == consts.OPCODE_AT:
+            ppos += 2
+        elif (op == consts.OPCODE_ASSERT or op == consts.OPCODE_ASSERT_NOT or
+              op == consts.OPCODE_INFO):
+            # zero-width; we don't look inside
+            ppos += 1 + code[ppos + 1]
+        elif (op == consts.OPCODE_REPEAT_ONE or
+              op == consts.OPCODE_MIN_REPEAT_ONE):
+            # <REPEAT_ONE> <skip> <min> <max> item <SUCCESS> tail
+            # where 'item' is one character
+            if offset >= 0 and code[ppos + 2] == code[ppos + 3]:
+                offset += code[ppos + 2]
+            else:
+                offset = -1
+            ppos += 1 + code[ppos + 1]
+        elif op == consts.OPCODE_REPEAT:
+            # <REPEAT> <skip> <min> <max> item <MAX_UNTIL> tail
+            offset = -1
+            ppos += 2 + code[ppos + 1]
+        elif op == consts.OPCODE_BRANCH:
+            # <BRANCH> <skip> code <JUMP> ... <NULL>
+            alternatives = []
+            ppos += 1
+            while code[ppos]:
+                found = _scan_sequence(code, ppos + 1, offset)
+                if found is None:
+                    alternatives = None
+                    break
+                alternatives.extend(found)
+                ppos += code[ppos]
+            if alternatives is not None and len(alternatives) > MAX_LITERALS:
+                alternatives = None
+            if _better(alternatives, best):
+                best = alternatives
+            if alternatives is None:
+                # stopped early, look for the final NULL
+                while code[ppos]:
+                    ppos += code[ppos]
+            ppos += 1
+            offset = -1
+        else:
+            # JUMP or SUCCESS at the end of the sequence, or some opcode
+            # that we don't know about: stop here
+            break
+    if run:
+        alternatives = [(run, run_offset)]
+        if _better(alternatives, best):
+            best = alternatives
+    return best
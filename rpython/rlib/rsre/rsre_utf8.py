@@ -67,6 +67,14 @@ class Utf8MatchContext(AbstractMatchContext):
         # may overestimate if there are non-ascii chars
         return position_high - position_low
 
+    def find_literal(self, literal, start):
+        # utf8 is self-synchronizing: any occurrence starts at a
+        # codepoint boundary
+        s = literal.as_utf8
+        if s is None:
+            return -1
+        return self._utf8.find(s, start, self.end)
+
 
 def make_utf8_ctx(utf8string, bytestart, byteend):
     if bytestart < 0: bytestart = 0
@@ -107,6 +107,15 @@ class MatchContextForTests(StrMatchContext):
         assert isinstance(index, int)
         return Position(base_position._p + index)
 
+    def find_literal(self, literal, start):
+        assert isinstance(start, Position)
+        if literal.as_bytes is None:
+            return -1
+        r = self._string.find(literal.as_bytes, start._p, self.end._p)
+        if r < 0:
+            return -1
+        return Position(r)
+
 
 def match(pattern, string, start=0, end=sys.maxint, fullmatch=False):
     start, end = _adjust(start, end, len(string))
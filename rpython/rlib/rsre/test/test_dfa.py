@@ -0,0 +1,127 @@
+import re
+from rpython.rlib.rsre import rsre_core, rsre_dfa
+from rpython.rlib.rsre.rpy import get_code
+
+
+def test_supported():
+    assert get_code(r'(a|aa)*c').dfa is not None
+    assert get_code(r'(?:\d+,)+\d').dfa is not None
+    assert get_code(r'x(?:ab|c){2,5}').dfa is not None
+    assert get_code(r'(?:(a|b)c)*?').dfa is not None
+
+def test_not_supported():
+    # no repeated group: the other paths are good enough
+    assert get_code(r'abc').dfa is None
+    assert get_code(r'a+b*[cd]{2,3}').dfa is None
+    assert get_code(r'(a|b)c').dfa is None
+    assert get_code(r'(a|b)*c').dfa is None     # a charset, not a group
+    # needs more than the DFA can do
+    assert get_code(r'(a|b)*\1').dfa is None
+    assert get_code(r'(a|b)*$').dfa is None
+    assert get_code(r'(?=x)(a|b)*').dfa is None
+    assert get_code(r'(?:a|b)*(?<=b)').dfa is None
+    # too big
+    assert get_code(r'(?:ab|cd){900}').dfa is None
+
+def test_match_modes():
+    r_code = get_code(r'(ab|a)*b')
+    r = re.compile(r'(ab|a)*b')
+    r_full = re.compile(r'(?:(ab|a)*b)\Z')
+    for s in ['', 'b', 'ab', 'abab', 'ababx', 'aab', 'abb', 'x']:
+        for start in range(len(s) + 1):
+            res = rsre_core.match(r_code, s, start)
+            m = r.match(s, start)
+            assert (res is None) == (m is None)
+            if m is not None:
+                assert res.span() == m.span()
+            res = rsre_core.fullmatch(r_code, s, start)
+            m = r_full.match(s, start)
+            assert (res is None) == (m is None)
+            if m is not None:
+                assert res.span() == m.span()
+
+def test_nonempty():
+    r_code = get_code(r'(?:ab|b)*')
+    ctx = rsre_core.StrMatchContext('xabb', 0, 4)
+    ctx.match_mode = rsre_core.MODE_NONEMPTY
+    assert rsre_core.search_context(ctx, r_code)
+    assert ctx.span() == (1, 4)
+    # an empty match is fine if it is not at the start of the search
+    ctx = rsre_core.StrMatchContext('xyz', 0, 3)
+    ctx.match_mode = rsre_core.MODE_NONEMPTY
+    assert rsre_core.search_context(ctx, r_code)
+    assert ctx.span() == (1, 1)
+    ctx = rsre_core.StrMatchContext('x', 0, 1)
+    ctx.match_mode = rsre_core.MODE_NONEMPTY
+    assert not rsre_core.match_context(ctx, r_code)
+
+def test_states_cached():
+    r_code = get_code(r'(ab|b)*c')
+    assert rsre_core.search(r_code, 'x' + 'abab' * 10 + 'c') is not None
+    dfa = r_code.dfa.reverse
+    states = len(dfa.states)
+    assert 1 < states < 10
+    state = dfa.get_start_state()
+    assert dfa.step(r_code, state, ord('a')) is state.transitions[ord('a')]
+    assert rsre_core.search(r_code, 'x' + 'baba' * 10 + 'c') is not None
+    assert len(dfa.states) == states
+
+def test_states_cached_non_latin1():
+    r_code = get_code(u'(\u1234\u1235|b)*c')
+    s = u'\u1234\u1235b' * 10 + u'c'
+    ctx = rsre_core.UnicodeMatchContext(s, 1, len(s))
+    assert rsre_core.search_context(ctx, r_code)
+    assert ctx.span() == (2, len(s))
+    dfa = r_code.dfa.reverse
+    states = len(dfa.states)
+    assert dfa.num_other_transitions > 0
+    num_other_transitions = dfa.num_other_transitions
+    ctx = rsre_core.UnicodeMatchContext(s, 1, len(s))
+    assert rsre_core.search_context(ctx, r_code)
+    assert len(dfa.states) == states
+    assert dfa.num_other_transitions == num_other_transitions
+    state = dfa.get_start_state()
+    assert dfa.step(r_code, state, 0x1235) is state.other_transitions[0x1235]
+
+def test_leftmost_start():
+    # the end of the first match found from the left is not enough to
+    # find where the leftmost match starts
+    for pattern, s in [(r'(?:a.*z|b)+', 'a b z'),
+                       (r'(?:a|ab)(?:c|bcd)+d*', 'xabcd'),
+                       (r'(?:ab|b)+c|x', 'yxbabc'),
+                       (r'(?:ab|b)*', 'xabb')]:
+        r_code = get_code(pattern)
+        assert r_code.dfa is not None
+        r = re.compile(pattern)
+        for start in range(len(s) + 1):
+            res = rsre_core.search(r_code, s, start)
+            m = r.search(s, start)
+            assert (res is None) == (m is None)
+            if m is not None:
+                assert res.span() == m.span()
+
+def test_starts_found_once():
+    r_code = get_code(r'(?:ab|b)+c')
+    s = 'xxbc' * 30 + 'abab'
+    ctx = rsre_core.StrMatchContext(s, 0, len(s))
+    spans = []
+    while rsre_core.search_context(ctx, r_code):
+        spans.append(ctx.span())
+        ctx.reset(ctx.match_end)
+    assert spans == [(i * 4 + 2, i * 4 + 4) for i in range(30)]
+    # all the starts came from a single run of the reverse DFA
+    assert ctx.dfa_starts_from == 0
+
+def test_memory_cap(monkeypatch):
+    monkeypatch.setattr(rsre_dfa, 'MAX_DFA_STATES', 3)
+    pattern = r'(?:ab|b)*a(?:a|b)(?:a|b)(?:a|b)c'
+    r_code = get_code(pattern)
+    r = re.compile(pattern)
+    for s in ['abababbbabaaac', 'aaaaaaaaaaaa', 'abbbbabbbc', 'bbbabc']:
+        res = rsre_core.search(r_code, s)
+        m = r.search(s)
+        assert (res is None) == (m is None)
+        if m is not None:
+            assert res.span() == m.span()
+        assert len(r_code.dfa.forward.states) <= 3
+        assert len(r_code.dfa.reverse.states) <= 3
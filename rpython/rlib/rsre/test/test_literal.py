@@ -0,0 +1,64 @@
+from rpython.rlib.rsre.rpy import get_code
+
+
+def literals(regexp, flags=0):
+    result = get_code(regexp, flags).literals
+    if result is None:
+        return None
+    return sorted((u''.join([unichr(c) for c in lit.codes]), lit.offset)
+                  for lit in result)
+
+def test_single_literal():
+    assert literals(r'.*ERROR \d+') == [(u'ERROR ', -1)]
+    assert literals(r'\d+:\d+') == [(u':', -1)]
+    assert literals(r'\d\d:\d\d') == [(u':', 2)]
+    assert literals(r'[ab]foo') == [(u'foo', 1)]
+    assert literals(r'\w{3}foo') == [(u'foo', 3)]
+
+def test_longest_literal():
+    assert literals(r'ab\d+cdef\d+gh') == [(u'cdef', -1)]
+    assert literals(r'ab(cd)ef\s') == [(u'abcdef', 0)]
+
+def test_alternation():
+    assert literals(r'ERROR|WARNING') == [(u'ERROR', 0), (u'WARNING', 0)]
+    assert literals(r'\s(?:abc|de\d+f)') == [(u'abc', 1), (u'de', 1)]
+    assert literals(r'\d+(?:abc|de)') == [(u'abc', -1), (u'de', -1)]
+    assert literals(r'(?:abc|\d)x') == [(u'x', -1)]
+
+def test_no_literal():
+    assert literals(r'\d+') is None
+    assert literals(r'a|\d') is None
+    assert literals(r'(?i)\s+foo') is None
+    assert literals(r'(?:foo)*') is None
+    assert literals(r'\s(?=foo)') is None
+    assert literals(r'\s(?:a1|b2|c3|d4|e5|f6|g7|h8|i9)\s') is None
+
+def test_unicode_literal():
+    lit, = get_code(u'\\s\u20ac', 0).literals
+    assert lit.as_bytes is None
+    assert lit.as_utf8 == u'\u20ac'.encode('utf-8')
+    lit, = get_code(u'\\s\xe9', 0).literals
+    assert lit.as_bytes == '\xe9'
+    assert lit.as_utf8 == '\xc3\xa9'
+
+def test_overlap_table():
+    from rpython.rlib.rsre.rsre_literal import _overlap_table
+    assert _overlap_table([ord(c) for c in 'abcd']) == [0, 0, 0, 0]
+    assert _overlap_table([ord(c) for c in 'aab']) == [0, 1, 0]
+    assert _overlap_table([ord(c) for c in 'abab']) == [0, 0, 1, 2]
+
+def test_find_literal_buf_and_unicode():
+    from rpython.rlib.buffer import StringBuffer
+    from rpython.rlib.rsre import rsre_core
+    lit, = get_code(r'\s+aab').literals
+    for s, expected in [('aaab', 1), ('aabaab', 0), ('abaaab', 3),
+                        ('aaa', -1), ('xaab', 1)]:
+        ctx = rsre_core.BufMatchContext(StringBuffer(s), 0, len(s))
+        assert ctx.find_literal(lit, 0) == expected
+        u = unicode(s)
+        ctx = rsre_core.UnicodeMatchContext(u, 0, len(u))
+        assert ctx.find_literal(lit, 0) == expected
+    ctx = rsre_core.BufMatchContext(StringBuffer('aabaab'), 0, 6)
+    assert ctx.find_literal(lit, 1) == 3
+    ctx = rsre_core.BufMatchContext(StringBuffer('aabaab'), 0, 5)
+    assert ctx.find_literal(lit, 1) == -1
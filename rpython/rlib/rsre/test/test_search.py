@@ -212,6 +212,66 @@ class BaseTestSearch:
         res = self.match(r_code, 'z')
         assert not res
 
+    def test_required_literals(self):
+        P = self.P
+        for pattern in [r'.*ERROR \d+', r'\d\d:\d\d', r'(ERROR|WARN)\b',
+                        r'\w+(?:ab|cd|x)\d', r'[ab](?:foo|ba\w)',
+                        r'x?(?:foo|bar)\s']:
+            r_code, r = get_code_and_re(pattern)
+            assert r_code.literals is not None
+            for s in ['', 'foo', 'x ERROR 12 WARN', '12:34 56:7', 'WARNING',
+                      'zz cdbar2 xab1 x9', 'bfooa bazfoo ', 'xfoo barbar ']:
+                for start, end in [(0, len(s)), (1, len(s)), (0, len(s) - 1),
+                                   (3, 7)]:
+                    match = r.search(s, start, end)
+                    res = self.search(r_code, s, start, end)
+                    if match is None:
+                        assert res is None
+                    else:
+                        assert res is not None
+                        assert res.span() == (P(match.start()),
+                                              P(match.end()))
+
+    def test_required_literals_not_found(self):
+        r_code = get_code(r'\d+ERROR')
+        assert self.search(r_code, '1234' * 100 + 'ERRO') is None
+        res = self.search(r_code, '1234' * 100 + 'ERROR')
+        P = self.P
+        assert res.span() == (P(0), P(405))
+
+    def test_dfa(self):
+        P = self.P
+        for pattern in [r'(a|ab)*c', r'(?:x+x+)+y', r'(ab|a)+b', r'(ab|b)*?b',
+                        r'(?:ab|cd){2,3}', r'(?i)(?:ab|c)+d', r'(?:\w+\s)*',
+                        r'(a*)*', r'(?:[^b]|bb)+a']:
+            r_code, r = get_code_and_re(pattern)
+            assert r_code.dfa is not None
+            for s in ['', 'c', 'ababc', 'xxxxy', 'abab', 'aAbCd', 'cdabcd',
+                      'foo bar baz', 'bbbba', 'xabbc ']:
+                for start, end in [(0, len(s)), (1, len(s)), (0, len(s) - 1),
+                                   (2, 4)]:
+                    match = r.search(s, start, end)
+                    res = self.search(r_code, s, start, end)
+                    if match is None:
+                        assert res is None
+                    else:
+                        assert res is not None
+                        assert res.span() == (P(match.start()),
+                                              P(match.end()))
+                        if r.groups and match.start(1) >= 0:
+                            assert res.span(1) == (P(match.start(1)),
+                                                   P(match.end(1)))
+
+    def test_dfa_exponential(self):
+        # without the DFA, these take exponential time to fail
+        r_code = get_code(r'(a|aa)*c')
+        assert self.search(r_code, 'a' * 50) is None
+        r_code = get_code(r'(?:x+x+)+y')
+        assert self.search(r_code, 'x' * 50) is None
+        res = self.search(r_code, 'x' * 50 + 'y')
+        P = self.P
+        assert res.span() == (P(0), P(51))
+
     def test_empty_search(self):
         r_code, r = get_code_and_re(r'')
         for j in range(-2, 6):
@@ -236,6 +296,47 @@ class TestSearchCustom(BaseTestSearch):
     match = staticmethod(support.match)
     P = support.Position
 
+    def test_literal_prefix_not_prefiltered(self):
+        # patterns starting with a literal keep using literal_search()
+        P = self.P
+        calls = []
+        class CountingContext(support.MatchContextForTests):
+            def find_literal(self, literal, start):
+                calls.append(start)
+                return support.MatchContextForTests.find_literal(
+                    self, literal, start)
+        r_code = get_code(r'a\d+bcdef')
+        assert r_code.literals is not None
+        s = 'xxa1bcdef'
+        ctx = CountingContext(s, P(0), P(len(s)))
+        assert rsre_core.search_context(ctx, r_code)
+        assert ctx.match_start == P(2)
+        assert calls == []
+
+    def test_required_literals_remembered(self):
+        # like findall(): the literal that doesn't occur must not be
+        # looked for again by every search
+        P = self.P
+        calls = []
+        class CountingContext(support.MatchContextForTests):
+            def find_literal(self, literal, start):
+                calls.append(start)
+                return support.MatchContextForTests.find_literal(
+                    self, literal, start)
+        r_code = get_code(r'ERROR|WARNING')
+        s = 'ERROR ' * 100
+        ctx = CountingContext(s, P(0), P(len(s)))
+        found = 0
+        while rsre_core.search_context(ctx, r_code):
+            found += 1
+            ctx.reset(ctx.match_end)
+        assert found == 100
+        assert len(calls) <= 102
+        # searching again from an earlier position starts over
+        ctx.reset(P(3))
+        assert rsre_core.search_context(ctx, r_code)
+        assert ctx.span() == (P(6), P(11))
+
 class TestSearchStr(BaseTestSearch):
     search = staticmethod(rsre_core.search)
     match = staticmethod(rsre_core.match)
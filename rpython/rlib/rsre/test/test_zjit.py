@@ -184,6 +184,12 @@ class TestJitRSre(support.LLJitMixin):
         assert res == 30
         self.check_resops(call=0)
 
+    def test_dfa_search(self):
+        res = self.meta_interp_search(r"(a|aa)*c", "a"*40 + "b" + "aab" * 20)
+        assert res == -1
+        res = self.meta_interp_search(r"(a|aa)*c", "a"*40 + "b" + "aac")
+        assert res == 41
+
     def test_match_jit_bug(self):
         pattern = ".a" * 2500
         text = "a" * 6000
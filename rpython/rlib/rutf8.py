@@ -475,6 +475,8 @@ def codepoints_in_utf8(value, start=0, end=sys.maxint):
     if end > len(value):
         end = len(value)
     assert 0 <= start <= end
+    if end - start >= 4 * _WORD_SIZE:
+        return _codepoints_in_utf8_by_word(value, start, end)
     length = 0
     for i in range(start, end):
         # we want to count the number of chars not between 0x80 and 0xBF;
@@ -485,6 +487,39 @@ def codepoints_in_utf8(value, start=0, end=sys.maxint):
     return length
 
 
+_WORD_SIZE = rarithmetic.LONG_BIT // 8
+_ONE_PER_BYTE = r_uint(-1) // 0xFF             # 0x0101...01
+_HIGH_BIT_PER_BYTE = _ONE_PER_BYTE * 0x80      # 0x8080...80
+
+def _codepoints_in_utf8_by_word(value, start, end):
+    # same as codepoints_in_utf8(), but looks at one machine word at a
+    # time: a byte is a continuation byte iff its bit 7 is set and its
+    # bit 6 is not, so '(w & ~(w << 1)) & 0x8080..80' has one bit set for
+    # each continuation byte of the word 'w'.
+    from rpython.rlib.buffer import StringBuffer   # circular import
+    buf = StringBuffer(value)
+    length = 0
+    while start & (_WORD_SIZE - 1):
+        if ord(value[start]) & 0xC0 != 0x80:
+            length += 1
+        start += 1
+    continuation = 0
+    while start + _WORD_SIZE <= end:
+        word = buf.typed_read(lltype.Unsigned, start)
+        bits = (word & ~(word << 1)) & _HIGH_BIT_PER_BYTE
+        # sum the bits into the highest byte
+        continuation += rarithmetic.intmask(
+            ((bits >> 7) * _ONE_PER_BYTE) >> (rarithmetic.LONG_BIT - 8))
+        length += _WORD_SIZE
+        start += _WORD_SIZE
+    length -= continuation
+    while start < end:
+        if ord(value[start]) & 0xC0 != 0x80:
+            length += 1
+        start += 1
+    return length
+
+
 @jit.elidable
 def surrogate_in_utf8(utf8):
     """Check if the UTF-8 byte string 'value' contains a surrogate.
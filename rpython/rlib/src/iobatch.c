@@ -0,0 +1,600 @@
+#include <errno.h>
+#include <fcntl.h>
+#include <poll.h>
+#include <pthread.h>
+#include <signal.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+#include "iobatch.h"
+
+#ifdef __linux__
+#  include <sys/mman.h>
+#  include <sys/syscall.h>
+#  ifdef __has_include
+#    if __has_include(<linux/io_uring.h>)
+#      include <linux/io_uring.h>
+#    endif
+#  endif
+#endif
+/* we need IORING_OP_READ/WRITE at the current position: Linux >= 5.6 */
+#if defined(IORING_FEAT_RW_CUR_POS) && defined(__NR_io_uring_setup)
+#  define RPY_HAVE_IO_URING
+#endif
+
+#define RPY_IOBATCH_THREADS   8
+#define RPY_IOBATCH_MAX_IO    0x7ffff000   /* like Linux's read() */
+
+#define OP_WAITING  0     /* behind another operation on the same fd */
+#define OP_QUEUED   1     /* in the ring, or taken by a thread */
+#define OP_DONE     2
+
+struct rpy_iobatch_s {
+    long max_ops;
+    long n;
+    int *fds;
+    char *writes;
+    char **bufs;
+    size_t *sizes;
+    long long *offsets;
+    long *results;
+    long *next_op;          /* next operation on the same fd, or -1 */
+    long *groups;           /* first operation on each fd */
+    long *groups_last;      /* last operation on each fd */
+    char *state;
+    long ngroups;
+    long pending;           /* operations not done yet */
+    int running;
+    int cancelled;
+
+    /* with io_uring */
+    int ring_fd;
+    void *sq_ptr, *cq_ptr;
+    size_t sq_size, cq_size, sqes_size;
+#ifdef RPY_HAVE_IO_URING
+    struct io_uring_sqe *sqes;
+    struct io_uring_cqe *cqes;
+    unsigned *sq_tail, *sq_array, *cq_head, *cq_tail;
+    unsigned sq_mask, cq_mask;
+#endif
+    unsigned to_submit;     /* in the ring, but not seen by the kernel */
+    long inflight;          /* in the ring and not done */
+    long inflight_chained;  /* the same, with another operation behind */
+
+    /* with threads */
+    int have_lock;
+    pthread_mutex_t lock;
+    long next_group;
+    int nthreads, threads_left;
+    pthread_t threads[RPY_IOBATCH_THREADS];
+    int wake_pipe[2];       /* written to cancel the operations */
+    int done_pipe[2];       /* written by the last thread to finish */
+};
+
+static size_t rpy_iobatch_size(struct rpy_iobatch_s *b, long i)
+{
+    size_t size = b->sizes[i];
+    return size > RPY_IOBATCH_MAX_IO ? RPY_IOBATCH_MAX_IO : size;
+}
+
+static void rpy_iobatch_op_done(struct rpy_iobatch_s *b, long i, long res)
+{
+    b->results[i] = res;
+    b->state[i] = OP_DONE;
+    b->pending--;
+}
+
+/* chain together the operations on the same fd */
+static void rpy_iobatch_group(struct rpy_iobatch_s *b)
+{
+    long i, g;
+    b->ngroups = 0;
+    for (i = 0; i < b->n; i++) {
+        b->next_op[i] = -1;
+        b->state[i] = OP_WAITING;
+        for (g = 0; g < b->ngroups; g++)
+            if (b->fds[b->groups[g]] == b->fds[i])
+                break;
+        if (g < b->ngroups)
+            b->next_op[b->groups_last[g]] = i;
+        else
+            b->groups[b->ngroups++] = i;
+        b->groups_last[g] = i;
+    }
+}
+
+
+/************************************************************/
+/*  io_uring                                                */
+/************************************************************/
+
+#ifdef RPY_HAVE_IO_URING
+
+#define RPY_IOBATCH_CANCEL_TAG  (((__u64)1) << 62)
+
+static void rpy_iobatch_ring_close(struct rpy_iobatch_s *b)
+{
+    if (b->sqes != NULL)
+        munmap(b->sqes, b->sqes_size);
+    if (b->cq_ptr != NULL && b->cq_ptr != b->sq_ptr)
+        munmap(b->cq_ptr, b->cq_size);
+    if (b->sq_ptr != NULL)
+        munmap(b->sq_ptr, b->sq_size);
+    if (b->ring_fd >= 0)
+        close(b->ring_fd);
+    b->sqes = NULL;
+    b->cq_ptr = b->sq_ptr = NULL;
+    b->ring_fd = -1;
+}
+
+static void *rpy_iobatch_mmap(struct rpy_iobatch_s *b, size_t size,
+                              off_t offset)
+{
+    void *p = mmap(NULL, size, PROT_READ | PROT_WRITE,
+                   MAP_SHARED | MAP_POPULATE, b->ring_fd, offset);
+    return p == MAP_FAILED ? NULL : p;
+}
+
+static int rpy_iobatch_ring_setup(struct rpy_iobatch_s *b, unsigned entries)
+{
+    struct io_uring_params p;
+    char *sq, *cq;
+
+    memset(&p, 0, sizeof(p));
+    b->ring_fd = (int)syscall(__NR_io_uring_setup, entries, &p);
+    if (b->ring_fd < 0)
+        return -1;
+    if (!(p.features & IORING_FEAT_RW_CUR_POS))
+        goto error;
+
+    b->sq_size = p.sq_off.array + p.sq_entries * sizeof(unsigned);
+    b->cq_size = p.cq_off.cqes + p.cq_entries * sizeof(struct io_uring_cqe);
+    if (p.features & IORING_FEAT_SINGLE_MMAP) {
+        if (b->cq_size > b->sq_size)
+            b->sq_size = b->cq_size;
+        b->cq_size = b->sq_size;
+    }
+    b->sq_ptr = rpy_iobatch_mmap(b, b->sq_size, IORING_OFF_SQ_RING);
+    if (b->sq_ptr == NULL)
+        goto error;
+    if (p.features & IORING_FEAT_SINGLE_MMAP)
+        b->cq_ptr = b->sq_ptr;
+    else {
+        b->cq_ptr = rpy_iobatch_mmap(b, b->cq_size, IORING_OFF_CQ_RING);
+        if (b->cq_ptr == NULL)
+            goto error;
+    }
+    b->sqes_size = p.sq_entries * sizeof(struct io_uring_sqe);
+    b->sqes = rpy_iobatch_mmap(b, b->sqes_size, IORING_OFF_SQES);
+    if (b->sqes == NULL)
+        goto error;
+
+    sq = (char *)b->sq_ptr;
+    cq = (char *)b->cq_ptr;
+    b->sq_tail = (unsigned *)(sq + p.sq_off.tail);
+    b->sq_mask = *(unsigned *)(sq + p.sq_off.ring_mask);
+    b->sq_array = (unsigned *)(sq + p.sq_off.array);
+    b->cq_head = (unsigned *)(cq + p.cq_off.head);
+    b->cq_tail = (unsigned *)(cq + p.cq_off.tail);
+    b->cq_mask = *(unsigned *)(cq + p.cq_off.ring_mask);
+    b->cqes = (struct io_uring_cqe *)(cq + p.cq_off.cqes);
+    return 0;
+
+ error:
+    rpy_iobatch_ring_close(b);
+    return -1;
+}
+
+static void rpy_iobatch_push_sqe(struct rpy_iobatch_s *b,
+                                 const struct io_uring_sqe *sqe)
+{
+    /* we are the only writer of the tail; the kernel only reads it */
+    unsigned tail = *b->sq_tail;
+    unsigned index = tail & b->sq_mask;
+    b->sqes[index] = *sqe;
+    b->sq_array[index] = index;
+    __atomic_store_n(b->sq_tail, tail + 1, __ATOMIC_RELEASE);
+    b->to_submit++;
+}
+
+static void rpy_iobatch_queue_op(struct rpy_iobatch_s *b, long i)
+{
+    struct io_uring_sqe sqe;
+    memset(&sqe, 0, sizeof(sqe));
+    sqe.opcode = b->writes[i] ? IORING_OP_WRITE : IORING_OP_READ;
+    sqe.fd = b->fds[i];
+    sqe.addr = (__u64)(unsigned long)b->bufs[i];
+    sqe.len = (__u32)rpy_iobatch_size(b, i);
+    sqe.off = b->offsets[i] < 0 ? (__u64)-1 : (__u64)b->offsets[i];
+    sqe.user_data = (__u64)i;
+    rpy_iobatch_push_sqe(b, &sqe);
+    b->state[i] = OP_QUEUED;
+    b->inflight++;
+    if (b->next_op[i] >= 0)
+        b->inflight_chained++;
+}
+
+static long rpy_iobatch_reap(struct rpy_iobatch_s *b)
+{
+    unsigned head = *b->cq_head;
+    unsigned tail = __atomic_load_n(b->cq_tail, __ATOMIC_ACQUIRE);
+    long count = 0;
+
+    while (head != tail) {
+        struct io_uring_cqe *cqe = &b->cqes[head & b->cq_mask];
+        long i, next;
+        head++;
+        count++;
+        if (cqe->user_data & RPY_IOBATCH_CANCEL_TAG)
+            continue;
+        i = (long)cqe->user_data;
+        next = b->next_op[i];
+        b->inflight--;
+        if (next >= 0)
+            b->inflight_chained--;
+        rpy_iobatch_op_done(b, i, cqe->res);
+        /* the next operation on the same fd can only start now */
+        if (next >= 0 && !b->cancelled)
+            rpy_iobatch_queue_op(b, next);
+    }
+    __atomic_store_n(b->cq_head, head, __ATOMIC_RELEASE);
+    return count;
+}
+
+static long rpy_iobatch_enter(struct rpy_iobatch_s *b, unsigned min_complete)
+{
+    long ret = syscall(__NR_io_uring_enter, b->ring_fd, b->to_submit,
+                       min_complete, IORING_ENTER_GETEVENTS, NULL, 0);
+    if (ret > 0)
+        b->to_submit -= (unsigned)ret;
+    return ret;
+}
+
+static void rpy_iobatch_start_ring(struct rpy_iobatch_s *b)
+{
+    long g;
+    b->inflight = 0;
+    b->inflight_chained = 0;
+    for (g = 0; g < b->ngroups; g++)
+        rpy_iobatch_queue_op(b, b->groups[g]);
+}
+
+static int rpy_iobatch_wait_ring(struct rpy_iobatch_s *b)
+{
+    for (;;) {
+        unsigned min_complete;
+        rpy_iobatch_reap(b);
+        if (b->pending == 0)
+            return 0;
+        /* if an operation has another one behind it on the same fd, we
+           must submit that one as soon as the first one is done;
+           otherwise, submitting and waiting is a single system call */
+        min_complete = b->inflight_chained > 0 ? 1 : (unsigned)b->inflight;
+        if (rpy_iobatch_enter(b, min_complete) < 0)
+            return -1;
+        if (rpy_iobatch_reap(b) < (long)min_complete && b->pending > 0) {
+            /* woken up early: there is a signal to handle */
+            errno = EINTR;
+            return -1;
+        }
+    }
+}
+
+static int rpy_iobatch_cancel_ring(struct rpy_iobatch_s *b)
+{
+    long i;
+    struct io_uring_sqe sqe;
+
+    b->cancelled = 1;
+    rpy_iobatch_reap(b);
+    for (i = 0; i < b->n; i++) {
+        if (b->state[i] == OP_WAITING)
+            rpy_iobatch_op_done(b, i, -ECANCELED);
+        else if (b->state[i] == OP_QUEUED) {
+            memset(&sqe, 0, sizeof(sqe));
+            sqe.opcode = IORING_OP_ASYNC_CANCEL;
+            sqe.fd = -1;
+            sqe.addr = (__u64)i;
+            sqe.user_data = (__u64)i | RPY_IOBATCH_CANCEL_TAG;
+            rpy_iobatch_push_sqe(b, &sqe);
+        }
+    }
+    while (b->pending > 0) {
+        if (rpy_iobatch_enter(b, 1) < 0 && errno != EINTR)
+            return -1;
+        rpy_iobatch_reap(b);
+    }
+    return 0;
+}
+
+#endif  /* RPY_HAVE_IO_URING */
+
+
+/************************************************************/
+/*  threads                                                 */
+/************************************************************/
+
+static void rpy_iobatch_notify(int fd)
+{
+    char c = 0;
+    while (write(fd, &c, 1) < 0 && errno == EINTR)
+        ;
+}
+
+static long rpy_iobatch_do(struct rpy_iobatch_s *b, long i)
+{
+    struct pollfd pfd[2];
+    size_t size = rpy_iobatch_size(b, i);
+    long long offset = b->offsets[i];
+    long res;
+
+    if (b->fds[i] < 0)
+        return -EBADF;
+    /* wait until the operation is ready, or until it is cancelled */
+    pfd[0].fd = b->fds[i];
+    pfd[0].events = b->writes[i] ? POLLOUT : POLLIN;
+    pfd[1].fd = b->wake_pipe[0];
+    pfd[1].events = POLLIN;
+    do {
+        pfd[0].revents = pfd[1].revents = 0;
+    } while (poll(pfd, 2, -1) < 0 && (errno == EINTR || errno == EAGAIN));
+    if (pfd[1].revents)
+        return -ECANCELED;
+
+    do {
+        if (b->writes[i]) {
+            if (offset < 0)
+                res = write(b->fds[i], b->bufs[i], size);
+            else
+                res = pwrite(b->fds[i], b->bufs[i], size, (off_t)offset);
+        }
+        else {
+            if (offset < 0)
+                res = read(b->fds[i], b->bufs[i], size);
+            else
+                res = pread(b->fds[i], b->bufs[i], size, (off_t)offset);
+        }
+    } while (res < 0 && errno == EINTR);
+    return res < 0 ? -errno : res;
+}
+
+static void *rpy_iobatch_worker(void *arg)
+{
+    struct rpy_iobatch_s *b = arg;
+    long g, i;
+    int last;
+
+    for (;;) {
+        pthread_mutex_lock(&b->lock);
+        g = b->next_group < b->ngroups ? b->next_group++ : -1;
+        pthread_mutex_unlock(&b->lock);
+        if (g < 0)
+            break;
+        /* 'pending' and 'state' are only updated by rpy_iobatch_join() */
+        for (i = b->groups[g]; i >= 0; i = b->next_op[i])
+            b->results[i] = rpy_iobatch_do(b, i);
+    }
+    pthread_mutex_lock(&b->lock);
+    last = --b->threads_left == 0;
+    pthread_mutex_unlock(&b->lock);
+    if (last)
+        rpy_iobatch_notify(b->done_pipe[1]);
+    return NULL;
+}
+
+static int rpy_iobatch_start_threads(struct rpy_iobatch_s *b)
+{
+    sigset_t all, old;
+    int i, err = 0, last;
+    int nthreads = b->ngroups < RPY_IOBATCH_THREADS ? (int)b->ngroups
+                                                    : RPY_IOBATCH_THREADS;
+    b->next_group = 0;
+    b->threads_left = nthreads;
+    /* the threads block all signals, so that they are delivered to the
+       thread waiting in rpy_iobatch_wait() */
+    sigfillset(&all);
+    pthread_sigmask(SIG_BLOCK, &all, &old);
+    for (i = 0; i < nthreads; i++) {
+        err = pthread_create(&b->threads[i], NULL, rpy_iobatch_worker, b);
+        if (err != 0)
+            break;
+    }
+    pthread_sigmask(SIG_SETMASK, &old, NULL);
+    b->nthreads = i;
+    if (i < nthreads) {
+        if (i == 0) {
+            errno = err;
+            return -1;
+        }
+        /* run with the threads we got */
+        pthread_mutex_lock(&b->lock);
+        b->threads_left -= nthreads - i;
+        last = b->threads_left == 0;
+        pthread_mutex_unlock(&b->lock);
+        if (last)
+            rpy_iobatch_notify(b->done_pipe[1]);
+    }
+    return 0;
+}
+
+static void rpy_iobatch_join(struct rpy_iobatch_s *b)
+{
+    char c;
+    int i;
+    while (read(b->done_pipe[0], &c, 1) < 0 && errno == EINTR)
+        ;
+    for (i = 0; i < b->nthreads; i++)
+        pthread_join(b->threads[i], NULL);
+    b->nthreads = 0;
+    for (i = 0; i < b->n; i++)
+        b->state[i] = OP_DONE;
+    b->pending = 0;
+    if (b->cancelled)
+        while (read(b->wake_pipe[0], &c, 1) < 0 && errno == EINTR)
+            ;
+}
+
+static int rpy_iobatch_wait_threads(struct rpy_iobatch_s *b)
+{
+    struct pollfd pfd;
+    pfd.fd = b->done_pipe[0];
+    pfd.events = POLLIN;
+    if (poll(&pfd, 1, -1) < 0)
+        return -1;
+    rpy_iobatch_join(b);
+    return 0;
+}
+
+static int rpy_iobatch_cancel_threads(struct rpy_iobatch_s *b)
+{
+    struct pollfd pfd;
+    b->cancelled = 1;
+    rpy_iobatch_notify(b->wake_pipe[1]);
+    pfd.fd = b->done_pipe[0];
+    pfd.events = POLLIN;
+    while (poll(&pfd, 1, -1) < 0)
+        ;
+    rpy_iobatch_join(b);
+    return 0;
+}
+
+static int rpy_iobatch_pipe(int fds[2])
+{
+    if (pipe(fds) < 0)
+        return -1;
+    fcntl(fds[0], F_SETFD, FD_CLOEXEC);
+    fcntl(fds[1], F_SETFD, FD_CLOEXEC);
+    return 0;
+}
+
+
+/************************************************************/
+
+RPY_EXTERN
+struct rpy_iobatch_s *rpy_iobatch_new(long max_ops, int use_io_uring)
+{
+    struct rpy_iobatch_s *b = calloc(1, sizeof(struct rpy_iobatch_s));
+    if (b == NULL)
+        return NULL;
+    b->max_ops = max_ops;
+    b->ring_fd = -1;
+    b->wake_pipe[0] = b->wake_pipe[1] = -1;
+    b->done_pipe[0] = b->done_pipe[1] = -1;
+    b->next_op = malloc(max_ops * sizeof(long));
+    b->groups = malloc(max_ops * sizeof(long));
+    b->groups_last = malloc(max_ops * sizeof(long));
+    b->state = malloc(max_ops);
+    if (!b->next_op || !b->groups || !b->groups_last || !b->state) {
+        errno = ENOMEM;
+        goto error;
+    }
+#ifdef RPY_HAVE_IO_URING
+    /* twice as many entries, for the cancellations */
+    if (use_io_uring && rpy_iobatch_ring_setup(b, 2 * max_ops) == 0)
+        return b;
+#endif
+    if (rpy_iobatch_pipe(b->wake_pipe) < 0 ||
+        rpy_iobatch_pipe(b->done_pipe) < 0)
+        goto error;
+    if ((errno = pthread_mutex_init(&b->lock, NULL)) != 0)
+        goto error;
+    b->have_lock = 1;
+    return b;
+
+ error:
+    rpy_iobatch_free(b);
+    return NULL;
+}
+
+RPY_EXTERN
+int rpy_iobatch_uses_io_uring(struct rpy_iobatch_s *b)
+{
+    return b->ring_fd >= 0;
+}
+
+RPY_EXTERN
+int rpy_iobatch_start(struct rpy_iobatch_s *b, long n, int *fds,
+                      char *writes, char **bufs, size_t *sizes,
+                      long long *offsets, long *results)
+{
+    if (b->running || n > b->max_ops) {
+        errno = EINVAL;
+        return -1;
+    }
+    b->n = n;
+    b->fds = fds;
+    b->writes = writes;
+    b->bufs = bufs;
+    b->sizes = sizes;
+    b->offsets = offsets;
+    b->results = results;
+    b->pending = n;
+    b->cancelled = 0;
+    rpy_iobatch_group(b);
+    if (n == 0)
+        return 0;
+#ifdef RPY_HAVE_IO_URING
+    if (b->ring_fd >= 0) {
+        rpy_iobatch_start_ring(b);
+        b->running = 1;
+        return 0;
+    }
+#endif
+    if (rpy_iobatch_start_threads(b) < 0)
+        return -1;
+    b->running = 1;
+    return 0;
+}
+
+RPY_EXTERN
+int rpy_iobatch_wait(struct rpy_iobatch_s *b)
+{
+    int res;
+    if (!b->running)
+        return 0;
+#ifdef RPY_HAVE_IO_URING
+    if (b->ring_fd >= 0)
+        res = rpy_iobatch_wait_ring(b);
+    else
+#endif
+        res = rpy_iobatch_wait_threads(b);
+    if (res == 0)
+        b->running = 0;
+    return res;
+}
+
+RPY_EXTERN
+int rpy_iobatch_cancel(struct rpy_iobatch_s *b)
+{
+    int res;
+    if (!b->running)
+        return 0;
+#ifdef RPY_HAVE_IO_URING
+    if (b->ring_fd >= 0)
+        res = rpy_iobatch_cancel_ring(b);
+    else
+#endif
+        res = rpy_iobatch_cancel_threads(b);
+    if (res == 0)
+        b->running = 0;
+    return res;
+}
+
+RPY_EXTERN
+void rpy_iobatch_free(struct rpy_iobatch_s *b)
+{
+#ifdef RPY_HAVE_IO_URING
+    rpy_iobatch_ring_close(b);
+#endif
+    if (b->wake_pipe[0] >= 0) close(b->wake_pipe[0]);
+    if (b->wake_pipe[1] >= 0) close(b->wake_pipe[1]);
+    if (b->done_pipe[0] >= 0) close(b->done_pipe[0]);
+    if (b->done_pipe[1] >= 0) close(b->done_pipe[1]);
+    if (b->have_lock)
+        pthread_mutex_destroy(&b->lock);
+    free(b->next_op);
+    free(b->groups);
+    free(b->groups_last);
+    free(b->state);
+    free(b);
+}
@@ -0,0 +1,31 @@
+#ifndef RPY_IOBATCH_H
+#define RPY_IOBATCH_H
+
+#include <src/precommondefs.h>
+#include <stddef.h>
+
+/* Batches of reads and writes of file descriptors, done concurrently:
+   with io_uring where the kernel supports it, and with helper threads
+   otherwise.  Operations on the same file descriptor are done in the
+   order they are given; operations on different ones run concurrently.
+
+   rpy_iobatch_start() queues the operations, rpy_iobatch_wait() waits
+   until they are all done, and rpy_iobatch_cancel() stops the ones that
+   are still running.  The buffers must stay valid until either
+   rpy_iobatch_wait() returned 0 or rpy_iobatch_cancel() returned 0.
+   The result of each operation is stored in 'results': the number of
+   bytes read or written, or minus the errno. */
+
+struct rpy_iobatch_s;
+
+RPY_EXTERN struct rpy_iobatch_s *rpy_iobatch_new(long max_ops,
+                                                 int use_io_uring);
+RPY_EXTERN int rpy_iobatch_uses_io_uring(struct rpy_iobatch_s *b);
+RPY_EXTERN int rpy_iobatch_start(struct rpy_iobatch_s *b, long n, int *fds,
+                                 char *writes, char **bufs, size_t *sizes,
+                                 long long *offsets, long *results);
+RPY_EXTERN int rpy_iobatch_wait(struct rpy_iobatch_s *b);
+RPY_EXTERN int rpy_iobatch_cancel(struct rpy_iobatch_s *b);
+RPY_EXTERN void rpy_iobatch_free(struct rpy_iobatch_s *b);
+
+#endif
@@ -784,6 +784,66 @@ def test_pwrite():
         os.close(fd)
     py.test.raises(OSError, rposix.pwrite, fd, b'ea', 1)
 
+def run_batch_io(batch, fds, datas, sizes, offsets):
+    batch.start(fds, datas, sizes, offsets)
+    try:
+        batch.wait()
+        return batch.results()
+    finally:
+        batch.finish()
+
+@pytest.mark.parametrize('use_io_uring', [True, False])
+@rposix_requires('BatchIO')
+def test_batch_io(use_io_uring):
+    fname = str(udir.join('os_test_batch.txt'))
+    fd = os.open(fname, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0777)
+    batch = rposix.BatchIO(8, use_io_uring)
+    try:
+        if not use_io_uring:
+            assert not batch.uses_io_uring()
+        res = run_batch_io(batch, [fd, fd, fd, fd, 1234],
+                           [b'Hello world', None, b'ea', None, None],
+                           [0, 5, 0, 100, 1],
+                           [-1, 0, 1, 0, -1])
+        assert res == [(None, 11, 0), (b'Hello', 5, 0), (None, 2, 0),
+                       (b'Healo world', 11, 0), (None, 0, errno.EBADF)]
+        assert run_batch_io(batch, [], [], [], []) == []
+        py.test.raises(OSError, batch.start, [fd], [None], [-1], [0])
+    finally:
+        batch.close()
+        os.close(fd)
+
+@pytest.mark.parametrize('use_io_uring', [True, False])
+@rposix_requires('BatchIO')
+def test_batch_io_concurrent(use_io_uring):
+    # the read can only complete after the write that follows it
+    r, w = os.pipe()
+    batch = rposix.BatchIO(8, use_io_uring)
+    try:
+        res = run_batch_io(batch, [r, w], [None, b'abc'], [10, 0], [-1, -1])
+        assert res == [(b'abc', 3, 0), (None, 3, 0)]
+    finally:
+        batch.close()
+        os.close(r)
+        os.close(w)
+
+@pytest.mark.parametrize('use_io_uring', [True, False])
+@rposix_requires('BatchIO')
+def test_batch_io_cancel(use_io_uring):
+    r, w = os.pipe()
+    batch = rposix.BatchIO(8, use_io_uring)
+    try:
+        batch.start([r, r], [None, None], [10, 10], [-1, -1])
+        batch.finish()      # doesn't block on the reads
+        os.write(w, b'abc')
+        assert os.read(r, 10) == b'abc'
+        res = run_batch_io(batch, [w, r], [b'def', None], [0, 10], [-1, -1])
+        assert res == [(None, 3, 0), (b'def', 3, 0)]
+    finally:
+        batch.close()
+        os.close(r)
+        os.close(w)
+
 @rposix_requires('posix_fadvise')
 def test_posix_fadvise():
     if sys.maxint <= 2**32:
@@ -116,6 +116,18 @@ def test_codepoints_in_utf8(u, start, len1):
                                      len(u[:end].encode('utf8')) + extra)
     assert count == len(u[start:end])
 
+def test_codepoints_in_utf8_long():
+    # long enough to be counted one word at a time
+    u = (u'abc\xe9\u1234\U00012345' * 20)
+    s = u.encode('utf8')
+    for start in range(0, 24):
+        for end in range(len(s) - 24, len(s) + 1):
+            count = rutf8.codepoints_in_utf8(s, start, end)
+            expected = len([c for c in s[start:end]
+                            if ord(c) & 0xC0 != 0x80])
+            assert count == expected
+    assert rutf8.codepoints_in_utf8(s) == len(u)
+
 @given(strategies.text())
 def test_utf8_index_storage(u):
     index = rutf8.create_utf8_index_storage(u.encode('utf8'), len(u))
@@ -479,6 +479,7 @@ LL_OPERATIONS = {
 
     'gc__collect':          LLOp(canmallocgc=True),
     'gc__collect_step':     LLOp(canmallocgc=True),
+    'gc__freeze':           LLOp(canmallocgc=True),
     'gc__enable':           LLOp(),
     'gc__disable':          LLOp(),
     'gc__isenabled':        LLOp(),